@@ -2,7 +2,7 @@
 
 breakdown_by_moniker_labels = []
 breakdown_by_moniker = []
-breakdown_by_moniker_data.forEach(function(point){
+as_records(breakdown_by_moniker_data).forEach(function(point){
     breakdown_by_moniker_labels.push(point.moniker)
     breakdown_by_moniker.push((point.percent * 100).toFixed(2))
 });
@@ -42,7 +42,7 @@ new Chart(
 
 breakdown_by_stock_type_labels = []
 breakdown_by_stock_type = []
-breakdown_by_stock_type_data.forEach(function(point){
+as_records(breakdown_by_stock_type_data).forEach(function(point){
     breakdown_by_stock_type_labels.push(point.stock_type)
     breakdown_by_stock_type.push((point.percent * 100).toFixed(2))
 });
@@ -77,7 +77,7 @@ new Chart(
 
 breakdown_by_sector_labels = []
 breakdown_by_sector = []
-breakdown_by_sector_data.forEach(function(point){
+as_records(breakdown_by_sector_data).forEach(function(point){
     breakdown_by_sector_labels.push(point.sector)
     breakdown_by_sector.push((point.percent * 100).toFixed(2))
 });
@@ -113,7 +113,7 @@ new Chart(
 growth_breakdown_equity_labels = []
 growth_breakdown_equity_data_sets = []
 growth_breakdown_equity_data_by_moniker = {}
-growth_breakdown_by_stock_type_data.EQUITY.forEach(function(point){
+as_records(growth_breakdown_by_stock_type_data.EQUITY).forEach(function(point){
   growth_breakdown_equity_labels.push(point.month)
 
   Object.keys(point).forEach(function(key){
@@ -164,7 +164,7 @@ new Chart(
 growth_breakdown_etf_labels = []
 growth_breakdown_etf_data_sets = []
 growth_breakdown_etf_data_by_moniker = {}
-growth_breakdown_by_stock_type_data.ETF.forEach(function(point){
+as_records(growth_breakdown_by_stock_type_data.ETF).forEach(function(point){
   growth_breakdown_etf_labels.push(point.month)
 
   Object.keys(point).forEach(function(key){
@@ -211,7 +211,7 @@ new Chart(
 growth_breakdown_mom_equity_labels = []
 growth_breakdown_mom_equity_data_sets = []
 growth_breakdown_mom_equity_data_by_moniker = {}
-growth_breakdown_mom_by_stock_type_data.EQUITY.forEach(function(point){
+as_records(growth_breakdown_mom_by_stock_type_data.EQUITY).forEach(function(point){
   growth_breakdown_mom_equity_labels.push(point.month)
 
   Object.keys(point).forEach(function(key){
@@ -257,7 +257,7 @@ new Chart(
 growth_breakdown_mom_etf_labels = []
 growth_breakdown_mom_etf_data_sets = []
 growth_breakdown_mom_etf_data_by_moniker = {}
-growth_breakdown_mom_by_stock_type_data.ETF.forEach(function(point){
+as_records(growth_breakdown_mom_by_stock_type_data.ETF).forEach(function(point){
   growth_breakdown_mom_etf_labels.push(point.month)
 
   Object.keys(point).forEach(function(key){
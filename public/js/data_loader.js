@@ -0,0 +1,19 @@
+function as_records(data) {
+  if (Array.isArray(data)) {
+    return data
+  }
+
+  const columns = Object.keys(data)
+  if (columns.length == 0) {
+    return []
+  }
+
+  return data[columns[0]].map(function(_, index){
+    const record = {}
+    columns.forEach(function(column){
+      record[column] = data[column][index]
+    })
+
+    return record
+  })
+}
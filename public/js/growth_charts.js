@@ -8,7 +8,7 @@ portfolio_ratio_invested = []
 portfolio_ratio_earned = []
 annual_growth_values = {}
 
-growth_data.forEach(function(point){
+as_records(growth_data).forEach(function(point){
     growth_labels.push(point.month)
     growth_invested.push(point.invested.toFixed(2))
     growth_value.push(point.value.toFixed(2))
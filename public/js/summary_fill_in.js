@@ -20,7 +20,7 @@ currentPercent.innerHTML = percent_html;
 
 var portfolioDataElement = document.getElementById('portfolioData');
 var portfolio_data_html = ""
-portfolio_data.forEach(function(stock) {
+as_records(portfolio_data).forEach(function(stock) {
     invested = stock.invested.toFixed(2)
     value = stock.value.toFixed(2)
 
@@ -41,7 +41,7 @@ portfolioDataElement.innerHTML = portfolio_data_html
 
 var sharesDataElement = document.getElementById('sharesData');
 var shares_data_html = ""
-portfolio_data.forEach(function(stock) {
+as_records(portfolio_data).forEach(function(stock) {
     avg_price = stock.average_price.toFixed(2)
     mrkt_price = stock.market_price.toFixed(2)
 
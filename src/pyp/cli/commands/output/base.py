@@ -1,26 +1,50 @@
+import json
+import os
 from datetime import datetime
+from enum import StrEnum
 from pathlib import Path
-from typing import Self, cast
+from typing import Self
 
-import pandas as pd
-from pandas import DataFrame
-from sqlalchemy import Connection, Engine, Selectable, func, select
-from sqlalchemy.orm import Session
+from pandas import DataFrame, to_datetime
+from sqlalchemy import Engine, Select, Selectable, and_, func, literal, select, true, union_all
+from sqlalchemy.orm import InstrumentedAttribute
 
-from pyp.database.models import Currency, ExchangeRate
+from pyp.cli.commands.output.context import OutputContext
+from pyp.database.models import ExchangeRate, day_key
+
+
+class OutputFormat(StrEnum):
+    RECORDS = "records"
+    COLUMNAR = "columnar"
 
 
 class OutputCommand:
     _df: DataFrame
     output_dir = Path(__file__).parent.parent.parent.parent.parent.parent / "public/js/output"
-
-    def __init__(self, engine: Engine, portfolio_id: int, date: datetime, currency_code: str):
+    columnar_precision = 4
+    data_file_name: str
+    assembled_file_name: str | None = None
+
+    def __init__(
+        self,
+        engine: Engine,
+        portfolio_id: int,
+        date: datetime,
+        currency_code: str,
+        context: OutputContext | None = None,
+        output_format: OutputFormat = OutputFormat.RECORDS,
+        output_dir: Path | None = None,
+    ):
         self.engine = engine
         self.portfolio_id = portfolio_id
         self.date = date
         self.currency_code = currency_code
+        self.context = context if context is not None else OutputContext(engine)
+        self.output_format = output_format
+        self.output_dir = output_dir if output_dir is not None else self.output_dir
 
         self._currency_ids_by_code: dict[str, int] | None = None
+        self._written_files: dict[str, str] = dict()
 
     @property
     def _db_query(self) -> Selectable:
@@ -30,49 +54,95 @@ class OutputCommand:
     def _df_dtypes(self) -> dict[str, str]:
         raise NotImplementedError
 
+    @property
+    def _portfolio_ids(self) -> list[int]:
+        return self.context.portfolio_ids if self.context.portfolio_ids is not None else [self.portfolio_id]
+
     def _resolve_currency_ids(self) -> Self:
-        with Session(self.engine) as session:
-            self._currency_ids_by_code = {c.code: c.id for c in session.scalars(select(Currency)).all()}
+        self._currency_ids_by_code = self.context.currency_ids_by_code
 
         return self
 
+    @staticmethod
+    def _latest_per_group(
+        query: Select,
+        group_by: list[InstrumentedAttribute],
+        order_by: InstrumentedAttribute,
+    ) -> Select:
+        latest = (
+            query.with_only_columns(*group_by, func.max(order_by).label(order_by.key)).group_by(*group_by).subquery()
+        )
+
+        return select(*query.selected_columns).join(
+            latest, and_(*[column == latest.c[column.key] for column in [*group_by, order_by]])
+        )
+
     @property
-    def _exchange_rates_query(self) -> Selectable:
+    def _pivot_currency_id(self) -> int:
+        return min(self._currency_ids_by_code.values())
+
+    def _cross_rates_query(self, pivot_rates_query: Select, period_columns: list[str]) -> Select:
         base_currency_id = self._currency_ids_by_code[self.currency_code]
         currency_ids = [
             currency_id for currency_id in self._currency_ids_by_code.values() if currency_id != base_currency_id
         ]
 
+        stored_rates = pivot_rates_query.cte("stored_rates")
+        pivot_rates = union_all(
+            select(stored_rates),
+            select(
+                literal(self._pivot_currency_id).label("currency_id"),
+                *[stored_rates.c[column] for column in period_columns],
+                literal(1.0).label("rate"),
+            ).distinct(),
+        ).cte("pivot_rates")
+
+        rate_from = pivot_rates.alias("rate_from")
+        rate_to = pivot_rates.alias("rate_to")
+
         return (
             select(
-                ExchangeRate.from_currency_id,
-                ExchangeRate.to_currency_id,
-                func.strftime("%Y-%m", func.max(ExchangeRate.date)).label("month"),
-                ExchangeRate.rate,
+                rate_from.c.currency_id.label("from_currency_id"),
+                rate_to.c.currency_id.label("to_currency_id"),
+                *[rate_from.c[column] for column in period_columns],
+                (rate_to.c.rate / rate_from.c.rate).label("rate"),
             )
-            .select_from(ExchangeRate)
-            .where(ExchangeRate.to_currency_id == base_currency_id)
-            .where(ExchangeRate.from_currency_id.in_(currency_ids))
-            .where(ExchangeRate.date <= self.date.strftime("%Y-%m-%d"))
-            .group_by(func.strftime("%Y-%m", ExchangeRate.date))
-            .order_by(ExchangeRate.date)
+            .select_from(rate_from)
+            .join(rate_to, and_(true(), *[rate_from.c[column] == rate_to.c[column] for column in period_columns]))
+            .where(rate_to.c.currency_id == base_currency_id)
+            .where(rate_from.c.currency_id.in_(currency_ids))
+            .order_by(*[rate_from.c[column] for column in period_columns], rate_from.c.currency_id)
         )
 
     @property
-    def _exchange_rates_df(self) -> Self:
-        with Session(self.engine) as session:
-            df = pd.read_sql(self._exchange_rates_query, cast(Connection, session.bind)).astype(
-                dtype={
-                    "from_currency_id": "int64",
-                    "to_currency_id": "int64",
-                    "month": "string",
-                    "rate": "float64",
-                }
-            )
-
-            df["month"] = df["month"].apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b-%y"))
+    def _exchange_rates_query(self) -> Selectable:
+        return self._cross_rates_query(
+            self._latest_per_group(
+                select(
+                    ExchangeRate.to_currency_id.label("currency_id"),
+                    ExchangeRate.month_key.label("month"),
+                    ExchangeRate.rate,
+                )
+                .where(ExchangeRate.from_currency_id == self._pivot_currency_id)
+                .where(ExchangeRate.to_currency_id != self._pivot_currency_id)
+                .where(ExchangeRate.day_key <= day_key(self.date)),
+                [ExchangeRate.from_currency_id, ExchangeRate.to_currency_id, ExchangeRate.month_key],
+                ExchangeRate.day_key,
+            ),
+            ["month"],
+        )
 
-        return df
+    @property
+    def _exchange_rates_df(self) -> DataFrame:
+        return self.context.read_sql(
+            self._exchange_rates_query,
+            {
+                "from_currency_id": "int64",
+                "to_currency_id": "int64",
+                "month": "int64",
+                "rate": "float64",
+            },
+        )
 
     def _add_exchange_rates(self) -> Self:
         self._df = self._df.merge(
@@ -91,6 +161,36 @@ class OutputCommand:
     def _prepare_df(self) -> None:
         raise NotImplementedError
 
+    @staticmethod
+    def _with_month_labels(df: DataFrame) -> DataFrame:
+        return df.assign(month=to_datetime(df["month"].astype("string"), format="%Y%m").dt.strftime("%b-%y"))
+
+    def _to_columnar_json(self, df: DataFrame) -> str:
+        values_by_column = {
+            str(column): df[column].to_json(orient="values", double_precision=self.columnar_precision)  # type: ignore[call-overload]
+            for column in df.columns
+        }
+
+        return f"{{{','.join(f'{json.dumps(column)}:{values}' for column, values in values_by_column.items())}}}"
+
+    def _to_json(self, df: DataFrame) -> str:
+        if self.output_format == OutputFormat.COLUMNAR:
+            return self._to_columnar_json(df)
+
+        return df.to_json(orient="records")
+
+    def write_data_file(self, file_name: str, content: str) -> None:
+        path = self.output_dir / file_name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(content)
+
+        os.replace(temp_path, path)
+
+        self._written_files[file_name] = content
+
     def _write_data_files(self) -> None:
         raise NotImplementedError
 
@@ -98,8 +198,7 @@ class OutputCommand:
         raise NotImplementedError
 
     def _read_db(self) -> Self:
-        with Session(self.engine) as session:
-            self._df = pd.read_sql(self._db_query, cast(Connection, session.bind)).astype(dtype=self._df_dtypes)
+        self._df = self.context.read_sql(self._db_query, self._df_dtypes)
 
         return self
 
@@ -109,7 +208,45 @@ class OutputCommand:
 
         return self
 
+    @property
+    def _cache_key(self) -> str | None:
+        if self.context.cache is None or not self.context.fingerprint:
+            return None
+
+        return self.context.cache.key(
+            type(self).__name__,
+            str(self.engine.url),
+            self.portfolio_id,
+            day_key(self.date),
+            self.currency_code,
+            self.output_format.value,
+            self.context.fingerprint,
+        )
+
+    def _write_cached_data_files(self, cache_key: str) -> bool:
+        files = self.context.cache.get(cache_key) if self.context.cache is not None else None
+
+        if files is None:
+            return False
+
+        for file_name, content in files.items():
+            self.write_data_file(file_name, content)
+
+        return True
+
+    def _cache_data_files(self, cache_key: str) -> None:
+        if self.context.cache is not None:
+            self.context.cache.put(cache_key, self._written_files)
+
     def execute(self) -> None:
+        cache_key = self._cache_key
+
+        if cache_key is not None and self._write_cached_data_files(cache_key):
+            return
+
         self._prepare_df()
 
         self._write_data_files()
+
+        if cache_key is not None:
+            self._cache_data_files(cache_key)
@@ -1,17 +1,17 @@
 import json
-from sqlite3 import Connection
-from typing import Self, cast
+from typing import Self
 
-import pandas as pd
 from pandas import DataFrame
 from sqlalchemy import Selectable, func, select
-from sqlalchemy.orm import Session
 
 from pyp.cli.commands.output.base import OutputCommand
-from pyp.database.models import ExchangeRate, PortfolioStocks, Price, Share, Stock
+from pyp.database.models import ExchangeRate, PortfolioStocks, Price, Share, Stock, day_key
 
 
 class OutputBreakdownCommand(OutputCommand):
+    data_file_name = "parts/breakdown.js"
+    assembled_file_name = "breakdown.js"
+
     @property
     def _db_query(self) -> Selectable:
         return (
@@ -25,17 +25,17 @@ class OutputBreakdownCommand(OutputCommand):
                     select(Price.amount)
                     .select_from(Price)
                     .where(Price.stock_id == Stock.id)
-                    .where(Price.date <= self.date.strftime("%Y-%m-%d"))
-                    .order_by(Price.date.desc())
+                    .where(Price.day_key <= day_key(self.date))
+                    .order_by(Price.day_key.desc())
                     .limit(1)
                     .scalar_subquery()
                 ).label("price"),
             )
             .join(Share.portfolio_stocks)
             .join(PortfolioStocks.stock)
-            .where(Share.purchased_on <= self.date.strftime("%Y-%m-%d"))
+            .where(Share.day_key <= day_key(self.date))
             .where(PortfolioStocks.portfolio_id == self.portfolio_id)
-            .group_by(Stock.moniker)
+            .group_by(Stock.id)
         )
 
     @property
@@ -51,38 +51,28 @@ class OutputBreakdownCommand(OutputCommand):
 
     @property
     def _exchange_rates_query(self) -> Selectable:
-        base_currency_id = self._currency_ids_by_code[self.currency_code]
-        currency_ids = [
-            currency_id for currency_id in self._currency_ids_by_code.values() if currency_id != base_currency_id
-        ]
-
-        return (
-            select(
-                ExchangeRate.from_currency_id,
-                ExchangeRate.to_currency_id,
-                func.max(ExchangeRate.date).label("date"),
-                ExchangeRate.rate,
-            )
-            .select_from(ExchangeRate)
-            .where(ExchangeRate.to_currency_id == base_currency_id)
-            .where(ExchangeRate.from_currency_id.in_(currency_ids))
-            .where(ExchangeRate.date <= self.date.strftime("%Y-%m-%d"))
-            .group_by(ExchangeRate.from_currency_id, ExchangeRate.to_currency_id)
+        return self._cross_rates_query(
+            self._latest_per_group(
+                select(ExchangeRate.to_currency_id.label("currency_id"), ExchangeRate.rate)
+                .where(ExchangeRate.from_currency_id == self._pivot_currency_id)
+                .where(ExchangeRate.to_currency_id != self._pivot_currency_id)
+                .where(ExchangeRate.day_key <= day_key(self.date)),
+                [ExchangeRate.from_currency_id, ExchangeRate.to_currency_id],
+                ExchangeRate.day_key,
+            ),
+            [],
         )
 
     @property
-    def _exchange_rates_df(self) -> Self:
-        with Session(self.engine) as session:
-            df = pd.read_sql(self._exchange_rates_query, cast(Connection, session.bind)).astype(
-                dtype={
-                    "from_currency_id": "int64",
-                    "to_currency_id": "int64",
-                    "date": "string",
-                    "rate": "float64",
-                }
-            )
-
-        return df
+    def _exchange_rates_df(self) -> DataFrame:
+        return self.context.read_sql(
+            self._exchange_rates_query,
+            {
+                "from_currency_id": "int64",
+                "to_currency_id": "int64",
+                "rate": "float64",
+            },
+        )
 
     def _add_exchange_rates(self) -> Self:
         self._df = self._df.merge(
@@ -102,7 +92,7 @@ class OutputBreakdownCommand(OutputCommand):
         self._df["amount"] = self._df["amount"] * self._df["rate"]
         self._df["value"] = self._df["value"] * self._df["rate"]
 
-        self._df = self._df.drop(columns=["rate", "date"])
+        self._df = self._df.drop(columns=["rate"])
 
         return self
 
@@ -150,11 +140,13 @@ class OutputBreakdownCommand(OutputCommand):
         )
 
     def _write_data_files(self) -> None:
-        by_moniker_json_string = self._moniker_breakdown_df.to_json(orient="records")
-        by_stock_type_json_string = self._stock_type_breakdown_df.to_json(orient="records")
-        by_sector_json_string = self._sector_breakdown_df.to_json(orient="records")
-
-        with open(self.output_dir / "breakdown.js", "w") as file:
-            file.write(f"breakdown_by_moniker_data = {by_moniker_json_string}\n")
-            file.write(f"breakdown_by_stock_type_data = {by_stock_type_json_string}\n")
-            file.write(f"breakdown_by_sector_data = {by_sector_json_string}\n")
+        by_moniker_json_string = self._to_json(self._moniker_breakdown_df)
+        by_stock_type_json_string = self._to_json(self._stock_type_breakdown_df)
+        by_sector_json_string = self._to_json(self._sector_breakdown_df)
+
+        self.write_data_file(
+            self.data_file_name,
+            f"breakdown_by_moniker_data = {by_moniker_json_string}\n"
+            f"breakdown_by_stock_type_data = {by_stock_type_json_string}\n"
+            f"breakdown_by_sector_data = {by_sector_json_string}\n",
+        )
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from threading import Lock
+
+
+class OutputCache:
+    cache_dir = Path(__file__).parent.parent.parent.parent.parent.parent / ".cache/output"
+    max_size = 64 * 1024 * 1024
+
+    def __init__(self, cache_dir: Path | None = None, max_size: int | None = None):
+        self.cache_dir = cache_dir if cache_dir is not None else self.cache_dir
+        self.max_size = max_size if max_size is not None else self.max_size
+
+        self._lock = Lock()
+
+    @staticmethod
+    def key(*parts: object) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, str] | None:
+        path = self._path(key)
+
+        try:
+            with open(path, "r") as file:
+                files = json.loads(file.read())
+
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        return files
+
+    def _evict(self) -> None:
+        entries = [(path.stat().st_mtime, path.stat().st_size, path) for path in self.cache_dir.glob("*.json")]
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_size:
+                break
+
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+    def put(self, key: str, files: dict[str, str]) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+        with open(temp_path, "w") as file:
+            file.write(json.dumps(files))
+
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._evict()
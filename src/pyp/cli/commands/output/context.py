@@ -0,0 +1,68 @@
+from threading import Lock
+from typing import Hashable, cast
+
+import pandas as pd
+from pandas import DataFrame
+from sqlalchemy import Connection, Engine, Selectable, inspect, select
+from sqlalchemy.orm import Session
+
+from pyp.cli.commands.output.cache import OutputCache
+from pyp.database.models import Currency, TableVersion
+
+
+class OutputContext:
+    def __init__(self, engine: Engine, portfolio_ids: list[int] | None = None, cache: OutputCache | None = None):
+        self.engine = engine
+        self.portfolio_ids = portfolio_ids
+        self.cache = cache
+
+        self._currency_ids_by_code: dict[str, int] | None = None
+        self._fingerprint: tuple[tuple[str, int], ...] | None = None
+        self._frames: dict[Hashable, DataFrame] = dict()
+        self._lock = Lock()
+        self._frame_locks: dict[Hashable, Lock] = dict()
+
+    @property
+    def currency_ids_by_code(self) -> dict[str, int]:
+        with self._lock:
+            if self._currency_ids_by_code is None:
+                with Session(self.engine) as session:
+                    self._currency_ids_by_code = {c.code: c.id for c in session.scalars(select(Currency)).all()}
+
+        return dict(self._currency_ids_by_code)
+
+    @property
+    def fingerprint(self) -> tuple[tuple[str, int], ...]:
+        with self._lock:
+            if self._fingerprint is None:
+                with Session(self.engine) as session:
+                    if inspect(cast(Connection, session.bind)).has_table(TableVersion.__tablename__):
+                        self._fingerprint = tuple(
+                            (table_name, version)
+                            for table_name, version in session.execute(
+                                select(TableVersion.table_name, TableVersion.version).order_by(TableVersion.table_name)
+                            ).all()
+                        )
+                    else:
+                        self._fingerprint = tuple()
+
+        return self._fingerprint
+
+    @staticmethod
+    def _frame_key(query: Selectable, dtypes: dict[str, str]) -> Hashable:
+        compiled = query.compile()
+
+        return str(compiled), repr(sorted(compiled.params.items())), tuple(sorted(dtypes.items()))
+
+    def read_sql(self, query: Selectable, dtypes: dict[str, str]) -> DataFrame:
+        key = self._frame_key(query, dtypes)
+
+        with self._lock:
+            frame_lock = self._frame_locks.setdefault(key, Lock())
+
+        with frame_lock:
+            if key not in self._frames:
+                with Session(self.engine) as session:
+                    self._frames[key] = pd.read_sql(query, cast(Connection, session.bind)).astype(dtype=dtypes)
+
+        return self._frames[key].copy(deep=True)
@@ -1,16 +1,15 @@
-from datetime import datetime
-from typing import Self, cast
+from typing import Self
 
-import pandas as pd
 from pandas import DataFrame
-from sqlalchemy import Connection, Selectable, func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, Selectable, select, union_all
 
 from pyp.cli.commands.output.base import OutputCommand
-from pyp.database.models import PortfolioStocks, Price, Share, Stock
+from pyp.database.models import MonthlyPrice, PortfolioStocks, Price, Share, Stock, day_key, month_key
 
 
 class OutputGrowthCommand(OutputCommand):
+    data_file_name = "growth.js"
+
     @property
     def _db_query(self) -> Selectable:
         return (
@@ -19,13 +18,13 @@ class OutputGrowthCommand(OutputCommand):
                 Stock.stock_type,
                 Share.amount,
                 Share.price,
-                func.strftime("%Y-%m", Share.purchased_on).label("month"),
+                Share.month_key.label("month"),
             )
             .join(Share.portfolio_stocks)
             .join(PortfolioStocks.stock)
             .where(PortfolioStocks.portfolio_id == self.portfolio_id)
-            .where(Share.purchased_on <= self.date.strftime("%Y-%m-%d"))
-            .order_by(Share.purchased_on)
+            .where(Share.day_key <= day_key(self.date))
+            .order_by(Share.day_key)
         )
 
     @property
@@ -35,7 +34,7 @@ class OutputGrowthCommand(OutputCommand):
             "stock_type": "string",
             "amount": "float64",
             "price": "float64",
-            "month": "string",
+            "month": "int64",
         }
 
     def _rename_value_to_invested(self) -> Self:
@@ -57,38 +56,88 @@ class OutputGrowthCommand(OutputCommand):
         return self
 
     @property
-    def _monthly_prices_query(self) -> Selectable:
+    def _portfolio_stocks_query(self) -> Select:
+        return select(PortfolioStocks.portfolio_id, PortfolioStocks.stock_id).where(
+            PortfolioStocks.portfolio_id.in_(self._portfolio_ids)
+        )
+
+    @property
+    def _portfolio_stock_ids(self) -> list[int]:
+        df = self.context.read_sql(self._portfolio_stocks_query, {"portfolio_id": "int64", "stock_id": "int64"})
+
+        return df[df["portfolio_id"] == self.portfolio_id]["stock_id"].to_list()
+
+    @property
+    def _closed_monthly_prices_query(self) -> Select:
         return (
             select(
+                Stock.id.label("stock_id"),
                 Stock.moniker,
                 Stock.stock_type,
                 Stock.currency_id,
-                func.strftime("%Y-%m", func.max(Price.date)).label("month"),
-                Price.amount.label("market_price"),
+                MonthlyPrice.year_month.label("month"),
+                MonthlyPrice.close.label("market_price"),
+                MonthlyPrice.date,
             )
-            .select_from(Price)
-            .join(Price.stock)
-            .join(Stock.portfolio_stocks)
-            .where(PortfolioStocks.portfolio_id == self.portfolio_id)
-            .where(Price.date <= self.date.strftime("%Y-%m-%d"))
-            .group_by(Stock.moniker, func.strftime("%Y-%m", Price.date))
-            .order_by(Price.date)
+            .select_from(MonthlyPrice)
+            .join(MonthlyPrice.stock)
+            .where(MonthlyPrice.stock_id.in_(self._portfolio_stocks_query.with_only_columns(PortfolioStocks.stock_id)))
+            .where(MonthlyPrice.year_month < month_key(self.date))
         )
 
     @property
-    def _monthly_prices_df(self) -> DataFrame:
-        with Session(self.engine) as session:
-            df = pd.read_sql(self._monthly_prices_query, cast(Connection, session.bind)).astype(
-                dtype={
-                    "moniker": "string",
-                    "stock_type": "string",
-                    "currency_id": "int64",
-                    "month": "string",
-                    "market_price": "float64",
-                }
+    def _current_monthly_prices_query(self) -> Select:
+        latest_prices = self._latest_per_group(
+            select(Price.stock_id, Price.date, Price.month_key, Price.amount)
+            .where(Price.stock_id.in_(self._portfolio_stocks_query.with_only_columns(PortfolioStocks.stock_id)))
+            .where(Price.day_key >= day_key(self.date.replace(day=1)))
+            .where(Price.day_key <= day_key(self.date)),
+            [Price.stock_id],
+            Price.day_key,
+        ).subquery()
+
+        return (
+            select(
+                Stock.id.label("stock_id"),
+                Stock.moniker,
+                Stock.stock_type,
+                Stock.currency_id,
+                latest_prices.c.month_key.label("month"),
+                latest_prices.c.amount.label("market_price"),
+                latest_prices.c.date,
             )
+            .select_from(latest_prices)
+            .join(Stock, Stock.id == latest_prices.c.stock_id)
+        )
+
+    @property
+    def _monthly_prices_query(self) -> Selectable:
+        monthly_prices = union_all(self._closed_monthly_prices_query, self._current_monthly_prices_query).subquery()
 
-        return df
+        return select(
+            monthly_prices.c.stock_id,
+            monthly_prices.c.moniker,
+            monthly_prices.c.stock_type,
+            monthly_prices.c.currency_id,
+            monthly_prices.c.month,
+            monthly_prices.c.market_price,
+        ).order_by(monthly_prices.c.date, monthly_prices.c.moniker)
+
+    @property
+    def _monthly_prices_df(self) -> DataFrame:
+        df = self.context.read_sql(
+            self._monthly_prices_query,
+            {
+                "stock_id": "int64",
+                "moniker": "string",
+                "stock_type": "string",
+                "currency_id": "int64",
+                "month": "int64",
+                "market_price": "float64",
+            },
+        )
+
+        return df[df["stock_id"].isin(self._portfolio_stock_ids)].drop(columns=["stock_id"]).reset_index(drop=True)
 
     def _add_monthly_market_prices(self) -> Self:
         self._df = self._monthly_prices_df.merge(
@@ -101,8 +150,6 @@ class OutputGrowthCommand(OutputCommand):
         self._df[["amount", "invested"]] = self._df[["amount", "invested"]].fillna(0, axis="columns")
         self._df["amount"] = self._df.groupby("moniker")["amount"].cumsum()
 
-        self._df["month"] = self._df["month"].apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b-%y"))
-
         return self
 
     def _compute_market_value(self) -> Self:
@@ -175,7 +222,6 @@ class OutputGrowthCommand(OutputCommand):
         )
 
     def _write_data_files(self) -> None:
-        json_string = self._df.drop(columns=["stock_type"]).to_json(orient="records")
+        json_string = self._to_json(self._with_month_labels(self._df.drop(columns=["stock_type"])))
 
-        with open(self.output_dir / "growth.js", "w") as file:
-            file.write(f"growth_data = {json_string}")
+        self.write_data_file(self.data_file_name, f"growth_data = {json_string}")
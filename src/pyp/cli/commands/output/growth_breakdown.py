@@ -6,6 +6,9 @@ from pyp.cli.commands.output.growth import OutputGrowthCommand
 
 
 class OutputGrowthBreakdownCommand(OutputGrowthCommand):
+    data_file_name = "parts/growth_breakdown.js"
+    assembled_file_name = "breakdown.js"
+
     def _compute_cumulative_sums(self) -> Self:
         self._df["cum_sum_invested"] = self._df.groupby(["moniker"], sort=False)["invested"].cumsum()
 
@@ -13,6 +16,16 @@ class OutputGrowthBreakdownCommand(OutputGrowthCommand):
 
         return self
 
+    def _month_vs_moniker_df(self, stock_type: str, column: str) -> DataFrame:
+        df = self._df[self._df["stock_type"] == stock_type]
+
+        return (
+            df.pivot(index="month", columns="moniker", values=column)
+            .reindex(index=sorted(df["month"].unique()), columns=df["moniker"].unique().tolist())
+            .rename_axis(index="month", columns=None)
+            .reset_index()
+        )
+
     def _prepare_df(self) -> None:
         (
             self._read_db()
@@ -32,43 +45,26 @@ class OutputGrowthBreakdownCommand(OutputGrowthCommand):
 
     @property
     def _equity_month_vs_profit_ratio_df(self) -> DataFrame:
-        df = self._df[self._df["stock_type"] == "EQUITY"].copy(deep=True)
-        df = df[["month", "moniker", "profit_ratio"]]
-
-        data = {
-            "month": df["month"].unique(),
-        }
-
-        for moniker in df["moniker"].unique():
-            data[moniker] = df[df["moniker"] == moniker]["profit_ratio"].to_list()
-
-        return DataFrame(data=data)
+        return self._month_vs_moniker_df("EQUITY", "profit_ratio")
 
     @property
     def _etf_month_vs_profit_ratio_df(self) -> DataFrame:
-        df = self._df[self._df["stock_type"] == "ETF"].copy(deep=True)
-        df = df[["month", "moniker", "profit_ratio"]]
-
-        data = {
-            "month": df["month"].unique(),
-        }
-
-        for moniker in df["moniker"].unique():
-            data[moniker] = df[df["moniker"] == moniker]["profit_ratio"].to_list()
-
-        return DataFrame(data=data)
+        return self._month_vs_moniker_df("ETF", "profit_ratio")
 
     def _write_data_files(self) -> None:
-        equity_json_string = self._equity_month_vs_profit_ratio_df.to_json(orient="records")
-        etf_json_string = self._etf_month_vs_profit_ratio_df.to_json(orient="records")
+        equity_json_string = self._to_json(self._with_month_labels(self._equity_month_vs_profit_ratio_df))
+        etf_json_string = self._to_json(self._with_month_labels(self._etf_month_vs_profit_ratio_df))
 
         growth_breakdown_by_stock_type = f'{{"EQUITY": {equity_json_string}, "ETF": {etf_json_string}}}'
 
-        with open(self.output_dir / "breakdown.js", "a") as file:
-            file.write(f"growth_breakdown_by_stock_type_data = {growth_breakdown_by_stock_type}\n")
+        self.write_data_file(
+            self.data_file_name, f"growth_breakdown_by_stock_type_data = {growth_breakdown_by_stock_type}\n"
+        )
 
 
 class OutputGrowthBreakdownMonthOverMonthCommand(OutputGrowthBreakdownCommand):
+    data_file_name = "parts/growth_breakdown_mom.js"
+
     def _convert_to_currency(self) -> Self:
         self._df["invested"] = self._df["invested"] * self._df["rate"]
         self._df["market_price"] = self._df["market_price"] * self._df["rate"]
@@ -100,37 +96,18 @@ class OutputGrowthBreakdownMonthOverMonthCommand(OutputGrowthBreakdownCommand):
 
     @property
     def _equity_month_over_month_ratio_df(self) -> DataFrame:
-        df = self._df[self._df["stock_type"] == "EQUITY"].copy(deep=True)
-        df = df[["month", "moniker", "month_over_month_ratio"]]
-
-        data = {
-            "month": df["month"].unique(),
-        }
-
-        for moniker in df["moniker"].unique():
-            data[moniker] = df[df["moniker"] == moniker]["month_over_month_ratio"].to_list()
-
-        return DataFrame(data=data)
+        return self._month_vs_moniker_df("EQUITY", "month_over_month_ratio")
 
     @property
     def _etf_month_over_month_ratio_df(self) -> DataFrame:
-        df = self._df[self._df["stock_type"] == "ETF"].copy(deep=True)
-        df = df[["month", "moniker", "month_over_month_ratio"]]
-
-        data = {
-            "month": df["month"].unique(),
-        }
-
-        for moniker in df["moniker"].unique():
-            data[moniker] = df[df["moniker"] == moniker]["month_over_month_ratio"].to_list()
-
-        return DataFrame(data=data)
+        return self._month_vs_moniker_df("ETF", "month_over_month_ratio")
 
     def _write_data_files(self) -> None:
-        equity_json_string = self._equity_month_over_month_ratio_df.to_json(orient="records")
-        etf_json_string = self._etf_month_over_month_ratio_df.to_json(orient="records")
+        equity_json_string = self._to_json(self._with_month_labels(self._equity_month_over_month_ratio_df))
+        etf_json_string = self._to_json(self._with_month_labels(self._etf_month_over_month_ratio_df))
 
         growth_breakdown_by_stock_type = f'{{"EQUITY": {equity_json_string}, "ETF": {etf_json_string}}}'
 
-        with open(self.output_dir / "breakdown.js", "a") as file:
-            file.write(f"growth_breakdown_mom_by_stock_type_data = {growth_breakdown_by_stock_type}\n")
+        self.write_data_file(
+            self.data_file_name, f"growth_breakdown_mom_by_stock_type_data = {growth_breakdown_by_stock_type}\n"
+        )
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pyp.cli.commands.output.base import OutputCommand
+
+
+class OutputRunner:
+    def __init__(self, commands: list[OutputCommand], jobs: int = 1):
+        self.commands = commands
+        self.jobs = jobs
+
+    def _run_commands(self) -> None:
+        if self.jobs == 1:
+            for command in self.commands:
+                command.execute()
+
+            return
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [executor.submit(command.execute) for command in self.commands]
+
+            for future in futures:
+                future.result()
+
+    @property
+    def _commands_by_assembled_file(self) -> dict[tuple[Path, str], list[OutputCommand]]:
+        commands_by_assembled_file: dict[tuple[Path, str], list[OutputCommand]] = dict()
+
+        for command in self.commands:
+            if command.assembled_file_name is not None:
+                assembled_file = (command.output_dir, command.assembled_file_name)
+                commands_by_assembled_file.setdefault(assembled_file, []).append(command)
+
+        return commands_by_assembled_file
+
+    def _assemble_data_files(self) -> None:
+        for (_, file_name), commands in self._commands_by_assembled_file.items():
+            content = "".join((command.output_dir / command.data_file_name).read_text() for command in commands)
+
+            commands[0].write_data_file(file_name, content)
+
+    def execute(self) -> None:
+        self._run_commands()
+
+        self._assemble_data_files()
@@ -1,21 +1,35 @@
 import json
 from datetime import datetime
+from pathlib import Path
 from typing import Self
 
 import numpy as np
 from sqlalchemy import Engine
 
+from pyp.cli.commands.output.base import OutputFormat
+from pyp.cli.commands.output.context import OutputContext
 from pyp.cli.commands.output.growth import OutputGrowthCommand
 
 
 class OutputSummaryCommand(OutputGrowthCommand):
+    data_file_name = "summary.js"
+
     def __init__(
-        self, engine: Engine, username: str, portfolio_name: str, portfolio_id: int, date: datetime, currency_code: str
+        self,
+        engine: Engine,
+        username: str,
+        portfolio_name: str,
+        portfolio_id: int,
+        date: datetime,
+        currency_code: str,
+        context: OutputContext | None = None,
+        output_format: OutputFormat = OutputFormat.RECORDS,
+        output_dir: Path | None = None,
     ):
         self.username = username
         self.portfolio_name = portfolio_name
 
-        super().__init__(engine, portfolio_id, date, currency_code)
+        super().__init__(engine, portfolio_id, date, currency_code, context, output_format, output_dir)
 
     def _compute_market_value(self) -> Self:
         self._df["value"] = self._df["amount"] * self._df["market_price"]
@@ -96,8 +110,9 @@ class OutputSummaryCommand(OutputGrowthCommand):
         }
         summary_json = json.dumps(summary)
 
-        portfolio_json = self._df.to_json(orient="records")
+        portfolio_json = self._to_json(self._df)
 
-        with open(self.output_dir / "summary.js", "w") as file:
-            file.write(f"summary_data = {summary_json}\n")
-            file.write(f"portfolio_data = {portfolio_json}\n")
+        self.write_data_file(
+            self.data_file_name,
+            f"summary_data = {summary_json}\nportfolio_data = {portfolio_json}\n",
+        )
@@ -1,24 +1,33 @@
+import csv
+import gzip
 import json
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 
 from sqlalchemy import Engine, select
-from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 
-from pyp.database.models import Base, Currency, ExchangeRate
+from pyp.cli.db.commands import UpgradeCommand
+from pyp.database.models import (
+    Currency,
+    ExchangeRate,
+    day_key,
+    month_key,
+)
+from pyp.database.statements import insert, prepare_table_versions_bump_statement
 
 
 class SetupCommand:
     data_path: Path = Path(__file__).parent.parent.parent.parent.parent / "data"
     _currency_id_by_code: dict[str, int]
 
-    def __init__(self, engine: Engine, seed: bool = False):
+    def __init__(self, engine: Engine, seed: bool = False, pivot_only: bool = False):
         self.engine = engine
         self.seed = seed
+        self.pivot_only = pivot_only
 
-    def _create_schema(self) -> None:
-        Base.metadata.create_all(self.engine)
+    def _upgrade_schema(self) -> None:
+        UpgradeCommand(self.engine).execute()
 
     def _read_currencies(self) -> list[dict]:
         with open(self.data_path / "currencies.json", "r") as file:
@@ -28,7 +37,7 @@ class SetupCommand:
 
     def _seed_currencies(self) -> None:
         with Session(self.engine) as session:
-            statement = insert(Currency).values(self._read_currencies())
+            statement = insert(Currency, self.engine.dialect.name).values(self._read_currencies())
             statement = statement.on_conflict_do_nothing(index_elements=["code"])
 
             session.execute(statement)
@@ -38,7 +47,7 @@ class SetupCommand:
         with Session(self.engine) as session:
             self._currency_id_by_code = {c.code: c.id for c in session.scalars(select(Currency)).all()}
 
-    def _read_exchange_rates_for_code(self, code: str) -> list[dict]:
+    def _read_exchange_rate_files_for_code(self, code: str) -> list[dict]:
         exchange_rates = []
 
         currency_exchange_rates_path = self.data_path / "exchange_rates" / code
@@ -50,28 +59,67 @@ class SetupCommand:
                     {
                         "from_currency_id": self._currency_id_by_code[code],
                         "to_currency_id": self._currency_id_by_code[to_code],
-                        "date": datetime.strptime(exchange_rate_date, "%Y-%m-%d"),
+                        "date": exchange_rate_date,
                         "rate": rate,
+                        "day_key": day_key(exchange_rate_date),
+                        "month_key": month_key(exchange_rate_date),
                     }
-                    for exchange_rate_date, rates in contents["data"].items()
+                    for exchange_rate_date_str, rates in contents["data"].items()
+                    for exchange_rate_date in [datetime.strptime(exchange_rate_date_str, "%Y-%m-%d")]
                     for to_code, rate in rates.items()
+                    if to_code != code
                 ]
 
         return exchange_rates
 
+    def _read_exchange_rate_bundle_for_code(self, code: str) -> list[dict]:
+        from_currency_id = self._currency_id_by_code[code]
+
+        with gzip.open(self.data_path / "exchange_rates" / f"{code}.csv.gz", "rt", newline="") as file:
+            return [
+                {
+                    "from_currency_id": from_currency_id,
+                    "to_currency_id": self._currency_id_by_code[to_code],
+                    "date": date.fromisoformat(exchange_rate_date_str),
+                    "rate": float(rate),
+                    "day_key": exchange_rate_day_key,
+                    "month_key": exchange_rate_day_key // 100,
+                }
+                for exchange_rate_date_str, to_code, rate in csv.reader(file)
+                if to_code != code
+                for exchange_rate_day_key in [int(exchange_rate_date_str.replace("-", ""))]
+            ]
+
+    def _read_exchange_rates_for_code(self, code: str) -> list[dict]:
+        if (self.data_path / "exchange_rates" / f"{code}.csv.gz").exists():
+            return self._read_exchange_rate_bundle_for_code(code)
+
+        return self._read_exchange_rate_files_for_code(code)
+
+    @property
+    def _exchange_rate_codes(self) -> list[str]:
+        if self.pivot_only:
+            return [min(self._currency_id_by_code, key=lambda code: self._currency_id_by_code[code])]
+
+        return list(self._currency_id_by_code.keys())
+
     def _seed_exchange_rates(self) -> None:
+        statement = insert(ExchangeRate, self.engine.dialect.name).on_conflict_do_nothing(
+            index_elements=["from_currency_id", "to_currency_id", "date"]
+        )
+
         with Session(self.engine) as session:
-            for code in self._currency_id_by_code.keys():
-                statement = insert(ExchangeRate).values(self._read_exchange_rates_for_code(code))
-                statement = statement.on_conflict_do_nothing(
-                    index_elements=["from_currency_id", "to_currency_id", "date"]
-                )
+            for code in self._exchange_rate_codes:
+                exchange_rates = self._read_exchange_rates_for_code(code)
+
+                if exchange_rates:
+                    session.execute(statement, exchange_rates)
+                    session.execute(prepare_table_versions_bump_statement(ExchangeRate))
 
-                session.execute(statement)
                 session.commit()
 
     def execute(self) -> None:
-        self._create_schema()
+        self._upgrade_schema()
 
         if self.seed:
             self._seed_currencies()
@@ -1,12 +1,17 @@
+from pathlib import Path
+from typing import Sequence
+
+import typer
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from pyp.database.engine import engine
+from pyp.cli.commands.output.base import OutputCommand
+from pyp.database.engine import get_engine
 from pyp.database.models import Portfolio, User
 
 
 def resolve_portfolio(username: str, portfolio_name: str) -> Portfolio:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         portfolio: Portfolio = session.scalars(
             select(Portfolio)
             .where(Portfolio.name == portfolio_name)
@@ -14,3 +19,34 @@ def resolve_portfolio(username: str, portfolio_name: str) -> Portfolio:
         ).one()
 
     return portfolio
+
+
+def resolve_portfolios(username: str | None = None) -> Sequence[Portfolio]:
+    statement = select(Portfolio).options(joinedload(Portfolio.user)).order_by(Portfolio.id)
+
+    if username is not None:
+        statement = statement.where(Portfolio.user.has(User.username == username))
+
+    with Session(get_engine()) as session:
+        portfolios = session.scalars(statement).all()
+
+    return portfolios
+
+
+def is_path_component(name: str) -> bool:
+    return name not in ("", ".", "..") and "\0" not in name and "\\" not in name and Path(name).name == name
+
+
+def resolve_output_dir(portfolio: Portfolio) -> Path:
+    output_dir = OutputCommand.output_dir / portfolio.user.username / portfolio.name
+
+    if (
+        not is_path_component(portfolio.user.username)
+        or not is_path_component(portfolio.name)
+        or not output_dir.resolve().is_relative_to(OutputCommand.output_dir.resolve())
+    ):
+        raise typer.BadParameter(
+            f"The portfolio '{portfolio.name}' of user '{portfolio.user.username}' can not be used as a directory name."
+        )
+
+    return output_dir
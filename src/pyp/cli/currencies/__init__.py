@@ -4,7 +4,7 @@ import typer
 from typer import Typer
 
 from pyp.cli.currencies.commands import AddCurrencyCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 currency_app = Typer(name="currency", help="Manage currency DB entities.")
 
@@ -14,4 +14,4 @@ def add(
     code: Annotated[str, typer.Argument(help="The short code of the currency. (e.g. USD)")],
     name: Annotated[str, typer.Argument(help="The name of the currency. (e.g. United States Dollar)")],
 ) -> None:
-    AddCurrencyCommand(engine, code, name).execute()
+    AddCurrencyCommand(get_engine(), code, name).execute()
@@ -0,0 +1,13 @@
+from typer import Typer
+
+from pyp.cli.data.commands import PackCommand
+
+data_app = Typer(name="data", help="Manage the seed data bundled with the project.")
+
+
+@data_app.command(
+    name="pack",
+    help="Pack the exchange rate files of every currency into a single compressed bundle that setup seeds from.",
+)
+def pack() -> None:
+    PackCommand().execute()
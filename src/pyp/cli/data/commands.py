@@ -0,0 +1,51 @@
+import csv
+import gzip
+import io
+import json
+from pathlib import Path
+
+
+class PackCommand:
+    data_path: Path = Path(__file__).parent.parent.parent.parent.parent / "data"
+
+    def __init__(self, data_path: Path | None = None):
+        self.data_path = data_path if data_path is not None else self.data_path
+
+    @property
+    def _exchange_rates_path(self) -> Path:
+        return self.data_path / "exchange_rates"
+
+    @property
+    def _codes(self) -> list[str]:
+        return sorted(path.name for path in self._exchange_rates_path.iterdir() if path.is_dir())
+
+    def _read_exchange_rates_for_code(self, code: str) -> list[tuple[str, str, float]]:
+        exchange_rates = []
+
+        for file_path in sorted((self._exchange_rates_path / code).glob("*.json")):
+            with open(file_path, "r") as file:
+                contents = json.loads(file.read())
+                exchange_rates += [
+                    (exchange_rate_date_str, to_code, rate)
+                    for exchange_rate_date_str, rates in contents["data"].items()
+                    for to_code, rate in rates.items()
+                ]
+
+        return exchange_rates
+
+    def _write_bundle(self, code: str, exchange_rates: list[tuple[str, str, float]]) -> Path:
+        bundle_path = self._exchange_rates_path / f"{code}.csv.gz"
+
+        with open(bundle_path, "wb") as file:
+            with gzip.GzipFile(fileobj=file, mode="wb", mtime=0) as archive:
+                with io.TextIOWrapper(archive, newline="") as text_file:
+                    csv.writer(text_file).writerows(exchange_rates)
+
+        return bundle_path
+
+    def execute(self) -> None:
+        for code in self._codes:
+            exchange_rates = self._read_exchange_rates_for_code(code)
+            bundle_path = self._write_bundle(code, exchange_rates)
+
+            print(f"Packed {len(exchange_rates)} {code} exchange rates into {bundle_path.name}.")
@@ -0,0 +1,34 @@
+from typing import Annotated, Optional
+
+import typer
+from typer import Typer
+
+from pyp.cli.db.commands import StatusCommand, UpgradeCommand
+from pyp.database.engine import get_engine
+from pyp.database.migrations import Migration
+
+db_app = Typer(name="db", help="Manage the database schema.")
+
+
+@db_app.command(name="upgrade", help="Apply the pending schema migrations.")
+def upgrade(
+    target_version: Annotated[
+        Optional[int],
+        typer.Option("--to", metavar="VERSION", min=1, help="Only apply the migrations up to this version."),
+    ] = None,
+    batch_size: Annotated[
+        int,
+        typer.Option(
+            "--batch-size",
+            "-b",
+            min=1,
+            help="The number of rows to backfill or copy per transaction, so the database stays usable meanwhile.",
+        ),
+    ] = Migration.batch_size,
+) -> None:
+    UpgradeCommand(get_engine(), target_version, batch_size).execute()
+
+
+@db_app.command(name="status", help="List the schema migrations and whether they are applied.")
+def status() -> None:
+    StatusCommand(get_engine()).execute()
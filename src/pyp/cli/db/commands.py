@@ -0,0 +1,71 @@
+from datetime import datetime
+from time import perf_counter
+
+from sqlalchemy import Engine, inspect, select
+from sqlalchemy.orm import Session
+
+from pyp.database.migrations import Migration, migrations
+from pyp.database.models import Base, SchemaMigration
+
+
+class StatusCommand:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+        self._applied_at_by_version: dict[int, datetime] = dict()
+
+    def _resolve_applied_migrations(self) -> None:
+        if not inspect(self.engine).has_table(SchemaMigration.__tablename__):
+            return
+
+        with Session(self.engine) as session:
+            self._applied_at_by_version = {
+                m.version: m.applied_at for m in session.scalars(select(SchemaMigration)).all()
+            }
+
+    def execute(self) -> None:
+        self._resolve_applied_migrations()
+
+        for migration in migrations:
+            applied_at = self._applied_at_by_version.get(migration.version)
+            state = f"applied {applied_at:%Y-%m-%d %H:%M:%S}" if applied_at is not None else "pending"
+
+            print(f"{migration.version:>4}  {migration.name:<40} {state}")
+
+
+class UpgradeCommand(StatusCommand):
+    def __init__(self, engine: Engine, target_version: int | None = None, batch_size: int | None = None):
+        super().__init__(engine)
+
+        self.target_version = target_version
+        self.batch_size = batch_size
+
+    def _create_schema(self) -> None:
+        Base.metadata.create_all(self.engine)
+
+    @property
+    def _pending_migrations(self) -> list[type[Migration]]:
+        return [
+            migration
+            for migration in migrations
+            if migration.version not in self._applied_at_by_version
+            and (self.target_version is None or migration.version <= self.target_version)
+        ]
+
+    def _apply(self, migration: type[Migration]) -> None:
+        started_at = perf_counter()
+
+        migration(self.engine, self.batch_size).upgrade()
+
+        with Session(self.engine) as session:
+            session.add(SchemaMigration(version=migration.version, name=migration.name, applied_at=datetime.now()))
+            session.commit()
+
+        print(f"Applied {migration.version} {migration.name} in {perf_counter() - started_at:.2f}s.")
+
+    def execute(self) -> None:
+        self._create_schema()
+        self._resolve_applied_migrations()
+
+        for migration in self._pending_migrations:
+            self._apply(migration)
@@ -1,17 +1,25 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Annotated, Optional
 
+import click
 import typer
 from dotenv import dotenv_values
 from typer import Typer
 
+from pyp.cli.ingest.commands.base import IngestBaseCommand
 from pyp.cli.ingest.commands.exchange_rates import IngestExchangeRatesCommand
+from pyp.cli.ingest.commands.response_cache import ResponseCache
 from pyp.cli.ingest.commands.stocks import IngestStocksCommand
-from pyp.database.engine import engine
+from pyp.database.engine import engine_profiles, get_engine, use_profile
 
 ingest_app = Typer(name="ingest", help="Ingest various market data from external services.")
 
 
+def _response_cache(offline: bool, cache: bool, cache_dir: Path) -> ResponseCache | None:
+    return ResponseCache(cache_dir, offline=offline) if cache or offline else None
+
+
 @ingest_app.command(
     name="exchange-rates",
     help="Ingest exchange rates from currencyapi.com.",
@@ -34,13 +42,73 @@ def exchange_rates(
             show_default=False,
         ),
     ],
+    batch_size: Annotated[
+        int,
+        typer.Option(
+            "--batch-size", "-b", min=1, help="The number of exchange rates to write per database round trip."
+        ),
+    ] = IngestBaseCommand.batch_size,
+    jobs: Annotated[
+        int,
+        typer.Option("--jobs", "-j", min=1, help="The number of days to fetch exchange rates for in parallel."),
+    ] = IngestExchangeRatesCommand.jobs,
+    requests_per_minute: Annotated[
+        int,
+        typer.Option(
+            "--requests-per-minute",
+            "-r",
+            min=1,
+            help="The maximum number of requests to send to currencyapi.com per minute.",
+        ),
+    ] = IngestExchangeRatesCommand.requests_per_minute,
+    pivot_only: Annotated[
+        bool,
+        typer.Option(
+            "--pivot-only",
+            help="Only store the exchange rates against the first currency, "
+            "the rates between the other currencies are derived from them.",
+        ),
+    ] = False,
+    offline: Annotated[
+        bool,
+        typer.Option("--offline", help="Replay the cached responses instead of fetching them over the network."),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="Keep the fetched responses and reuse the ones fetched less than an hour ago."),
+    ] = False,
+    cache_dir: Annotated[
+        Path,
+        typer.Option("--cache-dir", help="The directory to keep the cached responses in."),
+    ] = ResponseCache.cache_dir,
+    db_profile: Annotated[
+        str,
+        typer.Option(
+            "--db-profile",
+            click_type=click.Choice(list(engine_profiles)),
+            help="The SQLite pragma profile to open the database with.",
+        ),
+    ] = "ingest",
 ) -> None:
+    response_cache = _response_cache(offline, cache, cache_dir)
     config = dotenv_values()
 
-    if "FREE_CURRENCY_API_KEY" not in config or config["FREE_CURRENCY_API_KEY"] is None:
+    if not offline and config.get("FREE_CURRENCY_API_KEY") is None:
         raise ValueError("FREE_CURRENCY_API_KEY environment variable is not set.")
 
-    IngestExchangeRatesCommand(engine, start_date, end_date, config["FREE_CURRENCY_API_KEY"]).execute()
+    use_profile(get_engine(), db_profile)
+
+    IngestExchangeRatesCommand(
+        get_engine(),
+        start_date,
+        end_date,
+        config.get("FREE_CURRENCY_API_KEY") or "",
+        batch_size,
+        jobs,
+        requests_per_minute,
+        pivot_only,
+        response_cache,
+    ).execute()
 
 
 @ingest_app.command(name="stocks", help="Ingest various stocks from Yahoo Finance.")
@@ -78,11 +146,93 @@ def stocks(
             help="The monikers to exclude. Takes precedence over monikers to include.",
         ),
     ] = None,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            "--incremental",
+            "-i",
+            help="Only fetch the prices after the latest stored price of each moniker. "
+            "Monikers without any prices are fetched in full.",
+        ),
+    ] = False,
+    batch_size: Annotated[
+        int,
+        typer.Option("--batch-size", "-b", min=1, help="The number of prices to write per database round trip."),
+    ] = IngestBaseCommand.batch_size,
+    commit_every: Annotated[
+        Optional[int],
+        typer.Option(
+            "--commit-every",
+            min=1,
+            metavar="N",
+            help="Commit after every N monikers. By default the prices are committed after every chunk.",
+        ),
+    ] = None,
+    metadata_ttl_days: Annotated[
+        int,
+        typer.Option(
+            "--metadata-ttl",
+            min=0,
+            metavar="DAYS",
+            help="Only refresh the name, type and sectors of monikers last refreshed more than DAYS ago. "
+            "Use 0 to refresh all of them.",
+        ),
+    ] = IngestStocksCommand.metadata_ttl.days,
+    metadata_jobs: Annotated[
+        int,
+        typer.Option(
+            "--metadata-jobs",
+            min=1,
+            help="The number of monikers to fetch the name, type and sectors of in parallel.",
+        ),
+    ] = IngestStocksCommand.metadata_jobs,
+    chunk_size: Annotated[
+        int,
+        typer.Option(
+            "--chunk-size",
+            min=1,
+            help="The number of monikers to download and write the prices of at a time.",
+        ),
+    ] = IngestStocksCommand.chunk_size,
+    offline: Annotated[
+        bool,
+        typer.Option("--offline", help="Replay the cached responses instead of fetching them over the network."),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="Keep the fetched responses and reuse the ones fetched less than an hour ago."),
+    ] = False,
+    cache_dir: Annotated[
+        Path,
+        typer.Option("--cache-dir", help="The directory to keep the cached responses in."),
+    ] = ResponseCache.cache_dir,
+    db_profile: Annotated[
+        str,
+        typer.Option(
+            "--db-profile",
+            click_type=click.Choice(list(engine_profiles)),
+            help="The SQLite pragma profile to open the database with.",
+        ),
+    ] = "ingest",
 ) -> None:
+    response_cache = _response_cache(offline, cache, cache_dir)
+
+    if incremental and (start_date is not None or end_date is not None):
+        raise typer.BadParameter("The --incremental option can not be combined with --start-date or --end-date.")
+
+    use_profile(get_engine(), db_profile)
+
     IngestStocksCommand(
-        engine,
+        get_engine(),
         start_date=start_date,
         end_date=end_date,
         monikers=monikers,
         exclude_monikers=exclude_monikers,
+        incremental=incremental,
+        batch_size=batch_size,
+        commit_every=commit_every,
+        metadata_ttl=timedelta(days=metadata_ttl_days),
+        metadata_jobs=metadata_jobs,
+        response_cache=response_cache,
+        chunk_size=chunk_size,
     ).execute()
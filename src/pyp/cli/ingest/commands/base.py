@@ -1,15 +1,68 @@
-from sqlalchemy import Engine, select
+from typing import Callable, Iterator, TypeVar
+
+from sqlalchemy import Engine, Insert, select
 from sqlalchemy.orm import Session
 
-from pyp.database.models import Currency
+from pyp.cli.ingest.commands.response_cache import ResponseCache
+from pyp.database.models import Base, Currency
+from pyp.database.statements import prepare_table_versions_bump_statement
+
+T = TypeVar("T")
 
 
 class IngestBaseCommand:
     _currencies_by_code: dict[str, Currency]
+    _versioned_models: tuple[type[Base], ...] = ()
+    batch_size = 1000
 
-    def __init__(self, engine: Engine):
+    def __init__(
+        self,
+        engine: Engine,
+        batch_size: int | None = None,
+        response_cache: ResponseCache | None = None,
+    ):
         self.engine = engine
+        self.batch_size = batch_size if batch_size is not None else self.batch_size
+        self.response_cache = response_cache
+
+        self._upserted_rows = 0
+        self._changed_rows = 0
+        self._upsert_seconds = 0.0
+        self._versioned_rows = 0
 
     def _resolve_currencies(self) -> None:
         with Session(self.engine) as session:
             self._currencies_by_code = {c.code: c for c in session.scalars(select(Currency)).all()}
+
+    def _cached(self, namespace: str, parts: tuple, fetch: Callable[[], T]) -> T:
+        if self.response_cache is None:
+            return fetch()
+
+        return self.response_cache.fetch(namespace, parts, fetch)
+
+    def _batches(self, values: list[dict]) -> Iterator[list[dict]]:
+        for start in range(0, len(values), self.batch_size):
+            yield values[start : start + self.batch_size]
+
+    def _upsert_in_batches(self, session: Session, statement: Insert, values: list[dict]) -> None:
+        connection = session.connection()
+
+        for batch in self._batches(values):
+            self._changed_rows += max(connection.execute(statement, batch).rowcount, 0)
+
+        self._upserted_rows += len(values)
+
+    def _bump_table_versions(self, session: Session) -> None:
+        if self._upserted_rows == self._versioned_rows:
+            return
+
+        session.execute(prepare_table_versions_bump_statement(*self._versioned_models))
+        self._versioned_rows = self._upserted_rows
+
+    def _report_throughput(self, name: str) -> None:
+        rows_per_second = self._upserted_rows / self._upsert_seconds if self._upsert_seconds > 0 else 0.0
+
+        print(
+            f"Upserted {self._upserted_rows} {name} ({self._changed_rows} changed) "
+            f"in {self._upsert_seconds:.2f}s ({rows_per_second:.0f} rows/s)."
+        )
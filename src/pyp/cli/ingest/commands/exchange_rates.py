@@ -1,25 +1,53 @@
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from typing import Iterator
 
 import freecurrencyapi
-from sqlalchemy import Engine, Insert
-from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy import Engine, Insert, delete, select
 from sqlalchemy.orm import Session
 
 from pyp.cli.ingest.commands.base import IngestBaseCommand
-from pyp.database.models import ExchangeRate
+from pyp.cli.ingest.commands.rate_limiter import RateLimiter
+from pyp.cli.ingest.commands.response_cache import ResponseCache
+from pyp.database.models import ExchangeRate, IngestCheckpoint, day_key, month_key
+from pyp.database.statements import insert
 
 
 class IngestExchangeRatesCommand(IngestBaseCommand):
-    def __init__(self, engine: Engine, start_date: datetime, end_date: datetime, api_key: str):
-        super().__init__(engine)
+    jobs = 4
+    requests_per_minute = 10
+    checkpoint_source = "exchange_rates"
+    checkpoint_days = 30
+    _versioned_models = (ExchangeRate,)
+
+    def __init__(
+        self,
+        engine: Engine,
+        start_date: datetime,
+        end_date: datetime,
+        api_key: str,
+        batch_size: int | None = None,
+        jobs: int | None = None,
+        requests_per_minute: int | None = None,
+        pivot_only: bool = False,
+        response_cache: ResponseCache | None = None,
+    ):
+        super().__init__(engine, batch_size, response_cache)
 
         self.start_date = start_date
         self.end_date = end_date
         self.api_key = api_key
+        self.jobs = jobs if jobs is not None else self.jobs
+        self.requests_per_minute = requests_per_minute if requests_per_minute is not None else self.requests_per_minute
+        self.pivot_only = pivot_only
+
+        self._rate_limiter = RateLimiter(self.requests_per_minute)
 
         self._client: freecurrencyapi.Client | None = None
         self._currency_pairs: dict[str, list[str]] = dict()
         self._exchange_rates_values: list[dict] = []
+        self._checkpoint_date: date | None = None
 
     @property
     def client(self) -> freecurrencyapi.Client:
@@ -33,47 +61,139 @@ class IngestExchangeRatesCommand(IngestBaseCommand):
             code: [k for k in self._currencies_by_code.keys() if k != code] for code in self._currencies_by_code.keys()
         }
 
-    def _download_exchange_rates_for(self, date: datetime, code: str, currencies: list[str]) -> list[dict]:
+    @property
+    def _base_code(self) -> str:
+        return min(self._currencies_by_code.values(), key=lambda currency: currency.id).code
+
+    @property
+    def _dates(self) -> list[datetime]:
+        return [self.start_date + timedelta(days=day) for day in range((self.end_date - self.start_date).days + 1)]
+
+    @property
+    def _checkpoint_key(self) -> str:
+        key = f"{self.start_date:%Y-%m-%d}:{self.end_date:%Y-%m-%d}:{','.join(sorted(self._currencies_by_code))}"
+
+        return f"{key}:pivot" if self.pivot_only else key
+
+    def _resolve_checkpoint(self) -> None:
+        with Session(self.engine) as session:
+            self._checkpoint_date = session.scalars(
+                select(IngestCheckpoint.last_completed_date)
+                .where(IngestCheckpoint.source == self.checkpoint_source)
+                .where(IngestCheckpoint.key == self._checkpoint_key)
+            ).first()
+
+        if self._checkpoint_date is not None:
+            print(f"Resuming exchange rates after {self._checkpoint_date:%Y-%m-%d}.")
+
+    @property
+    def _pending_dates(self) -> list[datetime]:
+        if self._checkpoint_date is None:
+            return self._dates
+
+        return [date for date in self._dates if date.date() > self._checkpoint_date]
+
+    def _date_chunks(self) -> Iterator[list[datetime]]:
+        pending_dates = self._pending_dates
+
+        for start in range(0, len(pending_dates), self.checkpoint_days):
+            yield pending_dates[start : start + self.checkpoint_days]
+
+    def _fetch_historical(self, date_str: str, base_code: str, currencies: list[str]) -> dict:
+        self._rate_limiter.wait()
+
+        return self.client.historical(date_str, base_currency=base_code, currencies=currencies)
+
+    def _download_rates_for(self, date: datetime) -> dict[str, float]:
         date_str = date.strftime("%Y-%m-%d")
-        data = self.client.historical(date_str, base_currency=code, currencies=currencies)
+        base_code = self._base_code
+        currencies = self._currency_pairs[base_code]
+
+        data = self._cached(
+            "exchange_rates",
+            (date_str, base_code, currencies),
+            lambda: self._fetch_historical(date_str, base_code, currencies),
+        )
 
-        exchange_rates_values = []
+        return {base_code: 1.0, **data["data"][date_str]}
 
-        for currency_code in currencies:
-            exchange_rates_values.append({
+    def _derive_exchange_rates_for(self, date: datetime, rates: dict[str, float]) -> list[dict]:
+        return [
+            {
                 "from_currency_id": self._currencies_by_code[code].id,
                 "to_currency_id": self._currencies_by_code[currency_code].id,
                 "date": date,
-                "rate": data["data"][date_str][currency_code],
-            })
-
-        return exchange_rates_values
+                "rate": rates[currency_code] / rates[code],
+                "day_key": day_key(date),
+                "month_key": month_key(date),
+            }
+            for code, currencies in self._currency_pairs.items()
+            if not self.pivot_only or code == self._base_code
+            for currency_code in currencies
+        ]
 
-    def _download_exchange_rates(self) -> None:
-        current_date = self.start_date
+    def _download_exchange_rates(self, dates: list[datetime]) -> None:
+        self._exchange_rates_values = []
 
-        while current_date <= self.end_date:
-            for code, currencies in self._currency_pairs.items():
-                self._exchange_rates_values += self._download_exchange_rates_for(current_date, code, currencies)
+        if len(self._currency_pairs) < 2:
+            return
 
-            current_date += timedelta(days=1)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for date, rates in zip(dates, executor.map(self._download_rates_for, dates)):
+                self._exchange_rates_values += self._derive_exchange_rates_for(date, rates)
 
     def _prepare_exchange_rates_upsert_statement(self) -> Insert:
-        statement = insert(ExchangeRate).values(self._exchange_rates_values)
+        statement = insert(ExchangeRate, self.engine.dialect.name)
 
         return statement.on_conflict_do_update(
             index_elements=["from_currency_id", "to_currency_id", "date"],
             set_={"rate": statement.excluded.rate},
+            where=statement.excluded.rate != ExchangeRate.rate,
+        )
+
+    def _prepare_checkpoint_upsert_statement(self, completed_date: datetime) -> Insert:
+        statement = insert(IngestCheckpoint, self.engine.dialect.name).values(
+            source=self.checkpoint_source,
+            key=self._checkpoint_key,
+            last_completed_date=completed_date.date(),
+        )
+
+        return statement.on_conflict_do_update(
+            index_elements=["source", "key"],
+            set_={"last_completed_date": statement.excluded.last_completed_date},
         )
 
-    def _update_exchange_rates(self) -> None:
+    def _update_exchange_rates(self, completed_date: datetime) -> None:
+        started_at = perf_counter()
+
+        with Session(self.engine) as session:
+            self._upsert_in_batches(
+                session, self._prepare_exchange_rates_upsert_statement(), self._exchange_rates_values
+            )
+            session.execute(self._prepare_checkpoint_upsert_statement(completed_date))
+            self._bump_table_versions(session)
+            session.commit()
+
+        self._upsert_seconds += perf_counter() - started_at
+
+    def _clear_checkpoint(self) -> None:
         with Session(self.engine) as session:
-            session.execute(self._prepare_exchange_rates_upsert_statement())
+            session.execute(
+                delete(IngestCheckpoint)
+                .where(IngestCheckpoint.source == self.checkpoint_source)
+                .where(IngestCheckpoint.key == self._checkpoint_key)
+            )
             session.commit()
 
     def execute(self) -> None:
         self._resolve_currencies()
         self._compute_currency_pairs()
+        self._resolve_checkpoint()
+
+        for dates in self._date_chunks():
+            self._download_exchange_rates(dates)
+            self._update_exchange_rates(dates[-1])
+
+        self._clear_checkpoint()
 
-        self._download_exchange_rates()
-        self._update_exchange_rates()
+        self._report_throughput("exchange rates")
@@ -0,0 +1,26 @@
+from collections import deque
+from threading import Lock
+from time import monotonic, sleep
+
+
+class RateLimiter:
+    period = 60.0
+
+    def __init__(self, requests_per_period: int):
+        self.requests_per_period = requests_per_period
+
+        self._lock = Lock()
+        self._requested_at: deque[float] = deque(maxlen=requests_per_period)
+
+    def wait(self) -> None:
+        with self._lock:
+            now = monotonic()
+            request_at = now
+
+            if len(self._requested_at) == self.requests_per_period:
+                request_at = max(now, self._requested_at[0] + self.period)
+
+            self._requested_at.append(request_at)
+
+        if request_at > now:
+            sleep(request_at - now)
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import pickle
+from datetime import timedelta
+from pathlib import Path
+from threading import get_ident
+from time import time
+from typing import Callable, TypeVar, cast
+
+T = TypeVar("T")
+
+
+class ResponseCache:
+    cache_dir = Path(__file__).parent.parent.parent.parent.parent.parent / ".cache/responses"
+    max_age = timedelta(hours=1)
+
+    def __init__(self, cache_dir: Path | None = None, max_age: timedelta | None = None, offline: bool = False):
+        self.cache_dir = cache_dir if cache_dir is not None else self.cache_dir
+        self.max_age = max_age if max_age is not None else self.max_age
+        self.offline = offline
+
+    @staticmethod
+    def key(*parts: object) -> str:
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / f"{key}.pickle"
+
+    def _is_fresh(self, path: Path) -> bool:
+        return self.offline or time() - path.stat().st_mtime <= self.max_age.total_seconds()
+
+    def get(self, namespace: str, key: str) -> object | None:
+        path = self._path(namespace, key)
+
+        try:
+            if not self._is_fresh(path):
+                return None
+
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, namespace: str, key: str, response: object) -> None:
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{get_ident()}.tmp")
+
+        with open(temp_path, "wb") as file:
+            pickle.dump(response, file)
+
+        os.replace(temp_path, path)
+
+    def fetch(self, namespace: str, parts: tuple, fetch: Callable[[], T]) -> T:
+        key = self.key(*parts)
+        response = self.get(namespace, key)
+
+        if response is not None:
+            return cast(T, response)
+
+        if self.offline:
+            raise LookupError(f"No cached {namespace} response for {parts!r} to replay offline.")
+
+        response = fetch()
+        self.put(namespace, key, response)
+
+        return response
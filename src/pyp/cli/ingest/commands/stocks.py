@@ -1,15 +1,18 @@
 import json
-from datetime import datetime
-from typing import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from time import perf_counter
+from typing import Iterator, Sequence
 
-from pandas import DataFrame
-from sqlalchemy import Engine, Insert, Select, select
-from sqlalchemy.dialects.sqlite import insert
+from pandas import DataFrame, Series, Timestamp
+from sqlalchemy import Engine, Insert, Select, func, select
 from sqlalchemy.orm import Session
 from yfinance import Ticker, download
 
 from pyp.cli.ingest.commands.base import IngestBaseCommand
-from pyp.database.models import Price, Stock
+from pyp.cli.ingest.commands.response_cache import ResponseCache
+from pyp.database.models import MonthlyPrice, Price, Stock, day_key, month_key
+from pyp.database.statements import insert, prepare_monthly_prices_refresh_statement
 
 
 class IngestStocksCommand(IngestBaseCommand):
@@ -18,6 +21,10 @@ class IngestStocksCommand(IngestBaseCommand):
     _monikers: list[str]
     _prices_df: DataFrame
     _close_prices_df: DataFrame
+    _versioned_models = (Price, MonthlyPrice)
+    metadata_ttl = timedelta(days=7)
+    metadata_jobs = 8
+    chunk_size = 100
 
     def __init__(
         self,
@@ -26,13 +33,28 @@ class IngestStocksCommand(IngestBaseCommand):
         end_date: datetime | None = None,
         monikers: list[str] | None = None,
         exclude_monikers: list[str] | None = None,
+        incremental: bool = False,
+        batch_size: int | None = None,
+        commit_every: int | None = None,
+        metadata_ttl: timedelta | None = None,
+        metadata_jobs: int | None = None,
+        response_cache: ResponseCache | None = None,
+        chunk_size: int | None = None,
     ):
-        super().__init__(engine)
+        super().__init__(engine, batch_size, response_cache)
 
         self.start_date = start_date
         self.end_date = end_date
         self.monikers = monikers
         self.exclude_monikers = exclude_monikers
+        self.incremental = incremental
+        self.commit_every = commit_every
+        self.metadata_ttl = metadata_ttl if metadata_ttl is not None else self.metadata_ttl
+        self.metadata_jobs = metadata_jobs if metadata_jobs is not None else self.metadata_jobs
+        self.chunk_size = chunk_size if chunk_size is not None else self.chunk_size
+
+        self._latest_price_dates_by_moniker: dict[str, date] = dict()
+        self._priced_monikers = 0
 
     def _prepare_stocks_statement(self) -> Select:
         statement = select(Stock)
@@ -51,78 +73,197 @@ class IngestStocksCommand(IngestBaseCommand):
             self._stock_ids_by_moniker = {s.moniker: s.id for s in self._stocks}
             self._monikers = list(self._stock_ids_by_moniker.keys())
 
-    def _prepare_updated_stock(self, stock: Stock) -> None:
-        ticker = Ticker(stock.moniker)
+    @property
+    def _stale_stocks(self) -> list[Stock]:
+        refreshed_after = datetime.now() - self.metadata_ttl
+
+        return [
+            stock
+            for stock in self._stocks
+            if stock.metadata_refreshed_at is None or stock.metadata_refreshed_at <= refreshed_after
+        ]
+
+    @staticmethod
+    def _fetch_stock_metadata(moniker: str) -> tuple[dict, dict | None]:
+        ticker = Ticker(moniker)
         info = ticker.info
 
+        if info["quoteType"] != "ETF":
+            return info, None
+
+        return info, ticker.funds_data.sector_weightings
+
+    def _stock_metadata(self, moniker: str) -> tuple[dict, dict | None]:
+        return self._cached("stock_metadata", (moniker,), lambda: self._fetch_stock_metadata(moniker))
+
+    def _prepare_updated_stock(self, stock: Stock, info: dict, sector_weightings: dict | None) -> None:
         stock.stock_type = info["quoteType"]
         stock.name = info["longName"]
         stock.description = info["longBusinessSummary"]
         stock.currency = self._currencies_by_code[info["currency"]]
+        stock.metadata_refreshed_at = datetime.now()
 
         match info["quoteType"]:
             case "EQUITY":
                 stock.sector_weightings = json.dumps({info["sectorKey"]: 1.0})
             case "ETF":
-                if ticker.funds_data.sector_weightings:
-                    stock.sector_weightings = json.dumps(ticker.funds_data.sector_weightings)
+                if sector_weightings:
+                    stock.sector_weightings = json.dumps(sector_weightings)
                 else:
                     stock.sector_weightings = json.dumps({info["category"].replace(" ", "_").lower(): 1.0})
 
-    def _update_stock_info(self) -> None:
-        with Session(self.engine) as session:
-            for stock in self._stocks:
-                self._prepare_updated_stock(stock)
+    def _commit_if_due(self, session: Session, count: int) -> None:
+        if self.commit_every is not None and count % self.commit_every == 0:
+            self._bump_table_versions(session)
+            session.commit()
+
+    def _update_stock_info(self, session: Session) -> None:
+        stale_stocks = self._stale_stocks
+
+        with ThreadPoolExecutor(max_workers=self.metadata_jobs) as executor:
+            stocks_metadata = executor.map(self._stock_metadata, [stock.moniker for stock in stale_stocks])
+
+            for count, (stock, (info, sector_weightings)) in enumerate(zip(stale_stocks, stocks_metadata), start=1):
+                self._prepare_updated_stock(stock, info, sector_weightings)
                 session.add(stock)
-                session.commit()
+                self._commit_if_due(session, count)
+
+    def _resolve_latest_price_dates(self) -> None:
+        with Session(self.engine) as session:
+            self._latest_price_dates_by_moniker = {
+                moniker: latest_price_date
+                for moniker, latest_price_date in session.execute(
+                    select(Stock.moniker, func.max(Price.date))
+                    .join(Price, Price.stock_id == Stock.id)
+                    .where(Stock.id.in_(self._stock_ids_by_moniker.values()))
+                    .group_by(Stock.moniker)
+                ).all()
+            }
 
-    def _prices_download_parameters(self) -> dict:
+    @property
+    def _monikers_by_latest_price_date(self) -> dict[date | None, list[str]]:
+        monikers_by_latest_price_date: dict[date | None, list[str]] = dict()
+
+        for moniker in self._monikers:
+            latest_price_date = self._latest_price_dates_by_moniker.get(moniker)
+            monikers_by_latest_price_date.setdefault(latest_price_date, []).append(moniker)
+
+        return monikers_by_latest_price_date
+
+    def _prices_download_parameters(self, latest_price_date: date | None = None) -> dict:
         download_params = {"period": "1y"}
 
         if self.start_date is not None and self.end_date is not None:
             download_params = {"start": self.start_date.strftime("%Y-%m-%d"), "end": self.end_date.strftime("%Y-%m-%d")}
+        elif self.incremental and latest_price_date is not None:
+            download_params = {"start": latest_price_date.strftime("%Y-%m-%d")}
+        elif self.incremental:
+            download_params = {"period": "max"}
 
         return download_params
 
-    def _download_prices_df(self) -> None:
-        self._prices_df = download(self._monikers, keepna=True, rounding=True, **self._prices_download_parameters())
+    def _download_prices(self, monikers: list[str], download_params: dict) -> DataFrame:
+        return self._cached(
+            "prices",
+            (monikers, download_params),
+            lambda: download(monikers, keepna=True, rounding=True, **download_params),
+        )
+
+    def _download_chunks(self) -> Iterator[tuple[list[str], dict]]:
+        for latest_price_date, monikers in self._monikers_by_latest_price_date.items():
+            download_params = self._prices_download_parameters(latest_price_date)
+
+            for start in range(0, len(monikers), self.chunk_size):
+                yield monikers[start : start + self.chunk_size], download_params
+
+    def _download_prices_df(self, monikers: list[str], download_params: dict) -> None:
+        self._prices_df = self._download_prices(monikers, download_params)
 
     def _extract_close_prices(self) -> None:
-        self._close_prices_df = self._prices_df["Close"].fillna(0)  # type: ignore[assignment]
+        self._close_prices_df = self._prices_df["Close"]  # type: ignore[assignment]
+
+    def _moniker_close_prices(self, moniker: str) -> Series:
+        close_prices = self._close_prices_df[moniker].dropna()
+        latest_price_date = self._latest_price_dates_by_moniker.get(moniker)
+
+        if latest_price_date is None:
+            return close_prices
 
-    def _prepare_price_upsert_statement(self, moniker: str) -> Insert:
-        stock_prices_series = self._close_prices_df[moniker]
+        return close_prices[close_prices.index >= Timestamp(latest_price_date)]
 
-        values = [
+    def _prepare_price_values(self, moniker: str) -> list[dict]:
+        stock_prices_series = self._moniker_close_prices(moniker)
+
+        return [
             {
                 "stock_id": self._stock_ids_by_moniker[moniker],
                 "date": price_date,
                 "amount": price_amount,
+                "day_key": day_key(price_date),
+                "month_key": month_key(price_date),
             }
             for price_date, price_amount in zip(stock_prices_series.index, stock_prices_series.to_list())
         ]
 
-        statement = insert(Price).values(values)
+    def _prepare_price_upsert_statement(self) -> Insert:
+        statement = insert(Price, self.engine.dialect.name)
 
         return statement.on_conflict_do_update(
             index_elements=["stock_id", "date"],
             set_={"amount": statement.excluded.amount},
+            where=statement.excluded.amount != Price.amount,
         )
 
-    def _update_stock_pricing(self) -> None:
-        with Session(self.engine) as session:
-            for moniker in self._monikers:
-                statement = self._prepare_price_upsert_statement(moniker)
+    def _prepare_monthly_prices_refresh_statement(self, moniker: str) -> Insert:
+        price_dates = self._moniker_close_prices(moniker).index
+
+        return prepare_monthly_prices_refresh_statement(
+            self._stock_ids_by_moniker[moniker],
+            Timestamp(price_dates.min()).date(),
+            Timestamp(price_dates.max()).date(),
+            dialect_name=self.engine.dialect.name,
+        )
 
-                session.execute(statement)
-                session.commit()
+    def _update_chunk_pricing(self, session: Session, statement: Insert, monikers: list[str]) -> None:
+        started_at = perf_counter()
+
+        for moniker in monikers:
+            values = self._prepare_price_values(moniker)
+
+            if values:
+                self._upsert_in_batches(session, statement, values)
+                session.execute(self._prepare_monthly_prices_refresh_statement(moniker))
+
+            self._priced_monikers += 1
+            self._commit_if_due(session, self._priced_monikers)
+
+        self._upsert_seconds += perf_counter() - started_at
+
+    def _update_stock_pricing(self, session: Session) -> None:
+        statement = self._prepare_price_upsert_statement()
+
+        for monikers, download_params in self._download_chunks():
+            self._download_prices_df(monikers, download_params)
+            self._extract_close_prices()
+            self._update_chunk_pricing(session, statement, monikers)
+            self._commit(session)
+
+    def _commit(self, session: Session) -> None:
+        started_at = perf_counter()
+        self._bump_table_versions(session)
+        session.commit()
+        self._upsert_seconds += perf_counter() - started_at
 
     def execute(self) -> None:
         self._resolve_stocks()
         self._resolve_currencies()
 
-        self._update_stock_info()
+        if self.incremental:
+            self._resolve_latest_price_dates()
+
+        with Session(self.engine) as session:
+            self._update_stock_info(session)
+            self._update_stock_pricing(session)
+            self._commit(session)
 
-        self._download_prices_df()
-        self._extract_close_prices()
-        self._update_stock_pricing()
+        self._report_throughput("prices")
@@ -6,7 +6,7 @@ from typer import Typer
 
 from pyp.cli.common import resolve_portfolio
 from pyp.cli.portfolio.commands import AddMonikerCommand, AddSharesCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 portfolio_app = Typer(name="portfolio", help="Manage portfolio DB entities.")
 
@@ -22,7 +22,7 @@ def callback(
 
 @portfolio_app.command(name="add", help="Add a moniker to the portfolio.")
 def add(ctx: typer.Context, moniker: Annotated[str, typer.Argument(help="The moniker.")]) -> None:
-    AddMonikerCommand(engine, ctx.obj["portfolio"], moniker).execute()
+    AddMonikerCommand(get_engine(), ctx.obj["portfolio"], moniker).execute()
 
 
 @portfolio_app.command(name="add-shares", help="Add (buy) shares for a moniker to the portfolio.")
@@ -33,7 +33,7 @@ def add_shares(
     price: Annotated[float, typer.Argument(help="The price paid for the shares.")],
     purchased_on: Annotated[datetime, typer.Argument(metavar="YYYY-MM-DD", help="The date of purchase of the shares.")],
 ) -> None:
-    AddSharesCommand(engine, ctx.obj["portfolio"], moniker, amount, price, purchased_on).execute()
+    AddSharesCommand(get_engine(), ctx.obj["portfolio"], moniker, amount, price, purchased_on).execute()
 
 
 @portfolio_app.command(name="remove-shares", help="Remove (sell) shares for a moniker from the portfolio.")
@@ -44,4 +44,4 @@ def remove_shares(
     price: Annotated[float, typer.Argument(help="The price paid for the shares.")],
     purchased_on: Annotated[datetime, typer.Argument(metavar="YYYY-MM-DD", help="The date of purchase of the shares.")],
 ) -> None:
-    AddSharesCommand(engine, ctx.obj["portfolio"], moniker, -amount, price, purchased_on).execute()
+    AddSharesCommand(get_engine(), ctx.obj["portfolio"], moniker, -amount, price, purchased_on).execute()
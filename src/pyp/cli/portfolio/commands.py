@@ -3,7 +3,7 @@ from datetime import datetime
 from sqlalchemy import Engine, select
 from sqlalchemy.orm import Session
 
-from pyp.database.models import Portfolio, PortfolioStocks, Share, Stock
+from pyp.database.models import Portfolio, PortfolioStocks, Share, Stock, day_key, month_key
 
 
 class AddMonikerCommand:
@@ -79,6 +79,8 @@ class AddSharesCommand:
             amount=self.amount,
             price=self.price,
             purchased_on=self.purchased_on,
+            day_key=day_key(self.purchased_on),
+            month_key=month_key(self.purchased_on),
         )
 
     def execute(self) -> None:
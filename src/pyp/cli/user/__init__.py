@@ -4,14 +4,14 @@ import typer
 from typer import Typer
 
 from pyp.cli.user.commands import AddPortfolioCommand, AddUserCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 user_app = Typer(name="user", help="Manage user DB entities.")
 
 
 @user_app.command(name="add", help="Creates a new user in the system.")
 def add(username: Annotated[str, typer.Argument(help="The username of the user.")]) -> None:
-    AddUserCommand(engine, username).execute()
+    AddUserCommand(get_engine(), username).execute()
 
 
 @user_app.command(name="add-portfolio", help="Creates a portfolio for a specific user.")
@@ -19,4 +19,4 @@ def add_portfolio(
     username: Annotated[str, typer.Argument(help="The username of the user.")],
     name: Annotated[str, typer.Argument(help="The portfolio name.")],
 ) -> None:
-    AddPortfolioCommand(engine, username, name).execute()
+    AddPortfolioCommand(get_engine(), username, name).execute()
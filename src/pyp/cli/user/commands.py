@@ -2,6 +2,7 @@ from sqlalchemy import Engine, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from pyp.cli.common import is_path_component
 from pyp.database.models import Portfolio, User
 
 
@@ -16,6 +17,10 @@ class AddUserCommand:
         self._user = User(username=self.username)
 
     def execute(self) -> None:
+        if not is_path_component(self.username):
+            print(f"The username '{self.username}' can not contain '/' or '\\', or be '.' or '..'.")
+            return
+
         self._prepare_user()
 
         with Session(self.engine) as session:
@@ -44,6 +49,10 @@ class AddPortfolioCommand:
             self._user = session.scalars(select(User).where(User.username == self.username)).one()
 
     def execute(self) -> None:
+        if not is_path_component(self.name):
+            print(f"The portfolio name '{self.name}' can not contain '/' or '\\', or be '.' or '..'.")
+            return
+
         self._prepare_portfolio()
         self._resolve_user()
 
@@ -1,7 +1,96 @@
+import os
 from pathlib import Path
+from typing import Any, Callable
+from weakref import WeakKeyDictionary
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, StaticPool, create_engine, event, make_url
 
 db_file = Path(__file__).parent / "pyp.sqlite"
 
-engine = create_engine(f"sqlite:///{db_file.as_posix()}", echo=False)
+engine_profiles: dict[str, dict[str, str | int]] = {
+    "default": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+    },
+    "ingest": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "read-heavy": {
+        "busy_timeout": 10000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -128 * 1024,
+        "mmap_size": 1024 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+_pragma_listeners: WeakKeyDictionary[Engine, Callable[[Any, Any], None]] = WeakKeyDictionary()
+_engine: Engine | None = None
+
+
+def database_url() -> str:
+    return os.environ.get("PYP_DATABASE_URL") or f"sqlite:///{db_file.as_posix()}"
+
+
+def use_profile(database_engine: Engine, profile: str) -> None:
+    pragmas = engine_profiles[profile] if database_engine.dialect.name == "sqlite" else {}
+
+    def set_pragmas(dbapi_connection: Any, _: Any) -> None:
+        cursor = dbapi_connection.cursor()
+
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+        cursor.close()
+
+    previous_listener = _pragma_listeners.pop(database_engine, None)
+
+    if previous_listener is not None:
+        event.remove(database_engine, "connect", previous_listener)
+
+    database_engine.dispose()
+
+    if pragmas:
+        event.listen(database_engine, "connect", set_pragmas)
+        _pragma_listeners[database_engine] = set_pragmas
+
+
+def create_database_engine(url: str | None = None, profile: str = "default") -> Engine:
+    url_object = make_url(url if url is not None else database_url())
+    options: dict[str, Any] = dict()
+
+    if url_object.get_backend_name() == "sqlite" and url_object.database in (None, "", ":memory:"):
+        options = {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+
+    database_engine = create_engine(url_object, echo=False, **options)
+
+    use_profile(database_engine, profile)
+
+    return database_engine
+
+
+def configure_engine(url: str) -> Engine:
+    global _engine
+
+    if _engine is not None:
+        _engine.dispose()
+
+    _engine = create_database_engine(url)
+
+    return _engine
+
+
+def get_engine() -> Engine:
+    global _engine
+
+    if _engine is None:
+        _engine = create_database_engine()
+
+    return _engine
@@ -0,0 +1,399 @@
+from sqlalchemy import (
+    Cast,
+    ColumnElement,
+    Connection,
+    Engine,
+    Enum,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    cast,
+    delete,
+    func,
+    insert,
+    inspect,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+
+from pyp.database.models import (
+    Base,
+    Currency,
+    ExchangeRate,
+    MonthlyPrice,
+    Portfolio,
+    PortfolioStocks,
+    Price,
+    Share,
+    Stock,
+    TableVersion,
+    User,
+)
+from pyp.database.statements import insert as upsert
+from pyp.database.statements import prepare_monthly_prices_refresh_statement
+
+
+class Migration:
+    version: int
+    name: str
+    batch_size = 10000
+
+    def __init__(self, engine: Engine, batch_size: int | None = None):
+        self.engine = engine
+        self.batch_size = batch_size if batch_size is not None else self.batch_size
+
+    def _column_names(self, table_name: str) -> list[str]:
+        with self.engine.connect() as connection:
+            return [column["name"] for column in inspect(connection).get_columns(table_name)]
+
+    def _add_column(self, table_name: str, column: InstrumentedAttribute) -> None:
+        if column.key in self._column_names(table_name):
+            return
+
+        with self.engine.begin() as connection:
+            column_type = column.type.compile(connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column.key} {column_type}"))
+
+    def _autocommit_connection(self) -> Connection:
+        return self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    def _create_index(self, index: Index) -> None:
+        with self._autocommit_connection() as connection:
+            statement = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+
+            if connection.dialect.name == "postgresql":
+                statement = statement.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+
+            connection.execute(text(statement))
+
+    def _id_range(self, table: Table) -> tuple[int | None, int | None]:
+        with self.engine.connect() as connection:
+            min_id, max_id = connection.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+
+        return min_id, max_id
+
+    def _backfill_in_batches(self, table: Table, values: dict, where: ColumnElement[bool]) -> None:
+        min_id, max_id = self._id_range(table)
+
+        if min_id is None or max_id is None:
+            return
+
+        for start_id in range(min_id, max_id + 1, self.batch_size):
+            with self.engine.begin() as connection:
+                connection.execute(
+                    update(table)
+                    .where(table.c.id >= start_id, table.c.id < start_id + self.batch_size)
+                    .where(where)
+                    .values(values)
+                )
+
+    def _copy_rows(
+        self,
+        connection: Connection,
+        source: Table,
+        target: Table,
+        columns: list[str],
+        start_id: int,
+        end_id: int | None = None,
+    ) -> None:
+        rows = select(*[
+            cast(source.c[column], target.c[column].type)
+            if isinstance(target.c[column].type, Enum)
+            else source.c[column]
+            for column in columns
+        ]).where(source.c.id >= start_id)
+
+        if end_id is not None:
+            rows = rows.where(source.c.id < end_id)
+
+        connection.execute(insert(target).from_select(columns, rows))
+
+    def _add_postgresql_version_trigger(self, connection: Connection, table_name: str) -> None:
+        connection.execute(
+            text(
+                f"CREATE OR REPLACE FUNCTION {TableVersion.__tablename__}_bump() RETURNS trigger AS $$ BEGIN "
+                f"UPDATE {TableVersion.__tablename__} SET version = version + 1 "
+                f"WHERE table_name = TG_TABLE_NAME; RETURN NULL; END $$ LANGUAGE plpgsql"
+            )
+        )
+        connection.execute(
+            text(
+                f"CREATE OR REPLACE TRIGGER {table_name}_version "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {table_name} FOR EACH STATEMENT "
+                f"EXECUTE FUNCTION {TableVersion.__tablename__}_bump()"
+            )
+        )
+
+    def _add_sqlite_version_triggers(self, connection: Connection, table_name: str) -> None:
+        for event in ["INSERT", "UPDATE", "DELETE"]:
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table_name}_{event.lower()}_version "
+                    f"AFTER {event} ON {table_name} BEGIN "
+                    f"UPDATE {TableVersion.__tablename__} SET version = version + 1 "
+                    f"WHERE table_name = '{table_name}'; END"
+                )
+            )
+
+    def _add_version_triggers(self, connection: Connection, table_name: str) -> None:
+        if connection.dialect.name == "postgresql":
+            self._add_postgresql_version_trigger(connection, table_name)
+        else:
+            self._add_sqlite_version_triggers(connection, table_name)
+
+    def _drop_version_triggers(self, connection: Connection, table_name: str) -> None:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {table_name}_version ON {table_name}"))
+        else:
+            for event in ["INSERT", "UPDATE", "DELETE"]:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {table_name}_{event.lower()}_version"))
+
+    @property
+    def _bulk_versioned_models(self) -> list[type[Base]]:
+        return [Price, MonthlyPrice, ExchangeRate]
+
+    def _is_versioned(self, connection: Connection, table_name: str) -> bool:
+        if table_name in [model.__tablename__ for model in self._bulk_versioned_models]:
+            return False
+
+        if not inspect(connection).has_table(TableVersion.__tablename__):
+            return False
+
+        version = connection.scalar(select(TableVersion.version).where(TableVersion.table_name == table_name))
+
+        return version is not None
+
+    def _rebuild_table(self, table: Table) -> None:
+        metadata = MetaData()
+
+        for referred_table in {foreign_key.column.table for foreign_key in table.foreign_keys}:
+            referred_table.to_metadata(metadata)
+
+        rebuilt_table = table.to_metadata(metadata, name=f"{table.name}_rebuild")
+        rebuilt_table.indexes.clear()
+
+        for constraint in rebuilt_table.constraints:
+            if constraint is not rebuilt_table.primary_key:
+                constraint.name = None
+
+        with self.engine.begin() as connection:
+            for column in rebuilt_table.c:
+                if isinstance(column.type, Enum):
+                    column.type.create(connection, checkfirst=True)
+
+            connection.execute(text(f"DROP TABLE IF EXISTS {rebuilt_table.name}"))
+            connection.execute(CreateTable(rebuilt_table))
+
+        columns = [column for column in self._column_names(table.name) if column in rebuilt_table.c]
+        min_id, max_id = self._id_range(table)
+        next_id = 0
+
+        if min_id is not None and max_id is not None:
+            for next_id in range(min_id, max_id + 1, self.batch_size):
+                with self.engine.begin() as connection:
+                    self._copy_rows(connection, table, rebuilt_table, columns, next_id, next_id + self.batch_size)
+
+            next_id += self.batch_size
+
+        referring_constraints = [
+            constraint
+            for referring_table in table.metadata.tables.values()
+            for constraint in referring_table.foreign_key_constraints
+            if referring_table is not table and constraint.referred_table is table
+        ]
+
+        with self.engine.begin() as connection:
+            self._copy_rows(connection, table, rebuilt_table, columns, next_id)
+
+            if connection.dialect.name == "postgresql":
+                connection.execute(text(f"DROP TABLE {table.name} CASCADE"))
+            else:
+                connection.execute(text(f"DROP TABLE {table.name}"))
+
+            connection.execute(text(f"ALTER TABLE {rebuilt_table.name} RENAME TO {table.name}"))
+
+            if connection.dialect.name == "postgresql":
+                for constraint in referring_constraints:
+                    if inspect(connection).has_table(constraint.table.name):
+                        connection.execute(AddConstraint(constraint))
+
+                connection.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 0) + 1, false) "
+                        f"FROM {table.name}"
+                    )
+                )
+
+            if self._is_versioned(connection, table.name):
+                self._add_version_triggers(connection, table.name)
+
+        for index in table.indexes:
+            self._create_index(index)
+
+    def upgrade(self) -> None:
+        raise NotImplementedError
+
+
+class AddCalendarKeysMigration(Migration):
+    version = 1
+    name = "add_calendar_keys"
+
+    @property
+    def _calendar_key_sources(self) -> dict[type[Base], InstrumentedAttribute]:
+        return {
+            Price: Price.date,
+            Share: Share.purchased_on,
+            ExchangeRate: ExchangeRate.date,
+        }
+
+    def _calendar_key(self, key_format: str, date_column: InstrumentedAttribute) -> Cast[int]:
+        if self.engine.dialect.name == "postgresql":
+            postgresql_format = key_format.replace("%Y", "YYYY").replace("%m", "MM").replace("%d", "DD")
+
+            return cast(func.to_char(date_column, postgresql_format), Integer)
+
+        return cast(func.strftime(key_format, date_column), Integer)
+
+    def upgrade(self) -> None:
+        for model, date_column in self._calendar_key_sources.items():
+            table = Base.metadata.tables[model.__tablename__]
+
+            self._add_column(table.name, getattr(model, "day_key"))
+            self._add_column(table.name, getattr(model, "month_key"))
+            self._backfill_in_batches(
+                table,
+                {
+                    "day_key": self._calendar_key("%Y%m%d", date_column),
+                    "month_key": self._calendar_key("%Y%m", date_column),
+                },
+                (table.c.day_key.is_(None)) | (table.c.month_key.is_(None)),
+            )
+
+
+class AddStockMetadataRefreshedAtMigration(Migration):
+    version = 2
+    name = "add_stock_metadata_refreshed_at"
+
+    def upgrade(self) -> None:
+        self._add_column(Stock.__tablename__, Stock.metadata_refreshed_at)
+
+
+class CreateCoveringIndexesMigration(Migration):
+    version = 3
+    name = "create_covering_indexes"
+
+    @property
+    def _covering_indexes(self) -> list[Index]:
+        return [
+            index
+            for model in [Price, Share, MonthlyPrice, ExchangeRate]
+            for index in Base.metadata.tables[model.__tablename__].indexes
+            if index.name is not None and index.name.endswith("_cover_index")
+        ]
+
+    def upgrade(self) -> None:
+        for index in self._covering_indexes:
+            self._create_index(index)
+
+
+class AddTableVersionsMigration(Migration):
+    version = 4
+    name = "add_table_versions"
+
+    @property
+    def _versioned_models(self) -> list[type[Base]]:
+        return [User, Portfolio, Stock, PortfolioStocks, Share, Price, MonthlyPrice, Currency, ExchangeRate]
+
+    def upgrade(self) -> None:
+        with self.engine.begin() as connection:
+            for model in self._versioned_models:
+                table_name = model.__tablename__
+
+                connection.execute(
+                    upsert(TableVersion, connection.dialect.name)
+                    .values(table_name=table_name, version=0)
+                    .on_conflict_do_nothing(index_elements=["table_name"])
+                )
+
+                self._add_version_triggers(connection, table_name)
+
+
+class BackfillMonthlyPricesMigration(Migration):
+    version = 5
+    name = "backfill_monthly_prices"
+
+    def upgrade(self) -> None:
+        with self.engine.connect() as connection:
+            stock_ids = connection.scalars(select(Price.stock_id).distinct().order_by(Price.stock_id)).all()
+
+        for stock_id in stock_ids:
+            with self.engine.begin() as connection:
+                connection.execute(
+                    prepare_monthly_prices_refresh_statement(stock_id, dialect_name=connection.dialect.name)
+                )
+
+
+class DeleteZeroPricesMigration(Migration):
+    version = 6
+    name = "delete_zero_prices"
+
+    def upgrade(self) -> None:
+        with self.engine.connect() as connection:
+            stock_ids = connection.scalars(
+                select(Price.stock_id).where(Price.amount == 0).distinct().order_by(Price.stock_id)
+            ).all()
+
+        for stock_id in stock_ids:
+            with self.engine.begin() as connection:
+                connection.execute(delete(Price).where(Price.stock_id == stock_id, Price.amount == 0))
+                connection.execute(delete(MonthlyPrice).where(MonthlyPrice.stock_id == stock_id))
+                connection.execute(
+                    prepare_monthly_prices_refresh_statement(stock_id, dialect_name=connection.dialect.name)
+                )
+
+
+class RebuildStocksMigration(Migration):
+    version = 7
+    name = "rebuild_stocks"
+
+    @property
+    def _text_columns(self) -> list[str]:
+        return [Stock.description.key, Stock.sector_weightings.key]
+
+    def _column_types(self, table_name: str) -> dict[str, str]:
+        with self.engine.connect() as connection:
+            return {column["name"]: str(column["type"]) for column in inspect(connection).get_columns(table_name)}
+
+    def upgrade(self) -> None:
+        column_types = self._column_types(Stock.__tablename__)
+
+        if all(column_types.get(column) == "TEXT" for column in self._text_columns):
+            return
+
+        self._rebuild_table(Base.metadata.tables[Stock.__tablename__])
+
+
+class DropBulkVersionTriggersMigration(Migration):
+    version = 8
+    name = "drop_bulk_version_triggers"
+
+    def upgrade(self) -> None:
+        with self.engine.begin() as connection:
+            for model in self._bulk_versioned_models:
+                self._drop_version_triggers(connection, model.__tablename__)
+
+
+migrations: list[type[Migration]] = [
+    AddCalendarKeysMigration,
+    AddStockMetadataRefreshedAtMigration,
+    CreateCoveringIndexesMigration,
+    AddTableVersionsMigration,
+    BackfillMonthlyPricesMigration,
+    DeleteZeroPricesMigration,
+    RebuildStocksMigration,
+    DropBulkVersionTriggersMigration,
+]
@@ -1,9 +1,17 @@
 from datetime import date, datetime
 
-from sqlalchemy import Date, Double, Enum, ForeignKey, String, UniqueConstraint
+from sqlalchemy import Date, DateTime, Double, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
+def day_key(value: date) -> int:
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def month_key(value: date) -> int:
+    return value.year * 100 + value.month
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -42,16 +50,18 @@ class Stock(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     currency_id: Mapped[int] = mapped_column(ForeignKey("currencies.id"), nullable=True)
-    stock_type: Mapped[str] = mapped_column(Enum("ETF", "EQUITY"), nullable=True)
+    stock_type: Mapped[str] = mapped_column(Enum("ETF", "EQUITY", name="stock_type"), nullable=True)
     moniker: Mapped[str] = mapped_column(String(10), unique=True)
     name: Mapped[str] = mapped_column(String(256), nullable=True)
-    description: Mapped[str] = mapped_column(String(256), nullable=True)
-    sector_weightings: Mapped[str] = mapped_column(String(256), nullable=True)
+    description: Mapped[str] = mapped_column(Text(), nullable=True)
+    sector_weightings: Mapped[str] = mapped_column(Text(), nullable=True)
+    metadata_refreshed_at: Mapped[datetime] = mapped_column(DateTime(), nullable=True)
 
     currency: Mapped["Currency"] = relationship(back_populates="stocks")
     portfolios: Mapped[list["Portfolio"]] = relationship(secondary="portfolio_stocks", back_populates="stocks")
     portfolio_stocks: Mapped[list["PortfolioStocks"]] = relationship(back_populates="stock", viewonly=True)
     prices: Mapped[list["Price"]] = relationship(back_populates="stock", cascade="all, delete-orphan")
+    monthly_prices: Mapped[list["MonthlyPrice"]] = relationship(back_populates="stock", cascade="all, delete-orphan")
     #
     # def __repr__(self) -> str:
     #     return f"Stock(id={self.id!r}, moniker={self.moniker!r}, name={self.name!r})"
@@ -82,8 +92,12 @@ class Share(Base):
     amount: Mapped[float] = mapped_column(Double())
     price: Mapped[float] = mapped_column(Double())
     purchased_on: Mapped[date] = mapped_column(Date())
+    day_key: Mapped[int] = mapped_column(Integer())
+    month_key: Mapped[int] = mapped_column(Integer())
 
     portfolio_stocks: Mapped["PortfolioStocks"] = relationship(back_populates="shares", viewonly=True)
+
+    __table_args__ = (Index("ps_dk_cover_index", "portfolio_stocks_id", "day_key", "month_key", "amount", "price"),)
     #
     # def __repr__(self) -> str:
     #     return (
@@ -99,15 +113,40 @@ class Price(Base):
     stock_id: Mapped[int] = mapped_column(ForeignKey("stocks.id"))
     date: Mapped[datetime] = mapped_column(Date())
     amount: Mapped[float] = mapped_column(Double())
+    day_key: Mapped[int] = mapped_column(Integer())
+    month_key: Mapped[int] = mapped_column(Integer())
 
     stock: Mapped["Stock"] = relationship(back_populates="prices")
 
-    __table_args__ = (UniqueConstraint("stock_id", "date", name="s_d_index"),)
+    __table_args__ = (
+        UniqueConstraint("stock_id", "date", name="s_d_index"),
+        Index("s_dk_cover_index", "stock_id", "day_key", "month_key", "amount", "date"),
+    )
     #
     # def __repr__(self) -> str:
     #     return f"Price(id={self.id!r}, stock_id={self.stock_id!r}, date={self.date!r}, amount={self.amount!r})"
 
 
+class MonthlyPrice(Base):
+    __tablename__ = "monthly_prices"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    stock_id: Mapped[int] = mapped_column(ForeignKey("stocks.id"))
+    year_month: Mapped[int] = mapped_column(Integer())
+    date: Mapped[datetime] = mapped_column(Date())
+    close: Mapped[float] = mapped_column(Double())
+
+    stock: Mapped["Stock"] = relationship(back_populates="monthly_prices")
+
+    __table_args__ = (
+        UniqueConstraint("stock_id", "year_month", name="s_ym_index"),
+        Index("s_ym_cover_index", "stock_id", "year_month", "close", "date"),
+    )
+    #
+    # def __repr__(self) -> str:
+    #     return f"MonthlyPrice(id={self.id!r}, stock_id={self.stock_id!r}, year_month={self.year_month!r})"
+
+
 class Currency(Base):
     __tablename__ = "currencies"
 
@@ -129,11 +168,16 @@ class ExchangeRate(Base):
     to_currency_id: Mapped[int] = mapped_column(ForeignKey("currencies.id"))
     date: Mapped[datetime] = mapped_column(Date())
     rate: Mapped[float] = mapped_column(Double())
+    day_key: Mapped[int] = mapped_column(Integer())
+    month_key: Mapped[int] = mapped_column(Integer())
 
     from_currency: Mapped["Currency"] = relationship("Currency", foreign_keys=[from_currency_id])
     to_currency: Mapped["Currency"] = relationship("Currency", foreign_keys=[to_currency_id])
 
-    __table_args__ = (UniqueConstraint("from_currency_id", "to_currency_id", "date", name="from_to_date_index"),)
+    __table_args__ = (
+        UniqueConstraint("from_currency_id", "to_currency_id", "date", name="from_to_date_index"),
+        Index("f_t_mk_dk_cover_index", "from_currency_id", "to_currency_id", "month_key", "day_key", "rate"),
+    )
     #
     # def __repr__(self) -> str:
     #     return (
@@ -141,3 +185,26 @@ class ExchangeRate(Base):
     #         + "id={self.id!r}, from={self.from_currency_id!r}, to={self.to_currency_id!r}, rate={self.rate!r}"
     #         + ")"
     #     )
+
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer(), default=0)
+
+
+class IngestCheckpoint(Base):
+    __tablename__ = "ingest_checkpoints"
+
+    source: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(256), primary_key=True)
+    last_completed_date: Mapped[date] = mapped_column(Date())
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer(), primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(128))
+    applied_at: Mapped[datetime] = mapped_column(DateTime())
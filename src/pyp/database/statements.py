@@ -0,0 +1,65 @@
+from datetime import date
+
+from sqlalchemy import Insert, Update, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from pyp.database.models import Base, MonthlyPrice, Price, TableVersion, day_key
+
+
+def insert(model: type[Base], dialect_name: str) -> sqlite.Insert | postgresql.Insert:
+    if dialect_name == "postgresql":
+        return postgresql.insert(model)
+
+    if dialect_name == "sqlite":
+        return sqlite.insert(model)
+
+    raise ValueError(f"Unsupported dialect {dialect_name}")
+
+
+def prepare_monthly_prices_refresh_statement(
+    stock_id: int | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    *,
+    dialect_name: str,
+) -> Insert:
+    ranked_prices = select(
+        Price.stock_id,
+        Price.month_key.label("year_month"),
+        Price.date,
+        Price.amount.label("close"),
+        func.row_number()
+        .over(partition_by=[Price.stock_id, Price.month_key], order_by=Price.day_key.desc())
+        .label("row_number"),
+    )
+
+    if stock_id is not None:
+        ranked_prices = ranked_prices.where(Price.stock_id == stock_id)
+
+    if start_date is not None:
+        ranked_prices = ranked_prices.where(Price.day_key >= day_key(start_date.replace(day=1)))
+
+    if end_date is not None:
+        next_month = date(end_date.year + end_date.month // 12, end_date.month % 12 + 1, 1)
+        ranked_prices = ranked_prices.where(Price.day_key < day_key(next_month))
+
+    ranked = ranked_prices.subquery()
+
+    statement = insert(MonthlyPrice, dialect_name).from_select(
+        ["stock_id", "year_month", "date", "close"],
+        select(ranked.c.stock_id, ranked.c.year_month, ranked.c.date, ranked.c.close).where(ranked.c.row_number == 1),
+    )
+
+    return statement.on_conflict_do_update(
+        index_elements=["stock_id", "year_month"],
+        set_={"date": statement.excluded.date, "close": statement.excluded.close},
+        where=or_(statement.excluded.date != MonthlyPrice.date, statement.excluded.close != MonthlyPrice.close),
+    )
+
+
+def prepare_table_versions_bump_statement(*models: type[Base]) -> Update:
+    return (
+        update(TableVersion)
+        .where(TableVersion.table_name.in_([model.__tablename__ for model in models]))
+        .values(version=TableVersion.version + 1)
+    )
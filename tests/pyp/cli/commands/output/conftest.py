@@ -1,7 +1,18 @@
-from datetime import datetime
+from unittest.mock import MagicMock
 
 import pytest
 from pandas import DataFrame
+from pytest_mock import MockerFixture
+
+from pyp.cli.commands.output.context import OutputContext
+
+
+@pytest.fixture
+def mock_context(mocker: MockerFixture) -> MagicMock:
+    mock = mocker.MagicMock(spec=OutputContext)
+    mock.read_sql = mocker.MagicMock()
+
+    return mock
 
 
 @pytest.fixture
@@ -13,14 +24,14 @@ def share_value_df() -> DataFrame:
             "amount": [1.749, 0.009, 0.008, 4.795, 1.000, 0.864, 19.065, 10],
             "value": [432.107940, 2.092270, 1.970961, 863.690744, 187.400000, 162.215136, 863.545362, 189.90],
             "month": [
-                "2023-10",
-                "2024-01",
-                "2024-04",
-                "2023-10",
-                "2023-11",
-                "2023-11",
-                "2023-10",
-                "2023-10",
+                202310,
+                202401,
+                202404,
+                202310,
+                202311,
+                202311,
+                202310,
+                202310,
             ],
         }
     ).astype(
@@ -29,7 +40,7 @@ def share_value_df() -> DataFrame:
             "stock_type": "string",
             "amount": "float64",
             "value": "float64",
-            "month": "string",
+            "month": "int64",
         }
     )
 
@@ -246,66 +257,66 @@ def monthly_prices_df() -> DataFrame:
                 2,
             ],
             "month": [
-                "2023-10",
-                "2023-11",
-                "2023-12",
-                "2024-01",
-                "2024-02",
-                "2024-03",
-                "2024-04",
-                "2024-05",
-                "2024-06",
-                "2024-07",
-                "2024-08",
-                "2024-09",
-                "2024-10",
-                "2024-11",
-                "2024-12",
-                "2023-10",
-                "2023-11",
-                "2023-12",
-                "2024-01",
-                "2024-02",
-                "2024-03",
-                "2024-04",
-                "2024-05",
-                "2024-06",
-                "2024-07",
-                "2024-08",
-                "2024-09",
-                "2024-10",
-                "2024-11",
-                "2024-12",
-                "2023-10",
-                "2023-11",
-                "2023-12",
-                "2024-01",
-                "2024-02",
-                "2024-03",
-                "2024-04",
-                "2024-05",
-                "2024-06",
-                "2024-07",
-                "2024-08",
-                "2024-09",
-                "2024-10",
-                "2024-11",
-                "2024-12",
-                "2023-10",
-                "2023-11",
-                "2023-12",
-                "2024-01",
-                "2024-02",
-                "2024-03",
-                "2024-04",
-                "2024-05",
-                "2024-06",
-                "2024-07",
-                "2024-08",
-                "2024-09",
-                "2024-10",
-                "2024-11",
-                "2024-12",
+                202310,
+                202311,
+                202312,
+                202401,
+                202402,
+                202403,
+                202404,
+                202405,
+                202406,
+                202407,
+                202408,
+                202409,
+                202410,
+                202411,
+                202412,
+                202310,
+                202311,
+                202312,
+                202401,
+                202402,
+                202403,
+                202404,
+                202405,
+                202406,
+                202407,
+                202408,
+                202409,
+                202410,
+                202411,
+                202412,
+                202310,
+                202311,
+                202312,
+                202401,
+                202402,
+                202403,
+                202404,
+                202405,
+                202406,
+                202407,
+                202408,
+                202409,
+                202410,
+                202411,
+                202412,
+                202310,
+                202311,
+                202312,
+                202401,
+                202402,
+                202403,
+                202404,
+                202405,
+                202406,
+                202407,
+                202408,
+                202409,
+                202410,
+                202411,
+                202412,
             ],
             "market_price": [
                 213.34510803222656,
@@ -375,7 +386,7 @@ def monthly_prices_df() -> DataFrame:
             "moniker": "string",
             "stock_type": "string",
             "currency_id": "int64",
-            "month": "string",
+            "month": "int64",
             "market_price": "float64",
         }
     )
@@ -393,8 +404,6 @@ def added_monthly_market_prices_df(monthly_prices_df: DataFrame, monthly_df: Dat
     df[["amount", "invested"]] = df[["amount", "invested"]].fillna(0, axis="columns")
     df["amount"] = df.groupby("moniker", sort=False)["amount"].cumsum()
 
-    df["month"] = df["month"].apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b-%y"))
-
     return df
 
 
@@ -491,43 +500,43 @@ def exchange_rates_df() -> DataFrame:
                 1,
             ],
             "month": [
-                "2022-01",
-                "2022-02",
-                "2022-03",
-                "2022-04",
-                "2022-05",
-                "2022-06",
-                "2022-07",
-                "2022-08",
-                "2022-09",
-                "2022-10",
-                "2022-11",
-                "2022-12",
-                "2023-01",
-                "2023-02",
-                "2023-03",
-                "2023-04",
-                "2023-05",
-                "2023-06",
-                "2023-07",
-                "2023-08",
-                "2023-09",
-                "2023-10",
-                "2023-11",
-                "2023-12",
-                "2024-01",
-                "2024-02",
-                "2024-03",
-                "2024-04",
-                "2024-05",
-                "2024-06",
-                "2024-07",
-                "2024-08",
-                "2024-09",
-                "2024-10",
-                "2024-11",
-                "2024-12",
-                "2025-01",
+                202201,
+                202202,
+                202203,
+                202204,
+                202205,
+                202206,
+                202207,
+                202208,
+                202209,
+                202210,
+                202211,
+                202212,
+                202301,
+                202302,
+                202303,
+                202304,
+                202305,
+                202306,
+                202307,
+                202308,
+                202309,
+                202310,
+                202311,
+                202312,
+                202401,
+                202402,
+                202403,
+                202404,
+                202405,
+                202406,
+                202407,
+                202408,
+                202409,
+                202410,
+                202411,
+                202412,
+                202501,
             ],
             "rate": [
                 0.7872713961,
@@ -573,26 +582,17 @@ def exchange_rates_df() -> DataFrame:
         dtype={
             "from_currency_id": "int64",
             "to_currency_id": "int64",
-            "month": "string",
+            "month": "int64",
             "rate": "float64",
         }
     )
 
 
 @pytest.fixture
-def formatted_exchange_rates_df(exchange_rates_df: DataFrame) -> DataFrame:
-    df = exchange_rates_df.copy(deep=True)
-
-    df["month"] = df["month"].apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b-%y"))
-
-    return df
-
-
-@pytest.fixture
-def with_exchange_rates_df(market_value_df: DataFrame, formatted_exchange_rates_df: DataFrame) -> DataFrame:
+def with_exchange_rates_df(market_value_df: DataFrame, exchange_rates_df: DataFrame) -> DataFrame:
     df = market_value_df.copy(deep=True)
     df = df.merge(
-        formatted_exchange_rates_df,
+        exchange_rates_df,
         how="left",
         left_on=["month", "currency_id"],
         right_on=["month", "from_currency_id"],
@@ -2,13 +2,17 @@ from datetime import datetime
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import numpy as np
 import pytest
-from pandas import DataFrame
+from pandas import DataFrame, read_sql
 from pytest_mock import MockerFixture
-from sqlalchemy import Selectable
+from sqlalchemy import Select, Selectable, create_engine, select
+from sqlalchemy.orm import Session
 
-from pyp.cli.commands.output.base import OutputCommand
-from pyp.database.models import Currency
+from pyp.cli.commands.output.base import OutputCommand, OutputFormat
+from pyp.cli.commands.output.cache import OutputCache
+from pyp.cli.commands.output.context import OutputContext
+from pyp.database.models import Base, Currency, ExchangeRate, Price, day_key, month_key
 
 
 @pytest.fixture
@@ -47,12 +51,46 @@ def test_initialization(portfolio_id: int, mock_engine: MagicMock) -> None:
     assert date == command.date
     assert currency_code == command.currency_code
 
+    assert OutputFormat.RECORDS == command.output_format
+
     assert command._currency_ids_by_code is None
+    assert dict() == command._written_files
+    assert isinstance(command.context, OutputContext)
+    assert mock_engine == command.context.engine
 
     expected_path = Path(__file__).parent.parent.parent.parent.parent.parent / "public/js/output"
     assert expected_path == command.output_dir
 
 
+def test_initialization_with_context(portfolio_id: int, mock_engine: MagicMock, mock_context: MagicMock) -> None:
+    command = OutputCommand(mock_engine, portfolio_id, datetime(2024, 12, 9), "USD", mock_context)
+
+    assert mock_context == command.context
+
+
+def test_initialization_with_output_format(portfolio_id: int, mock_engine: MagicMock) -> None:
+    command = OutputCommand(mock_engine, portfolio_id, datetime(2024, 12, 9), "USD", None, OutputFormat.COLUMNAR)
+
+    assert OutputFormat.COLUMNAR == command.output_format
+
+
+def test_initialization_with_output_dir(portfolio_id: int, mock_engine: MagicMock, tmp_path: Path) -> None:
+    command = OutputCommand(
+        mock_engine, portfolio_id, datetime(2024, 12, 9), "USD", None, OutputFormat.RECORDS, tmp_path
+    )
+
+    assert tmp_path == command.output_dir
+    assert tmp_path != OutputCommand.output_dir
+
+
+def test_portfolio_ids(command: OutputCommand, mock_engine: MagicMock) -> None:
+    assert [command.portfolio_id] == command._portfolio_ids
+
+    command.context = OutputContext(mock_engine, [command.portfolio_id, 7])
+
+    assert [command.portfolio_id, 7] == command._portfolio_ids
+
+
 def test_db_query_raises_not_implemented_error(command: OutputCommand) -> None:
     with pytest.raises(NotImplementedError):
         command._db_query
@@ -63,26 +101,32 @@ def test_df_dtypes_raises_not_implemented_error(command: OutputCommand) -> None:
         command._df_dtypes
 
 
-def test_resolve_currency_ids(
-    command: OutputCommand,
-    mock_session_class: MagicMock,
-    mock_session: MagicMock,
-    mock_select: MagicMock,
-    mocker: MockerFixture,
-) -> None:
-    currencies = [Currency(id=1, code="USD"), Currency(id=2, code="CAD")]
+def test_resolve_currency_ids(command: OutputCommand, mock_context: MagicMock) -> None:
+    currency_ids_by_code = {"USD": 1, "CAD": 2}
+    mock_context.currency_ids_by_code = currency_ids_by_code
+    command.context = mock_context
+
+    assert command == command._resolve_currency_ids()
 
-    mocker.patch("pyp.cli.commands.output.base.Session", mock_session_class)
-    mocker.patch("pyp.cli.commands.output.base.select", mock_select)
-    mock_session.scalars.return_value.all.return_value = currencies
+    assert currency_ids_by_code == command._currency_ids_by_code
 
-    command._resolve_currency_ids()
 
-    assert {c.code: c.id for c in currencies} == command._currency_ids_by_code
+def test_latest_per_group(command: OutputCommand) -> None:
+    db_query = command._latest_per_group(
+        select(Price.stock_id, Price.amount).where(Price.day_key <= 20241203),
+        [Price.stock_id],
+        Price.day_key,
+    )
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_session.scalars.assert_called_once()
-    mock_select.assert_called_once_with(Currency)
+    assert isinstance(db_query, Select)
+
+    query = """SELECT prices.stock_id, prices.amount
+    FROM prices JOIN (SELECT prices.stock_id AS stock_id, max(prices.day_key) AS day_key
+    FROM prices
+    WHERE prices.day_key <= :day_key_1 GROUP BY prices.stock_id) AS anon_1
+    ON prices.stock_id = anon_1.stock_id AND prices.day_key = anon_1.day_key"""
+
+    assert query.replace("\n    ", " ") == str(db_query).replace("\n", "")
 
 
 def test_exchange_rates_query_property(command: OutputCommand) -> None:
@@ -93,69 +137,163 @@ def test_exchange_rates_query_property(command: OutputCommand) -> None:
 
     assert isinstance(db_query, Selectable)
 
-    query = """SELECT
-        exchange_rates.from_currency_id,
-        exchange_rates.to_currency_id,
-        strftime(:strftime_1, max(exchange_rates.date)) AS month,
-        exchange_rates.rate
+    query = """WITH stored_rates AS (SELECT
+        exchange_rates.to_currency_id AS currency_id,
+        exchange_rates.month_key AS month,
+        exchange_rates.rate AS rate
+    FROM exchange_rates JOIN (SELECT
+        exchange_rates.from_currency_id AS from_currency_id,
+        exchange_rates.to_currency_id AS to_currency_id,
+        exchange_rates.month_key AS month_key,
+        max(exchange_rates.day_key) AS day_key
     FROM exchange_rates
-    WHERE exchange_rates.to_currency_id = :to_currency_id_1
-    AND exchange_rates.from_currency_id IN (__[POSTCOMPILE_from_currency_id_1])
-    AND exchange_rates.date <= :date_1
-    GROUP BY strftime(:strftime_2, exchange_rates.date)
-    ORDER BY exchange_rates.date"""
-
-    expected_query = (
-        query.replace("(\n            ", "(")
-        .replace("\n            ", " ")
-        .replace("\n            ", " ")
-        .replace("\n        )", ")")
-        .replace("\n        ", " ")
-        .replace("\n    ", " ")
-    )
+    WHERE exchange_rates.from_currency_id = :from_currency_id_1
+        AND exchange_rates.to_currency_id != :to_currency_id_1
+        AND exchange_rates.day_key <= :day_key_1
+    GROUP BY exchange_rates.from_currency_id, exchange_rates.to_currency_id, exchange_rates.month_key) AS anon_1
+    ON exchange_rates.from_currency_id = anon_1.from_currency_id
+        AND exchange_rates.to_currency_id = anon_1.to_currency_id
+        AND exchange_rates.month_key = anon_1.month_key
+        AND exchange_rates.day_key = anon_1.day_key),
+    pivot_rates AS (SELECT
+        stored_rates.currency_id AS currency_id,
+        stored_rates.month AS month,
+        stored_rates.rate AS rate
+    FROM stored_rates
+    UNION ALL SELECT DISTINCT :param_1 AS currency_id, stored_rates.month AS month, :param_2 AS rate
+    FROM stored_rates) SELECT
+        rate_from.currency_id AS from_currency_id,
+        rate_to.currency_id AS to_currency_id,
+        rate_from.month,
+        rate_to.rate / CAST(rate_from.rate AS DOUBLE) AS rate
+    FROM pivot_rates AS rate_from JOIN pivot_rates AS rate_to ON rate_from.month = rate_to.month
+    WHERE rate_to.currency_id = :currency_id_1
+        AND rate_from.currency_id IN (__[POSTCOMPILE_currency_id_2])
+    ORDER BY rate_from.month, rate_from.currency_id"""
+
+    expected_query = query.replace("(SELECT\n        ", "(SELECT ").replace("\n        ", " ").replace("\n    ", " ")
 
     assert expected_query == str(db_query).replace("\n", "")
 
 
+def test_exchange_rates_query_derives_cross_rates(command: OutputCommand) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Currency(id=1, code="USD"), Currency(id=2, code="CAD"), Currency(id=3, code="EUR")])
+        session.add_all([
+            ExchangeRate(
+                from_currency_id=1,
+                to_currency_id=to_currency_id,
+                date=date,
+                rate=rate,
+                day_key=day_key(date),
+                month_key=month_key(date),
+            )
+            for date, rates in [
+                (datetime(2024, 11, 15), {2: 1.25, 3: 0.8}),
+                (datetime(2024, 11, 30), {2: 1.4, 3: 0.9}),
+                (datetime(2024, 12, 2), {2: 1.5, 3: 0.95}),
+                (datetime(2024, 12, 4), {2: 1.6, 3: 1.0}),
+            ]
+            for to_currency_id, rate in rates.items()
+        ])
+        session.commit()
+
+    command._currency_ids_by_code = {"USD": 1, "CAD": 2, "EUR": 3}
+    command.currency_code = "CAD"
+
+    with engine.connect() as connection:
+        df = read_sql(command._exchange_rates_query, connection)
+
+    assert [(1, 2, 202411), (3, 2, 202411), (1, 2, 202412), (3, 2, 202412)] == list(
+        zip(df["from_currency_id"], df["to_currency_id"], df["month"])
+    )
+    assert [1.4, 1.4 / 0.9, 1.5, 1.5 / 0.95] == pytest.approx(df["rate"].tolist())
+
+    command.currency_code = "USD"
+
+    with engine.connect() as connection:
+        df = read_sql(command._exchange_rates_query, connection)
+
+    assert [(2, 1, 202411), (3, 1, 202411), (2, 1, 202412), (3, 1, 202412)] == list(
+        zip(df["from_currency_id"], df["to_currency_id"], df["month"])
+    )
+    assert [1 / 1.4, 1 / 0.9, 1 / 1.5, 1 / 0.95] == pytest.approx(df["rate"].tolist())
+
+
+def test_exchange_rates_query_ignores_pivot_self_rate(command: OutputCommand) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Currency(id=1, code="USD"), Currency(id=2, code="CAD")])
+        session.add_all([
+            ExchangeRate(
+                from_currency_id=1,
+                to_currency_id=to_currency_id,
+                date=datetime(2025, 1, 2),
+                rate=rate,
+                day_key=20250102,
+                month_key=202501,
+            )
+            for to_currency_id, rate in {1: 1.026936364, 2: 1.44}.items()
+        ])
+        session.commit()
+
+    command._currency_ids_by_code = {"USD": 1, "CAD": 2}
+    command.date = datetime(2025, 1, 31)
+    command.currency_code = "CAD"
+
+    with engine.connect() as connection:
+        df = read_sql(command._exchange_rates_query, connection)
+
+    assert [(1, 2, 202501, 1.44)] == list(zip(df["from_currency_id"], df["to_currency_id"], df["month"], df["rate"]))
+
+
 def test_exchange_rates_df(
     command: OutputCommand,
     exchange_rates_df: DataFrame,
-    formatted_exchange_rates_df: DataFrame,
-    mock_session_class: MagicMock,
-    mock_session: MagicMock,
+    mock_context: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.commands.output.base.Session", mock_session_class)
-
-    mock_read_sql = mocker.MagicMock(return_value=exchange_rates_df)
-    mocker.patch("pyp.cli.commands.output.base.pd.read_sql", mock_read_sql)
+    mock_context.read_sql.return_value = exchange_rates_df
+    command.context = mock_context
 
     db_query = Selectable()
     mock_property = mocker.PropertyMock(return_value=db_query)
     mocker.patch("pyp.cli.commands.output.base.OutputCommand._exchange_rates_query", mock_property)
 
-    assert formatted_exchange_rates_df.equals(command._exchange_rates_df)
+    assert exchange_rates_df.equals(command._exchange_rates_df)
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_read_sql.assert_called_once_with(db_query, mock_session.bind)
+    mock_context.read_sql.assert_called_once_with(
+        db_query,
+        {
+            "from_currency_id": "int64",
+            "to_currency_id": "int64",
+            "month": "int64",
+            "rate": "float64",
+        },
+    )
 
 
 def test_add_exchange_rates(
     command: OutputCommand,
     market_value_df: DataFrame,
-    formatted_exchange_rates_df: DataFrame,
+    exchange_rates_df: DataFrame,
     mocker: MockerFixture,
 ) -> None:
     command._df = market_value_df
 
-    mock_property = mocker.PropertyMock(return_value=formatted_exchange_rates_df)
+    mock_property = mocker.PropertyMock(return_value=exchange_rates_df)
     mocker.patch("pyp.cli.commands.output.base.OutputCommand._exchange_rates_df", mock_property)
 
     assert command == command._add_exchange_rates()
 
     df = market_value_df.copy(deep=True)
     df = df.merge(
-        formatted_exchange_rates_df,
+        exchange_rates_df,
         how="left",
         left_on=["month", "currency_id"],
         right_on=["month", "from_currency_id"],
@@ -171,14 +309,11 @@ def test_read_db(
     command: OutputCommand,
     df: DataFrame,
     df_dtypes,
-    mock_session_class: MagicMock,
-    mock_session: MagicMock,
+    mock_context: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.commands.output.base.Session", mock_session_class)
-
-    mock_read_sql = mocker.MagicMock(return_value=df)
-    mocker.patch("pyp.cli.commands.output.base.pd.read_sql", mock_read_sql)
+    mock_context.read_sql.return_value = df
+    command.context = mock_context
 
     db_query = Selectable()
     mock_property = mocker.PropertyMock(return_value=db_query)
@@ -189,8 +324,8 @@ def test_read_db(
 
     assert command == command._read_db()
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_read_sql.assert_called_once_with(db_query, mock_session.bind)
+    assert df.equals(command._df)
+    mock_context.read_sql.assert_called_once_with(db_query, df_dtypes)
 
 
 def test_prepare_df_raises_not_implemented_error(command: OutputCommand) -> None:
@@ -198,6 +333,56 @@ def test_prepare_df_raises_not_implemented_error(command: OutputCommand) -> None
         command._prepare_df()
 
 
+def test_with_month_labels(command: OutputCommand) -> None:
+    df = DataFrame(data={"month": [202312, 202401], "value": [1.0, 2.0]}).astype(dtype={"month": "int64"})
+
+    labelled_df = command._with_month_labels(df)
+
+    assert ["Dec-23", "Jan-24"] == labelled_df["month"].to_list()
+    assert [1.0, 2.0] == labelled_df["value"].to_list()
+    assert [202312, 202401] == df["month"].to_list()
+
+
+def test_to_json(command: OutputCommand, df: DataFrame) -> None:
+    assert df.to_json(orient="records") == command._to_json(df)
+
+
+def test_to_json_columnar(command: OutputCommand, mocker: MockerFixture) -> None:
+    command.output_format = OutputFormat.COLUMNAR
+
+    mock_to_columnar_json = mocker.MagicMock(return_value="{}")
+    mocker.patch.object(command, "_to_columnar_json", mock_to_columnar_json)
+    mock_df = mocker.MagicMock()
+
+    assert "{}" == command._to_json(mock_df)
+
+    mock_to_columnar_json.assert_called_once_with(mock_df)
+    mock_df.to_json.assert_not_called()
+
+
+def test_to_columnar_json(command: OutputCommand) -> None:
+    df = DataFrame(
+        data={
+            "month": ["Dec-23", "Jan-24"],
+            "ADP": [0.123456789, np.nan],
+            "amount": [1, 20],
+        }
+    )
+
+    assert '{"month":["Dec-23","Jan-24"],"ADP":[0.1235,null],"amount":[1,20]}' == command._to_columnar_json(df)
+
+
+def test_write_data_file(command: OutputCommand, tmp_path: Path) -> None:
+    command.output_dir = tmp_path
+
+    command.write_data_file("parts/growth.js", "growth_data = []")
+    command.write_data_file("parts/growth.js", "growth_data = [1]")
+
+    assert "growth_data = [1]" == (tmp_path / "parts/growth.js").read_text()
+    assert ["growth.js"] == [path.name for path in (tmp_path / "parts").iterdir()]
+    assert {"parts/growth.js": "growth_data = [1]"} == command._written_files
+
+
 def test_write_data_files_raises_not_implemented_error(command: OutputCommand) -> None:
     with pytest.raises(NotImplementedError):
         command._write_data_files()
@@ -222,6 +407,77 @@ def test_compute_share_value(command: OutputCommand, df: DataFrame) -> None:
     assert expected_df.equals(command._df)
 
 
+def test_cache_key(command: OutputCommand, mock_context: MagicMock, tmp_path: Path) -> None:
+    mock_context.cache = OutputCache(tmp_path)
+    mock_context.fingerprint = (("prices", 7), ("shares", 3))
+    command.context = mock_context
+    command.engine.url = "sqlite:///pyp.sqlite"
+
+    cache_key = command._cache_key
+
+    assert (
+        OutputCache.key(
+            "OutputCommand",
+            "sqlite:///pyp.sqlite",
+            command.portfolio_id,
+            20241203,
+            "USD",
+            "records",
+            (("prices", 7), ("shares", 3)),
+        )
+        == cache_key
+    )
+
+    command.date = datetime(2024, 12, 3, 18, 30)
+    assert cache_key == command._cache_key
+
+    mock_context.fingerprint = (("prices", 8), ("shares", 3))
+    assert cache_key != command._cache_key
+
+
+@pytest.mark.parametrize("cache,fingerprint", [(None, (("prices", 7),)), (OutputCache(), tuple())])
+def test_cache_key_disabled(
+    cache: OutputCache | None,
+    fingerprint: tuple,
+    command: OutputCommand,
+    mock_context: MagicMock,
+) -> None:
+    mock_context.cache = cache
+    mock_context.fingerprint = fingerprint
+    command.context = mock_context
+
+    assert command._cache_key is None
+
+
+def test_write_cached_data_files(
+    command: OutputCommand,
+    mock_context: MagicMock,
+    tmp_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    mock_context.cache = OutputCache(tmp_path)
+    mock_context.cache.put("key", {"parts/growth.js": "growth_data = []"})
+    command.context = mock_context
+
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
+
+    assert command._write_cached_data_files("key")
+    assert not command._write_cached_data_files("missing")
+
+    mock_write_data_file.assert_called_once_with("parts/growth.js", "growth_data = []")
+
+
+def test_cache_data_files(command: OutputCommand, mock_context: MagicMock, tmp_path: Path) -> None:
+    mock_context.cache = OutputCache(tmp_path)
+    command.context = mock_context
+    command._written_files = {"growth.js": "growth_data = []"}
+
+    command._cache_data_files("key")
+
+    assert {"growth.js": "growth_data = []"} == mock_context.cache.get("key")
+
+
 def test_execute_writes_data_files(command: OutputCommand, mocker: MockerFixture) -> None:
     mock_pdf = mocker.MagicMock()
     mocker.patch.object(command, "_prepare_df", mock_pdf)
@@ -233,3 +489,43 @@ def test_execute_writes_data_files(command: OutputCommand, mocker: MockerFixture
 
     mock_pdf.assert_called_once()
     mock_write_data_files.assert_called_once()
+
+
+def test_execute_caches_data_files(command: OutputCommand, mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.commands.output.base.OutputCommand._cache_key", mocker.PropertyMock(return_value="key"))
+
+    mock_write_cached_data_files = mocker.MagicMock(return_value=False)
+    mocker.patch.object(command, "_write_cached_data_files", mock_write_cached_data_files)
+    mock_pdf = mocker.MagicMock()
+    mocker.patch.object(command, "_prepare_df", mock_pdf)
+    mock_write_data_files = mocker.MagicMock()
+    mocker.patch.object(command, "_write_data_files", mock_write_data_files)
+    mock_cache_data_files = mocker.MagicMock()
+    mocker.patch.object(command, "_cache_data_files", mock_cache_data_files)
+
+    command.execute()
+
+    mock_write_cached_data_files.assert_called_once_with("key")
+    mock_pdf.assert_called_once()
+    mock_write_data_files.assert_called_once()
+    mock_cache_data_files.assert_called_once_with("key")
+
+
+def test_execute_reuses_cached_data_files(command: OutputCommand, mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.commands.output.base.OutputCommand._cache_key", mocker.PropertyMock(return_value="key"))
+
+    mock_write_cached_data_files = mocker.MagicMock(return_value=True)
+    mocker.patch.object(command, "_write_cached_data_files", mock_write_cached_data_files)
+    mock_pdf = mocker.MagicMock()
+    mocker.patch.object(command, "_prepare_df", mock_pdf)
+    mock_write_data_files = mocker.MagicMock()
+    mocker.patch.object(command, "_write_data_files", mock_write_data_files)
+    mock_cache_data_files = mocker.MagicMock()
+    mocker.patch.object(command, "_cache_data_files", mock_cache_data_files)
+
+    command.execute()
+
+    mock_write_cached_data_files.assert_called_once_with("key")
+    mock_pdf.assert_not_called()
+    mock_write_data_files.assert_not_called()
+    mock_cache_data_files.assert_not_called()
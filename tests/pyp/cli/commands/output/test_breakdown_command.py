@@ -1,16 +1,17 @@
 import json
 from datetime import datetime
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock
 
 import pytest
-from pandas import DataFrame
+from pandas import DataFrame, read_sql
 from pytest_mock import MockerFixture
-from sqlalchemy import Selectable
+from sqlalchemy import Selectable, create_engine
+from sqlalchemy.orm import Session
 
 from pyp.cli.commands.output.base import OutputCommand
 from pyp.cli.commands.output.breakdown import OutputBreakdownCommand
 from pyp.cli.protocols import OutputCommandProtocol
-from pyp.database.models import Currency
+from pyp.database.models import Base, Currency, ExchangeRate
 
 
 @pytest.fixture
@@ -85,14 +86,12 @@ def exchange_rates_df() -> DataFrame:
         data={
             "from_currency_id": [2],
             "to_currency_id": [1],
-            "date": ["2025-01-01"],
             "rate": [0.7872713961],
         }
     ).astype(
         dtype={
             "from_currency_id": "int64",
             "to_currency_id": "int64",
-            "date": "string",
             "rate": "float64",
         }
     )
@@ -167,15 +166,15 @@ def test_db_query_property(command: OutputBreakdownCommand) -> None:
         (SELECT prices.amount
         FROM prices
         WHERE prices.stock_id = stocks.id
-        AND prices.date <= :date_1
-        ORDER BY prices.date DESC
+        AND prices.day_key <= :day_key_1
+        ORDER BY prices.day_key DESC
         LIMIT :param_1) AS price
     FROM shares
     JOIN portfolio_stocks ON portfolio_stocks.id = shares.portfolio_stocks_id
     JOIN stocks ON stocks.id = portfolio_stocks.stock_id
-    WHERE shares.purchased_on <= :purchased_on_1
+    WHERE shares.day_key <= :day_key_2
         AND portfolio_stocks.portfolio_id = :portfolio_id_1
-    GROUP BY stocks.moniker"""
+    GROUP BY stocks.id"""
 
     expected_query = query.replace("\n        ", " ").replace("\n    ", " ")
 
@@ -201,40 +200,76 @@ def test_exchange_rates_query_property(command: OutputBreakdownCommand) -> None:
 
     assert isinstance(db_query, Selectable)
 
-    query = """SELECT
-        exchange_rates.from_currency_id,
-        exchange_rates.to_currency_id,
-        max(exchange_rates.date) AS date,
-        exchange_rates.rate
+    query = """WITH stored_rates AS (SELECT
+        exchange_rates.to_currency_id AS currency_id,
+        exchange_rates.rate AS rate
+    FROM exchange_rates JOIN (SELECT
+        exchange_rates.from_currency_id AS from_currency_id,
+        exchange_rates.to_currency_id AS to_currency_id,
+        max(exchange_rates.day_key) AS day_key
     FROM exchange_rates
-    WHERE exchange_rates.to_currency_id = :to_currency_id_1
-    AND exchange_rates.from_currency_id IN (__[POSTCOMPILE_from_currency_id_1])
-    AND exchange_rates.date <= :date_1
-    GROUP BY exchange_rates.from_currency_id, exchange_rates.to_currency_id"""
-
-    expected_query = (
-        query.replace("(\n            ", "(")
-        .replace("\n            ", " ")
-        .replace("\n            ", " ")
-        .replace("\n        )", ")")
-        .replace("\n        ", " ")
-        .replace("\n    ", " ")
-    )
+    WHERE exchange_rates.from_currency_id = :from_currency_id_1
+        AND exchange_rates.to_currency_id != :to_currency_id_1
+        AND exchange_rates.day_key <= :day_key_1
+    GROUP BY exchange_rates.from_currency_id, exchange_rates.to_currency_id) AS anon_1
+    ON exchange_rates.from_currency_id = anon_1.from_currency_id
+        AND exchange_rates.to_currency_id = anon_1.to_currency_id
+        AND exchange_rates.day_key = anon_1.day_key),
+    pivot_rates AS (SELECT
+        stored_rates.currency_id AS currency_id,
+        stored_rates.rate AS rate
+    FROM stored_rates
+    UNION ALL SELECT DISTINCT :param_1 AS currency_id, :param_2 AS rate) SELECT
+        rate_from.currency_id AS from_currency_id,
+        rate_to.currency_id AS to_currency_id,
+        rate_to.rate / CAST(rate_from.rate AS DOUBLE) AS rate
+    FROM pivot_rates AS rate_from JOIN pivot_rates AS rate_to ON true
+    WHERE rate_to.currency_id = :currency_id_1
+        AND rate_from.currency_id IN (__[POSTCOMPILE_currency_id_2])
+    ORDER BY rate_from.currency_id"""
+
+    expected_query = query.replace("(SELECT\n        ", "(SELECT ").replace("\n        ", " ").replace("\n    ", " ")
 
     assert expected_query == str(db_query).replace("\n", "")
 
 
+def test_exchange_rates_query_ignores_pivot_self_rate(command: OutputBreakdownCommand) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Currency(id=1, code="USD"), Currency(id=2, code="CAD")])
+        session.add_all([
+            ExchangeRate(
+                from_currency_id=1,
+                to_currency_id=to_currency_id,
+                date=datetime(2025, 1, 2),
+                rate=rate,
+                day_key=20250102,
+                month_key=202501,
+            )
+            for to_currency_id, rate in {1: 1.026936364, 2: 1.44}.items()
+        ])
+        session.commit()
+
+    command._currency_ids_by_code = {"USD": 1, "CAD": 2}
+    command.date = datetime(2025, 1, 31)
+    command.currency_code = "CAD"
+
+    with engine.connect() as connection:
+        df = read_sql(command._exchange_rates_query, connection)
+
+    assert [(1, 2, 1.44)] == list(zip(df["from_currency_id"], df["to_currency_id"], df["rate"]))
+
+
 def test_exchange_rates_df(
     command: OutputBreakdownCommand,
     exchange_rates_df: DataFrame,
-    mock_session_class: MagicMock,
-    mock_session: MagicMock,
+    mock_context: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.commands.output.breakdown.Session", mock_session_class)
-
-    mock_read_sql = mocker.MagicMock(return_value=exchange_rates_df)
-    mocker.patch("pyp.cli.commands.output.breakdown.pd.read_sql", mock_read_sql)
+    mock_context.read_sql.return_value = exchange_rates_df
+    command.context = mock_context
 
     db_query = Selectable()
     mock_property = mocker.PropertyMock(return_value=db_query)
@@ -242,8 +277,14 @@ def test_exchange_rates_df(
 
     assert exchange_rates_df.equals(command._exchange_rates_df)
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_read_sql.assert_called_once_with(db_query, mock_session.bind)
+    mock_context.read_sql.assert_called_once_with(
+        db_query,
+        {
+            "from_currency_id": "int64",
+            "to_currency_id": "int64",
+            "rate": "float64",
+        },
+    )
 
 
 def test_add_exchange_rates(
@@ -280,7 +321,7 @@ def test_convert_to_currency(command: OutputBreakdownCommand, with_exchange_rate
     df["amount"] = df["amount"] * df["rate"]
     df["value"] = df["value"] * df["rate"]
 
-    df = df.drop(columns=["rate", "date"])
+    df = df.drop(columns=["rate"])
 
     command._convert_to_currency()
 
@@ -399,10 +440,8 @@ def test_writes_data_files(command: OutputBreakdownCommand, mocker: MockerFixtur
         "pyp.cli.commands.output.breakdown.OutputBreakdownCommand._sector_breakdown_df", mock_sector_breakdown_df
     )
 
-    mock_open = mocker.MagicMock()
-    mock_file = mocker.MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
-    mocker.patch("pyp.cli.commands.output.breakdown.open", mock_open)
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
 
     command._write_data_files()
     assert command.output_dir is not None
@@ -411,9 +450,9 @@ def test_writes_data_files(command: OutputBreakdownCommand, mocker: MockerFixtur
     mock_stock_type_breakdown_df.to_json.assert_called_once_with(orient="records")
     mock_sector_breakdown_df.to_json.assert_called_once_with(orient="records")
 
-    mock_open.assert_called_once_with(command.output_dir / "breakdown.js", "w")
-    mock_file.write.assert_has_calls([
-        call(f"breakdown_by_moniker_data = {mock_moniker_breakdown_df.to_json.return_value}\n"),
-        call(f"breakdown_by_stock_type_data = {mock_stock_type_breakdown_df.to_json.return_value}\n"),
-        call(f"breakdown_by_sector_data = {mock_sector_breakdown_df.to_json.return_value}\n"),
-    ])
+    mock_write_data_file.assert_called_once_with(
+        "parts/breakdown.js",
+        f"breakdown_by_moniker_data = {mock_moniker_breakdown_df.to_json.return_value}\n"
+        f"breakdown_by_stock_type_data = {mock_stock_type_breakdown_df.to_json.return_value}\n"
+        f"breakdown_by_sector_data = {mock_sector_breakdown_df.to_json.return_value}\n",
+    )
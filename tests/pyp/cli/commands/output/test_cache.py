@@ -0,0 +1,72 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from pyp.cli.commands.output.cache import OutputCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> OutputCache:
+    return OutputCache(tmp_path, 1024)
+
+
+def test_initialization() -> None:
+    cache = OutputCache()
+
+    expected_path = Path(__file__).parent.parent.parent.parent.parent.parent / ".cache/output"
+    assert expected_path == cache.cache_dir
+    assert 64 * 1024 * 1024 == cache.max_size
+
+
+def test_initialization_with_cache_dir(tmp_path: Path) -> None:
+    cache = OutputCache(tmp_path, 10)
+
+    assert tmp_path == cache.cache_dir
+    assert 10 == cache.max_size
+
+
+def test_key() -> None:
+    key = OutputCache.key("OutputGrowthCommand", 1, 20241203, "USD")
+
+    assert 64 == len(key)
+    assert key == OutputCache.key("OutputGrowthCommand", 1, 20241203, "USD")
+    assert key != OutputCache.key("OutputGrowthCommand", 1, 20241204, "USD")
+
+
+def test_get_missing_key(cache: OutputCache) -> None:
+    assert cache.get(OutputCache.key("missing")) is None
+
+
+def test_get_corrupt_entry(cache: OutputCache, tmp_path: Path) -> None:
+    key = OutputCache.key("corrupt")
+    (tmp_path / f"{key}.json").write_text('{"growth.js": ')
+
+    assert cache.get(key) is None
+
+
+def test_put_and_get(cache: OutputCache, tmp_path: Path) -> None:
+    key = OutputCache.key("growth")
+    files = {"growth.js": "growth_data = []"}
+
+    cache.put(key, files)
+
+    assert files == cache.get(key)
+    assert [f"{key}.json"] == [path.name for path in tmp_path.iterdir()]
+
+
+def test_put_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = OutputCache(tmp_path, 1300)
+    keys = [OutputCache.key(index) for index in range(3)]
+
+    for index, key in enumerate(keys):
+        cache.put(key, {"growth.js": "x" * 400})
+        os.utime(tmp_path / f"{key}.json", (index, index))
+
+    cache.get(keys[0])
+    cache.put(OutputCache.key("new"), {"growth.js": "x" * 400})
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+    assert cache.get(OutputCache.key("new")) is not None
@@ -0,0 +1,211 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+from pandas import DataFrame
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+
+from pyp.cli.commands.output.cache import OutputCache
+from pyp.cli.commands.output.context import OutputContext
+from pyp.database.models import Currency, Price, TableVersion
+
+
+@pytest.fixture
+def context(mock_engine: MagicMock) -> OutputContext:
+    return OutputContext(mock_engine)
+
+
+@pytest.fixture
+def dtypes() -> dict[str, str]:
+    return {"stock_id": "int64", "amount": "float64"}
+
+
+@pytest.fixture
+def prices_df(dtypes: dict[str, str]) -> DataFrame:
+    return DataFrame(data={"stock_id": [1, 2], "amount": [1.5, 2.5]}).astype(dtype=dtypes)
+
+
+def test_initialization(mock_engine: MagicMock) -> None:
+    context = OutputContext(mock_engine)
+
+    assert mock_engine == context.engine
+    assert context.portfolio_ids is None
+    assert context.cache is None
+    assert context._currency_ids_by_code is None
+    assert context._fingerprint is None
+    assert dict() == context._frames
+
+
+def test_initialization_with_portfolio_ids(mock_engine: MagicMock) -> None:
+    context = OutputContext(mock_engine, [1, 2])
+
+    assert [1, 2] == context.portfolio_ids
+
+
+def test_initialization_with_cache(mock_engine: MagicMock, tmp_path) -> None:
+    cache = OutputCache(tmp_path)
+
+    context = OutputContext(mock_engine, [1, 2], cache)
+
+    assert cache == context.cache
+
+
+def test_currency_ids_by_code_loads_once(
+    context: OutputContext,
+    mock_session_class: MagicMock,
+    mock_session: MagicMock,
+    mock_select: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    currencies = [Currency(id=1, code="USD"), Currency(id=2, code="CAD")]
+
+    mocker.patch("pyp.cli.commands.output.context.Session", mock_session_class)
+    mocker.patch("pyp.cli.commands.output.context.select", mock_select)
+    mock_session.scalars.return_value.all.return_value = currencies
+
+    assert {c.code: c.id for c in currencies} == context.currency_ids_by_code
+    assert {c.code: c.id for c in currencies} == context.currency_ids_by_code
+
+    mock_session_class.assert_called_once_with(context.engine)
+    mock_session.scalars.assert_called_once()
+    mock_select.assert_called_once_with(Currency)
+
+
+def test_fingerprint_reads_table_versions_once() -> None:
+    engine = create_engine("sqlite://")
+    TableVersion.metadata.create_all(engine, tables=[TableVersion.__table__])
+
+    with engine.begin() as connection:
+        connection.execute(
+            TableVersion.__table__.insert(),
+            [
+                {"table_name": "shares", "version": 3},
+                {"table_name": "prices", "version": 7},
+            ],
+        )
+
+    context = OutputContext(engine)
+
+    assert (("prices", 7), ("shares", 3)) == context.fingerprint
+
+    with engine.begin() as connection:
+        connection.execute(TableVersion.__table__.update().values(version=8))
+
+    assert (("prices", 7), ("shares", 3)) == context.fingerprint
+
+
+def test_fingerprint_without_table_versions() -> None:
+    context = OutputContext(create_engine("sqlite://"))
+
+    assert tuple() == context.fingerprint
+
+
+def test_read_sql_reads_each_query_once(
+    context: OutputContext,
+    prices_df: DataFrame,
+    dtypes: dict[str, str],
+    mock_session_class: MagicMock,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.commands.output.context.Session", mock_session_class)
+
+    mock_read_sql = mocker.MagicMock(return_value=prices_df)
+    mocker.patch("pyp.cli.commands.output.context.pd.read_sql", mock_read_sql)
+
+    query = select(Price.stock_id, Price.amount).where(Price.date <= "2024-12-03")
+
+    first_df = context.read_sql(query, dtypes)
+    second_df = context.read_sql(select(Price.stock_id, Price.amount).where(Price.date <= "2024-12-03"), dtypes)
+
+    assert prices_df.equals(first_df)
+    assert prices_df.equals(second_df)
+
+    mock_session_class.assert_called_once_with(context.engine)
+    mock_read_sql.assert_called_once_with(query, mock_session.bind)
+
+
+def test_read_sql_hands_out_copies(
+    context: OutputContext,
+    prices_df: DataFrame,
+    dtypes: dict[str, str],
+    mock_session_class: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.commands.output.context.Session", mock_session_class)
+    mocker.patch("pyp.cli.commands.output.context.pd.read_sql", mocker.MagicMock(return_value=prices_df.copy()))
+
+    query = select(Price.stock_id, Price.amount)
+
+    df = context.read_sql(query, dtypes)
+    df["amount"] = 0.0
+
+    assert prices_df.equals(context.read_sql(query, dtypes))
+
+
+def test_read_sql_distinguishes_parameters(
+    context: OutputContext,
+    prices_df: DataFrame,
+    dtypes: dict[str, str],
+    mock_session_class: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.commands.output.context.Session", mock_session_class)
+
+    mock_read_sql = mocker.MagicMock(return_value=prices_df)
+    mocker.patch("pyp.cli.commands.output.context.pd.read_sql", mock_read_sql)
+
+    context.read_sql(select(Price.stock_id, Price.amount).where(Price.date <= datetime(2024, 12, 3)), dtypes)
+    context.read_sql(select(Price.stock_id, Price.amount).where(Price.date <= datetime(2024, 12, 4)), dtypes)
+
+    assert 2 == mock_read_sql.call_count
+
+
+def test_read_sql_reads_once_across_threads(
+    context: OutputContext,
+    prices_df: DataFrame,
+    dtypes: dict[str, str],
+    mock_session_class: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.commands.output.context.Session", mock_session_class)
+
+    def slow_read_sql(*args) -> DataFrame:
+        time.sleep(0.05)
+
+        return prices_df
+
+    mock_read_sql = mocker.MagicMock(side_effect=slow_read_sql)
+    mocker.patch("pyp.cli.commands.output.context.pd.read_sql", mock_read_sql)
+
+    query = select(Price.stock_id, Price.amount)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        dfs = list(executor.map(lambda _: context.read_sql(query, dtypes), range(4)))
+
+    assert all(prices_df.equals(df) for df in dfs)
+    mock_read_sql.assert_called_once()
+
+
+def test_frame_key_distinguishes_in_parameters(dtypes: dict[str, str]) -> None:
+    first_key = OutputContext._frame_key(select(Price.stock_id).where(Price.stock_id.in_([1, 2])), dtypes)
+    second_key = OutputContext._frame_key(select(Price.stock_id).where(Price.stock_id.in_([1, 3])), dtypes)
+
+    assert first_key != second_key
+    assert first_key == OutputContext._frame_key(select(Price.stock_id).where(Price.stock_id.in_([1, 2])), dtypes)
+
+
+def test_frame_key_uses_compiled_query(dtypes: dict[str, str]) -> None:
+    query = select(Price.stock_id).where(Price.stock_id == 1)
+    compiled = query.compile()
+
+    assert (str(compiled), repr([("stock_id_1", 1)]), tuple(sorted(dtypes.items()))) == OutputContext._frame_key(
+        query, dtypes
+    )
+    assert OutputContext._frame_key(query, dtypes) != OutputContext._frame_key(
+        select(Price.stock_id).where(Price.stock_id == 2), dtypes
+    )
+    assert OutputContext._frame_key(query, dtypes) != OutputContext._frame_key(query, {"stock_id": "int32"})
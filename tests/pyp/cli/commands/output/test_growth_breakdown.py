@@ -1,5 +1,5 @@
 from datetime import datetime
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
 import pytest
 from pandas import DataFrame
@@ -137,6 +137,29 @@ def test_equity_month_vs_profit_ratio_df(command: OutputGrowthBreakdownCommand,
     assert expected_df.equals(actual_df)
 
 
+def test_month_vs_moniker_df_aligns_missing_months(command: OutputGrowthBreakdownCommand) -> None:
+    command._df = DataFrame(
+        data={
+            "month": [202401, 202402, 202403, 202402, 202403, 202401],
+            "moniker": ["ADP", "ADP", "ADP", "PLTR", "PLTR", "IYK"],
+            "stock_type": ["EQUITY", "EQUITY", "EQUITY", "EQUITY", "EQUITY", "ETF"],
+            "profit_ratio": [0.1, 0.2, 0.3, 0.5, 0.6, 0.9],
+        }
+    )
+
+    expected_df = DataFrame(
+        data={
+            "month": [202401, 202402, 202403],
+            "ADP": [0.1, 0.2, 0.3],
+            "PLTR": [None, 0.5, 0.6],
+        }
+    )
+
+    actual_df = command._month_vs_moniker_df("EQUITY", "profit_ratio")
+
+    assert expected_df.equals(actual_df)
+
+
 def test_etf_month_vs_profit_ratio_df(command: OutputGrowthBreakdownCommand, profit_ratio_df: DataFrame) -> None:
     command._df = profit_ratio_df
 
@@ -174,14 +197,19 @@ def test_writes_data_files(command: OutputGrowthBreakdownCommand, mocker: Mocker
         mock_etf_month_vs_profit_ratio_df,
     )
 
-    mock_open = mocker.MagicMock()
-    mock_file = mocker.MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
-    mocker.patch("pyp.cli.commands.output.growth_breakdown.open", mock_open)
+    mock_with_month_labels = mocker.MagicMock(side_effect=lambda df: df)
+    mocker.patch.object(command, "_with_month_labels", mock_with_month_labels)
+
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
 
     command._write_data_files()
     assert command.output_dir is not None
 
+    mock_with_month_labels.assert_has_calls([
+        call(mock_equity_month_vs_profit_ratio_df),
+        call(mock_etf_month_vs_profit_ratio_df),
+    ])
     mock_equity_month_vs_profit_ratio_df.to_json.assert_called_once_with(orient="records")
 
     growth_breakdown_by_stock_type = (
@@ -189,5 +217,6 @@ def test_writes_data_files(command: OutputGrowthBreakdownCommand, mocker: Mocker
         f'"ETF": {mock_etf_month_vs_profit_ratio_df.to_json.return_value}}}'
     )
 
-    mock_open.assert_called_once_with(command.output_dir / "breakdown.js", "a")
-    mock_file.write.assert_called_once_with(f"growth_breakdown_by_stock_type_data = {growth_breakdown_by_stock_type}\n")
+    mock_write_data_file.assert_called_once_with(
+        "parts/growth_breakdown.js", f"growth_breakdown_by_stock_type_data = {growth_breakdown_by_stock_type}\n"
+    )
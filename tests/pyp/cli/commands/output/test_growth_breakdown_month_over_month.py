@@ -1,5 +1,5 @@
 from datetime import datetime
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, call
 
 import pytest
 from pandas import DataFrame
@@ -14,12 +14,10 @@ from pyp.cli.protocols import OutputCommandProtocol
 
 
 @pytest.fixture
-def with_exchange_rates_df(
-    added_monthly_market_prices_df: DataFrame, formatted_exchange_rates_df: DataFrame
-) -> DataFrame:
+def with_exchange_rates_df(added_monthly_market_prices_df: DataFrame, exchange_rates_df: DataFrame) -> DataFrame:
     df = added_monthly_market_prices_df.copy(deep=True)
     df = df.merge(
-        formatted_exchange_rates_df,
+        exchange_rates_df,
         how="left",
         left_on=["month", "currency_id"],
         right_on=["month", "from_currency_id"],
@@ -203,14 +201,19 @@ def test_writes_data_files(command: OutputGrowthBreakdownMonthOverMonthCommand,
         mock_etf_month_over_month_ratio_df,
     )
 
-    mock_open = mocker.MagicMock()
-    mock_file = mocker.MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
-    mocker.patch("pyp.cli.commands.output.growth_breakdown.open", mock_open)
+    mock_with_month_labels = mocker.MagicMock(side_effect=lambda df: df)
+    mocker.patch.object(command, "_with_month_labels", mock_with_month_labels)
+
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
 
     command._write_data_files()
     assert command.output_dir is not None
 
+    mock_with_month_labels.assert_has_calls([
+        call(mock_equity_month_over_month_ratio_df),
+        call(mock_etf_month_over_month_ratio_df),
+    ])
     mock_equity_month_over_month_ratio_df.to_json.assert_called_once_with(orient="records")
 
     growth_breakdown_by_stock_type = (
@@ -218,7 +221,6 @@ def test_writes_data_files(command: OutputGrowthBreakdownMonthOverMonthCommand,
         f'"ETF": {mock_etf_month_over_month_ratio_df.to_json.return_value}}}'
     )
 
-    mock_open.assert_called_once_with(command.output_dir / "breakdown.js", "a")
-    mock_file.write.assert_called_once_with(
-        f"growth_breakdown_mom_by_stock_type_data = {growth_breakdown_by_stock_type}\n"
+    mock_write_data_file.assert_called_once_with(
+        "parts/growth_breakdown_mom.js", f"growth_breakdown_mom_by_stock_type_data = {growth_breakdown_by_stock_type}\n"
     )
@@ -2,11 +2,12 @@ from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
-from pandas import DataFrame
+from pandas import DataFrame, concat
 from pytest_mock import MockerFixture
 from sqlalchemy import Selectable
 
 from pyp.cli.commands.output.base import OutputCommand
+from pyp.cli.commands.output.context import OutputContext
 from pyp.cli.commands.output.growth import OutputGrowthCommand
 from pyp.cli.protocols import OutputCommandProtocol
 from pyp.database.models import Currency
@@ -42,13 +43,13 @@ def test_db_query_property(command: OutputGrowthCommand) -> None:
         stocks.stock_type,
         shares.amount,
         shares.price,
-        strftime(:strftime_1, shares.purchased_on) AS month
+        shares.month_key AS month
     FROM shares
     JOIN portfolio_stocks ON portfolio_stocks.id = shares.portfolio_stocks_id
     JOIN stocks ON stocks.id = portfolio_stocks.stock_id
     WHERE portfolio_stocks.portfolio_id = :portfolio_id_1
-        AND shares.purchased_on <= :purchased_on_1
-    ORDER BY shares.purchased_on"""
+        AND shares.day_key <= :day_key_1
+    ORDER BY shares.day_key"""
 
     expected_query = (
         query.replace("(\n            ", "(")
@@ -68,7 +69,7 @@ def test_df_dtypes_property(command: OutputGrowthCommand) -> None:
         "stock_type": "string",
         "amount": "float64",
         "price": "float64",
-        "month": "string",
+        "month": "int64",
     } == command._df_dtypes
 
 
@@ -103,56 +104,192 @@ def test_sum_up_by_month_and_moniker(command: OutputGrowthCommand, invested_df:
     assert df.equals(command._df)
 
 
-def test_monthly_prices_query_property(command: OutputGrowthCommand) -> None:
-    db_query = command._monthly_prices_query
+def test_closed_monthly_prices_query_property(command: OutputGrowthCommand) -> None:
+    db_query = command._closed_monthly_prices_query
+
+    assert isinstance(db_query, Selectable)
+
+    query = """SELECT
+        stocks.id AS stock_id,
+        stocks.moniker,
+        stocks.stock_type,
+        stocks.currency_id,
+        monthly_prices.year_month AS month,
+        monthly_prices.close AS market_price,
+        monthly_prices.date
+    FROM monthly_prices
+    JOIN stocks ON stocks.id = monthly_prices.stock_id
+    WHERE monthly_prices.stock_id IN (SELECT portfolio_stocks.stock_id
+    FROM portfolio_stocks
+    WHERE portfolio_stocks.portfolio_id IN (__[POSTCOMPILE_portfolio_id_1]))
+        AND monthly_prices.year_month < :year_month_1"""
+
+    expected_query = query.replace("\n        ", " ").replace("\n    ", " ")
+
+    assert expected_query == str(db_query).replace("\n", "")
+    assert [command.portfolio_id] == db_query.compile().params["portfolio_id_1"]
+    assert 202412 == db_query.compile().params["year_month_1"]
+
+
+def test_current_monthly_prices_query_property(command: OutputGrowthCommand) -> None:
+    db_query = command._current_monthly_prices_query
 
     assert isinstance(db_query, Selectable)
 
     query = """SELECT
+        stocks.id AS stock_id,
         stocks.moniker,
         stocks.stock_type,
         stocks.currency_id,
-        strftime(:strftime_1, max(prices.date)) AS month,
-        prices.amount AS market_price
+        anon_1.month_key AS month,
+        anon_1.amount AS market_price,
+        anon_1.date
+    FROM (SELECT
+        prices.stock_id AS stock_id,
+        prices.date AS date,
+        prices.month_key AS month_key,
+        prices.amount AS amount
+    FROM prices JOIN (SELECT prices.stock_id AS stock_id, max(prices.day_key) AS day_key
     FROM prices
-    JOIN stocks ON stocks.id = prices.stock_id
-    JOIN portfolio_stocks ON stocks.id = portfolio_stocks.stock_id
-    WHERE portfolio_stocks.portfolio_id = :portfolio_id_1 AND prices.date <= :date_1
-    GROUP BY stocks.moniker, strftime(:strftime_2, prices.date)
-    ORDER BY prices.date"""
+    WHERE prices.stock_id IN (SELECT portfolio_stocks.stock_id
+    FROM portfolio_stocks
+    WHERE portfolio_stocks.portfolio_id IN (__[POSTCOMPILE_portfolio_id_1]))
+        AND prices.day_key >= :day_key_1 AND prices.day_key <= :day_key_2
+    GROUP BY prices.stock_id) AS anon_2
+    ON prices.stock_id = anon_2.stock_id AND prices.day_key = anon_2.day_key) AS anon_1
+    JOIN stocks ON stocks.id = anon_1.stock_id"""
 
-    expected_query = (
-        query.replace("(\n            ", "(")
-        .replace("\n            ", " ")
-        .replace("\n            ", " ")
-        .replace("\n        )", ")")
-        .replace("\n        ", " ")
-        .replace("\n    ", " ")
-    )
+    expected_query = query.replace("(SELECT\n        ", "(SELECT ").replace("\n        ", " ").replace("\n    ", " ")
+
+    assert expected_query == str(db_query).replace("\n", "")
+
+    params = db_query.compile().params
+    assert 20241201 == params["day_key_1"]
+    assert 20241203 == params["day_key_2"]
+
+
+def test_monthly_prices_query_property(command: OutputGrowthCommand) -> None:
+    db_query = command._monthly_prices_query
+
+    assert isinstance(db_query, Selectable)
+
+    query = """SELECT
+        anon_1.stock_id,
+        anon_1.moniker,
+        anon_1.stock_type,
+        anon_1.currency_id,
+        anon_1.month,
+        anon_1.market_price
+    FROM (SELECT
+        stocks.id AS stock_id,
+        stocks.moniker AS moniker,
+        stocks.stock_type AS stock_type,
+        stocks.currency_id AS currency_id,
+        monthly_prices.year_month AS month,
+        monthly_prices.close AS market_price,
+        monthly_prices.date AS date
+    FROM monthly_prices
+    JOIN stocks ON stocks.id = monthly_prices.stock_id
+    WHERE monthly_prices.stock_id IN (SELECT portfolio_stocks.stock_id
+    FROM portfolio_stocks
+    WHERE portfolio_stocks.portfolio_id IN (__[POSTCOMPILE_portfolio_id_1]))
+        AND monthly_prices.year_month < :year_month_1
+    UNION ALL SELECT
+        stocks.id AS stock_id,
+        stocks.moniker AS moniker,
+        stocks.stock_type AS stock_type,
+        stocks.currency_id AS currency_id,
+        anon_2.month_key AS month,
+        anon_2.amount AS market_price,
+        anon_2.date AS date
+    FROM (SELECT
+        prices.stock_id AS stock_id,
+        prices.date AS date,
+        prices.month_key AS month_key,
+        prices.amount AS amount
+    FROM prices JOIN (SELECT prices.stock_id AS stock_id, max(prices.day_key) AS day_key
+    FROM prices
+    WHERE prices.stock_id IN (SELECT portfolio_stocks.stock_id
+    FROM portfolio_stocks
+    WHERE portfolio_stocks.portfolio_id IN (__[POSTCOMPILE_portfolio_id_2]))
+        AND prices.day_key >= :day_key_1 AND prices.day_key <= :day_key_2
+    GROUP BY prices.stock_id) AS anon_3
+    ON prices.stock_id = anon_3.stock_id AND prices.day_key = anon_3.day_key) AS anon_2
+    JOIN stocks ON stocks.id = anon_2.stock_id) AS anon_1
+    ORDER BY anon_1.date, anon_1.moniker"""
+
+    expected_query = query.replace("(SELECT\n        ", "(SELECT ").replace("\n        ", " ").replace("\n    ", " ")
 
     assert expected_query == str(db_query).replace("\n", "")
 
 
+def test_portfolio_stocks_query_property(command: OutputGrowthCommand) -> None:
+    db_query = command._portfolio_stocks_query
+
+    assert isinstance(db_query, Selectable)
+
+    query = """SELECT portfolio_stocks.portfolio_id, portfolio_stocks.stock_id
+    FROM portfolio_stocks
+    WHERE portfolio_stocks.portfolio_id IN (__[POSTCOMPILE_portfolio_id_1])"""
+
+    assert query.replace("\n    ", " ") == str(db_query).replace("\n", "")
+    assert [command.portfolio_id] == db_query.compile().params["portfolio_id_1"]
+
+
+def test_portfolio_stocks_query_property_uses_context_portfolios(
+    command: OutputGrowthCommand, mock_engine: MagicMock
+) -> None:
+    command.context = OutputContext(mock_engine, [command.portfolio_id, 7])
+
+    assert [command.portfolio_id, 7] == command._portfolio_stocks_query.compile().params["portfolio_id_1"]
+
+
+def test_portfolio_stock_ids(command: OutputGrowthCommand, mock_context: MagicMock, mocker: MockerFixture) -> None:
+    mock_context.read_sql.return_value = DataFrame(
+        data={"portfolio_id": [command.portfolio_id, command.portfolio_id, 7], "stock_id": [1, 2, 3]}
+    )
+    command.context = mock_context
+
+    db_query = Selectable()
+    mock_property = mocker.PropertyMock(return_value=db_query)
+    mocker.patch("pyp.cli.commands.output.growth.OutputGrowthCommand._portfolio_stocks_query", mock_property)
+
+    assert [1, 2] == command._portfolio_stock_ids
+
+    mock_context.read_sql.assert_called_once_with(db_query, {"portfolio_id": "int64", "stock_id": "int64"})
+
+
 def test_monthly_prices_df(
     command: OutputGrowthCommand,
     monthly_prices_df: DataFrame,
-    mock_session_class: MagicMock,
-    mock_session: MagicMock,
+    mock_context: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.commands.output.growth.Session", mock_session_class)
-
-    mock_read_sql = mocker.MagicMock(return_value=monthly_prices_df)
-    mocker.patch("pyp.cli.commands.output.growth.pd.read_sql", mock_read_sql)
+    shared_df = concat([
+        monthly_prices_df.assign(stock_id=(monthly_prices_df["moniker"] == "ADP").map({True: 1, False: 2})),
+        monthly_prices_df.assign(moniker="OTHER", stock_id=3),
+    ]).astype(dtype={"moniker": "string"})
+    mock_context.read_sql.return_value = shared_df
+    command.context = mock_context
 
     db_query = Selectable()
     mock_property = mocker.PropertyMock(return_value=db_query)
     mocker.patch("pyp.cli.commands.output.growth.OutputGrowthCommand._monthly_prices_query", mock_property)
+    mocker.patch("pyp.cli.commands.output.growth.OutputGrowthCommand._portfolio_stock_ids", [1, 2])
 
     assert monthly_prices_df.equals(command._monthly_prices_df)
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_read_sql.assert_called_once_with(db_query, mock_session.bind)
+    mock_context.read_sql.assert_called_once_with(
+        db_query,
+        {
+            "stock_id": "int64",
+            "moniker": "string",
+            "stock_type": "string",
+            "currency_id": "int64",
+            "month": "int64",
+            "market_price": "float64",
+        },
+    )
 
 
 def test_add_monthly_market_prices(
@@ -172,8 +309,6 @@ def test_add_monthly_market_prices(
     expected_df[["amount", "invested"]] = expected_df[["amount", "invested"]].fillna(0, axis="columns")
     expected_df["amount"] = expected_df.groupby("moniker")["amount"].cumsum()
 
-    expected_df["month"] = expected_df["month"].apply(lambda x: datetime.strptime(x, "%Y-%m").strftime("%b-%y"))
-
     assert command == command._add_monthly_market_prices()
 
     assert isinstance(command._df, DataFrame)
@@ -331,7 +466,7 @@ def test_prepare_df_full_check(
     command: OutputGrowthCommand,
     share_value_df: DataFrame,
     monthly_prices_df: DataFrame,
-    formatted_exchange_rates_df: DataFrame,
+    exchange_rates_df: DataFrame,
     profit_ratio_difference_df: DataFrame,
     mocker: MockerFixture,
 ) -> None:
@@ -347,7 +482,7 @@ def test_prepare_df_full_check(
     mocker.patch.object(command, "_resolve_currency_ids", mock_rci)
     mocker.patch(
         "pyp.cli.commands.output.growth.OutputGrowthCommand._exchange_rates_df",
-        mocker.PropertyMock(return_value=formatted_exchange_rates_df),
+        mocker.PropertyMock(return_value=exchange_rates_df),
     )
 
     currencies = [Currency(id=1, code="USD"), Currency(id=2, code="CAD")]
@@ -365,15 +500,16 @@ def test_writes_data_files(command: OutputGrowthCommand, mocker: MockerFixture)
     mock_growth_df.to_json = mocker.MagicMock()
     command._df = mock_growth_df
 
-    mock_open = mocker.MagicMock()
-    mock_file = mocker.MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
-    mocker.patch("pyp.cli.commands.output.growth.open", mock_open)
+    mock_with_month_labels = mocker.MagicMock(side_effect=lambda df: df)
+    mocker.patch.object(command, "_with_month_labels", mock_with_month_labels)
+
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
 
     command._write_data_files()
     assert command.output_dir is not None
 
+    mock_with_month_labels.assert_called_once_with(mock_growth_df)
     mock_growth_df.to_json.assert_called_once_with(orient="records")
 
-    mock_open.assert_called_once_with(command.output_dir / "growth.js", "w")
-    mock_file.write.assert_called_once_with(f"growth_data = {mock_growth_df.to_json.return_value}")
+    mock_write_data_file.assert_called_once_with("growth.js", f"growth_data = {mock_growth_df.to_json.return_value}")
@@ -0,0 +1,128 @@
+import re
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+from pyp.cli.commands.output.base import OutputCommand, OutputFormat
+from pyp.cli.commands.output.breakdown import OutputBreakdownCommand
+from pyp.cli.commands.output.context import OutputContext
+from pyp.cli.commands.output.growth import OutputGrowthCommand
+from pyp.cli.commands.output.growth_breakdown import (
+    OutputGrowthBreakdownCommand,
+    OutputGrowthBreakdownMonthOverMonthCommand,
+)
+from pyp.cli.commands.output.runner import OutputRunner
+from pyp.cli.commands.output.summary import OutputSummaryCommand
+from pyp.cli.commands.setup import SetupCommand
+from pyp.database.engine import create_database_engine
+from pyp.database.models import (
+    Currency,
+    ExchangeRate,
+    Portfolio,
+    PortfolioStocks,
+    Price,
+    Share,
+    Stock,
+    User,
+    day_key,
+    month_key,
+)
+from pyp.database.statements import prepare_monthly_prices_refresh_statement
+
+HOT_TABLE_ACCESS = re.compile(r"^(SCAN|SEARCH) (shares|prices|monthly_prices|exchange_rates)\b")
+
+
+@pytest.fixture
+def engine() -> Engine:
+    engine = create_database_engine("sqlite://")
+    SetupCommand(engine).execute()
+
+    with Session(engine) as session:
+        usd, cad = Currency(code="USD"), Currency(code="CAD")
+        user = User(username="MrSir", portfolios=[Portfolio(name="My Portfolio")])
+        stocks = [
+            Stock(moniker="ADP", stock_type="EQUITY", currency=usd, sector_weightings='{"industrials": 1.0}'),
+            Stock(moniker="XIC", stock_type="ETF", currency=cad, sector_weightings='{"technology": 1.0}'),
+        ]
+        session.add_all([usd, cad, user, *stocks])
+        session.flush()
+
+        days = [date(2024, 1, 1) + timedelta(days=offset) for offset in range(90)]
+
+        for stock in stocks:
+            portfolio_stocks = PortfolioStocks(portfolio_id=user.portfolios[0].id, stock_id=stock.id)
+            session.add(portfolio_stocks)
+            session.flush()
+            session.add(
+                Share(
+                    portfolio_stocks_id=portfolio_stocks.id,
+                    amount=10.0,
+                    price=100.0,
+                    purchased_on=days[0],
+                    day_key=day_key(days[0]),
+                    month_key=month_key(days[0]),
+                )
+            )
+            session.add_all([
+                Price(stock_id=stock.id, date=day, amount=100.0, day_key=day_key(day), month_key=month_key(day))
+                for day in days
+            ])
+
+        session.add_all([
+            ExchangeRate(
+                from_currency_id=usd.id,
+                to_currency_id=cad.id,
+                date=day,
+                rate=1.35,
+                day_key=day_key(day),
+                month_key=month_key(day),
+            )
+            for day in days
+        ])
+        session.execute(prepare_monthly_prices_refresh_statement(dialect_name=engine.dialect.name))
+        session.commit()
+
+    return engine
+
+
+def _output_statements(engine: Engine, output_dir: Path) -> list[tuple[str, Any]]:
+    statements: list[tuple[str, Any]] = []
+
+    def record(_: Any, __: Any, statement: str, parameters: Any, *___: Any) -> None:
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+
+    context = OutputContext(engine)
+    arguments = (1, datetime(2024, 3, 15), "CAD", context, OutputFormat.RECORDS, output_dir)
+    commands: list[OutputCommand] = [
+        OutputSummaryCommand(engine, "MrSir", "My Portfolio", *arguments),
+        OutputGrowthCommand(engine, *arguments),
+        OutputBreakdownCommand(engine, *arguments),
+        OutputGrowthBreakdownCommand(engine, *arguments),
+        OutputGrowthBreakdownMonthOverMonthCommand(engine, *arguments),
+    ]
+    OutputRunner(commands).execute()
+
+    event.remove(engine, "before_cursor_execute", record)
+
+    return statements
+
+
+def test_output_queries_use_covering_indexes(engine: Engine, tmp_path: Path) -> None:
+    statements = _output_statements(engine, tmp_path)
+
+    assert statements
+
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            accesses = [detail for detail in plan if HOT_TABLE_ACCESS.match(detail)]
+
+            for access in accesses:
+                assert access.startswith("SEARCH") and "COVERING INDEX" in access, f"{access} in:\n{statement}"
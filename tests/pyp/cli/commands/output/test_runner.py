@@ -0,0 +1,100 @@
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyp.cli.commands.output.base import OutputCommand
+from pyp.cli.commands.output.runner import OutputRunner
+
+
+def make_command(
+    mocker: MockerFixture,
+    output_dir: Path,
+    data_file_name: str,
+    assembled_file_name: str | None = None,
+) -> MagicMock:
+    command = mocker.MagicMock(spec=OutputCommand)
+    command.output_dir = output_dir
+    command.data_file_name = data_file_name
+    command.assembled_file_name = assembled_file_name
+
+    return command
+
+
+@pytest.fixture
+def commands(tmp_path: Path, mocker: MockerFixture) -> list[MagicMock]:
+    return [
+        make_command(mocker, tmp_path, "summary.js"),
+        make_command(mocker, tmp_path, "parts/breakdown.js", "breakdown.js"),
+        make_command(mocker, tmp_path, "parts/growth_breakdown.js", "breakdown.js"),
+    ]
+
+
+def test_initialization(commands: list[MagicMock]) -> None:
+    runner = OutputRunner(commands)
+
+    assert commands == runner.commands
+    assert 1 == runner.jobs
+
+
+def test_run_commands_in_order(commands: list[MagicMock], mocker: MockerFixture) -> None:
+    manager = mocker.MagicMock()
+    for index, command in enumerate(commands):
+        manager.attach_mock(command.execute, f"command_{index}")
+
+    OutputRunner(commands)._run_commands()
+
+    assert [mocker.call.command_0(), mocker.call.command_1(), mocker.call.command_2()] == manager.mock_calls
+
+
+def test_run_commands_in_parallel(commands: list[MagicMock]) -> None:
+    OutputRunner(commands, 3)._run_commands()
+
+    for command in commands:
+        command.execute.assert_called_once()
+
+
+def test_run_commands_in_parallel_raises_errors(commands: list[MagicMock]) -> None:
+    commands[1].execute.side_effect = ValueError("boom")
+
+    with pytest.raises(ValueError):
+        OutputRunner(commands, 3)._run_commands()
+
+
+def test_commands_by_assembled_file(commands: list[MagicMock], tmp_path: Path, mocker: MockerFixture) -> None:
+    other_command = make_command(mocker, tmp_path / "MrSir/My Portfolio", "parts/breakdown.js", "breakdown.js")
+
+    assert {
+        (tmp_path, "breakdown.js"): [commands[1], commands[2]],
+        (tmp_path / "MrSir/My Portfolio", "breakdown.js"): [other_command],
+    } == OutputRunner([*commands, other_command])._commands_by_assembled_file
+
+
+def test_assemble_data_files(commands: list[MagicMock], tmp_path: Path) -> None:
+    (tmp_path / "parts").mkdir()
+    (tmp_path / "parts/breakdown.js").write_text("breakdown_by_moniker_data = []\n")
+    (tmp_path / "parts/growth_breakdown.js").write_text("growth_breakdown_by_stock_type_data = {}\n")
+
+    OutputRunner(commands)._assemble_data_files()
+
+    commands[1].write_data_file.assert_called_once_with(
+        "breakdown.js", "breakdown_by_moniker_data = []\ngrowth_breakdown_by_stock_type_data = {}\n"
+    )
+    commands[0].write_data_file.assert_not_called()
+    commands[2].write_data_file.assert_not_called()
+
+
+def test_execute(commands: list[MagicMock], mocker: MockerFixture) -> None:
+    runner = OutputRunner(commands, 2)
+
+    mock_run_commands = mocker.MagicMock()
+    mocker.patch.object(runner, "_run_commands", mock_run_commands)
+
+    mock_assemble_data_files = mocker.MagicMock()
+    mocker.patch.object(runner, "_assemble_data_files", mock_assemble_data_files)
+
+    runner.execute()
+
+    mock_run_commands.assert_called_once()
+    mock_assemble_data_files.assert_called_once()
@@ -1,12 +1,14 @@
 import json
 from datetime import datetime
-from unittest.mock import MagicMock, call
+from pathlib import Path
+from unittest.mock import MagicMock
 
 import numpy as np
 import pytest
 from pandas import DataFrame
 from pytest_mock import MockerFixture
 
+from pyp.cli.commands.output.base import OutputFormat
 from pyp.cli.commands.output.growth import OutputGrowthCommand
 from pyp.cli.commands.output.summary import OutputSummaryCommand
 from pyp.cli.protocols import OutputCommandProtocol
@@ -99,6 +101,23 @@ def test_initialization(portfolio_id: int, mock_engine: MagicMock) -> None:
     assert portfolio_id == command.portfolio_id
     assert date == command.date
     assert currency_code == command.currency_code
+    assert OutputFormat.RECORDS == command.output_format
+
+
+def test_initialization_with_output_format(portfolio_id: int, mock_engine: MagicMock) -> None:
+    command = OutputSummaryCommand(
+        mock_engine, "MrSir", "My Portfolio", portfolio_id, datetime(2024, 12, 9), "USD", None, OutputFormat.COLUMNAR
+    )
+
+    assert OutputFormat.COLUMNAR == command.output_format
+
+
+def test_initialization_with_output_dir(portfolio_id: int, mock_engine: MagicMock, tmp_path: Path) -> None:
+    command = OutputSummaryCommand(
+        mock_engine, "MrSir", "My Portfolio", portfolio_id, datetime(2024, 12, 9), "USD", None, output_dir=tmp_path
+    )
+
+    assert tmp_path == command.output_dir
 
 
 def test_compute_market_value(command: OutputSummaryCommand, added_monthly_market_prices_df: DataFrame) -> None:
@@ -247,10 +266,8 @@ def test_writes_data_files(command: OutputSummaryCommand, mocker: MockerFixture)
     mock_number_of_etfs = mocker.MagicMock(return_value=number_of_etfs)
     mocker.patch.object(command, "_number_of_etfs", mock_number_of_etfs)
 
-    mock_open = mocker.MagicMock()
-    mock_file = mocker.MagicMock()
-    mock_open.return_value.__enter__.return_value = mock_file
-    mocker.patch("pyp.cli.commands.output.summary.open", mock_open)
+    mock_write_data_file = mocker.MagicMock()
+    mocker.patch.object(command, "write_data_file", mock_write_data_file)
 
     command._write_data_files()
 
@@ -267,8 +284,7 @@ def test_writes_data_files(command: OutputSummaryCommand, mocker: MockerFixture)
     }
     summary_json = json.dumps(summary)
 
-    mock_open.assert_called_once_with(command.output_dir / "summary.js", "w")
-    mock_file.write.assert_has_calls([
-        call(f"summary_data = {summary_json}\n"),
-        call(f"portfolio_data = {mock_df.to_json.return_value}\n"),
-    ])
+    mock_write_data_file.assert_called_once_with(
+        "summary.js",
+        f"summary_data = {summary_json}\nportfolio_data = {mock_df.to_json.return_value}\n",
+    )
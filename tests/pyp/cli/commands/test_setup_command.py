@@ -1,4 +1,6 @@
-from datetime import datetime
+import gzip
+from datetime import date, datetime
+from pathlib import Path
 from unittest.mock import MagicMock, call
 
 import pytest
@@ -33,15 +35,24 @@ def test_initialization(mock_engine: MagicMock) -> None:
 
     assert mock_engine == command.engine
     assert seed == command.seed
+    assert command.pivot_only is False
 
 
-def test_create_schema(command: SetupCommand, mocker: MockerFixture) -> None:
-    mock_create_all = mocker.MagicMock()
-    mocker.patch("pyp.cli.commands.setup.Base.metadata.create_all", mock_create_all)
+def test_initialization_with_pivot_only(mock_engine: MagicMock) -> None:
+    command = SetupCommand(mock_engine, True, True)
 
-    command._create_schema()
+    assert command.pivot_only is True
 
-    mock_create_all.assert_called_once_with(command.engine)
+
+def test_upgrade_schema(command: SetupCommand, mocker: MockerFixture) -> None:
+    mock_upgrade = mocker.MagicMock()
+    mock_class = mocker.MagicMock(return_value=mock_upgrade)
+    mocker.patch("pyp.cli.commands.setup.UpgradeCommand", mock_class)
+
+    command._upgrade_schema()
+
+    mock_class.assert_called_once_with(command.engine)
+    mock_upgrade.execute.assert_called_once()
 
 
 def test_read_currencies(command: SetupCommand) -> None:
@@ -72,7 +83,7 @@ def test_seed_currencies(
     command._seed_currencies()
 
     mock_session_class.assert_called_once_with(mock_engine)
-    mock_insert.assert_called_once_with(Currency)
+    mock_insert.assert_called_once_with(Currency, "sqlite")
     mock_query.values.assert_called_once_with(command._read_currencies())
     mock_query.on_conflict_do_nothing.assert_called_once_with(index_elements=["code"])
     mock_session.execute.assert_called_once_with(mock_query)
@@ -101,7 +112,7 @@ def test_resolve_currencies(
     mock_select.assert_called_once_with(Currency)
 
 
-def test_read_exchange_rates_for_code(command: SetupCommand, mocker: MockerFixture) -> None:
+def test_read_exchange_rate_files_for_code(command: SetupCommand, mocker: MockerFixture) -> None:
     usd = Currency(id=1, code="USD")
     cad = Currency(id=2, code="CAD")
     eur = Currency(id=3, code="EUR")
@@ -156,13 +167,156 @@ def test_read_exchange_rates_for_code(command: SetupCommand, mocker: MockerFixtu
     mocker.patch("pyp.cli.commands.setup.open", mock_open)
 
     expected_exchange_rates = [
-        {"date": date_1, "from_currency_id": usd.id, "to_currency_id": cad.id, "rate": usd_to_cad_1},
-        {"date": date_1, "from_currency_id": usd.id, "to_currency_id": eur.id, "rate": usd_to_eur_1},
-        {"date": date_2, "from_currency_id": usd.id, "to_currency_id": cad.id, "rate": usd_to_cad_2},
-        {"date": date_2, "from_currency_id": usd.id, "to_currency_id": eur.id, "rate": usd_to_eur_2},
+        {
+            "date": date_1,
+            "from_currency_id": usd.id,
+            "to_currency_id": cad.id,
+            "rate": usd_to_cad_1,
+            "day_key": 20220101,
+            "month_key": 202201,
+        },
+        {
+            "date": date_1,
+            "from_currency_id": usd.id,
+            "to_currency_id": eur.id,
+            "rate": usd_to_eur_1,
+            "day_key": 20220101,
+            "month_key": 202201,
+        },
+        {
+            "date": date_2,
+            "from_currency_id": usd.id,
+            "to_currency_id": cad.id,
+            "rate": usd_to_cad_2,
+            "day_key": 20220102,
+            "month_key": 202201,
+        },
+        {
+            "date": date_2,
+            "from_currency_id": usd.id,
+            "to_currency_id": eur.id,
+            "rate": usd_to_eur_2,
+            "day_key": 20220102,
+            "month_key": 202201,
+        },
     ]
 
-    assert expected_exchange_rates == command._read_exchange_rates_for_code(usd.code)
+    assert expected_exchange_rates == command._read_exchange_rate_files_for_code(usd.code)
+
+
+def test_read_exchange_rate_files_for_code_skips_self_rates(command: SetupCommand, tmp_path: Path) -> None:
+    (tmp_path / "exchange_rates" / "USD").mkdir(parents=True)
+    (tmp_path / "exchange_rates" / "USD" / "2025-01-02.json").write_text(
+        '{"data": {"2025-01-02": {"CAD": 1.44, "USD": 1.026936364}}}'
+    )
+
+    command.data_path = tmp_path
+    command._currency_id_by_code = {"USD": 1, "CAD": 2}
+
+    assert [(1, 2, 1.44)] == [
+        (r["from_currency_id"], r["to_currency_id"], r["rate"])
+        for r in command._read_exchange_rate_files_for_code("USD")
+    ]
+
+
+def test_read_exchange_rate_bundle_for_code(command: SetupCommand, tmp_path: Path) -> None:
+    (tmp_path / "exchange_rates").mkdir()
+
+    with gzip.open(tmp_path / "exchange_rates" / "USD.csv.gz", "wt", newline="") as file:
+        file.write("2022-01-01,CAD,1.26249\r\n2022-01-02,EUR,0.87929\r\n2022-01-02,USD,1.02693\r\n")
+
+    command.data_path = tmp_path
+    command._currency_id_by_code = {"USD": 1, "CAD": 2, "EUR": 3}
+
+    assert [
+        {
+            "from_currency_id": 1,
+            "to_currency_id": 2,
+            "date": date(2022, 1, 1),
+            "rate": 1.26249,
+            "day_key": 20220101,
+            "month_key": 202201,
+        },
+        {
+            "from_currency_id": 1,
+            "to_currency_id": 3,
+            "date": date(2022, 1, 2),
+            "rate": 0.87929,
+            "day_key": 20220102,
+            "month_key": 202201,
+        },
+    ] == command._read_exchange_rate_bundle_for_code("USD")
+
+
+@pytest.mark.parametrize(
+    "bundled,expected_reader",
+    [
+        (True, "_read_exchange_rate_bundle_for_code"),
+        (False, "_read_exchange_rate_files_for_code"),
+    ],
+)
+def test_read_exchange_rates_for_code(
+    bundled: bool, expected_reader: str, command: SetupCommand, tmp_path: Path, mocker: MockerFixture
+) -> None:
+    (tmp_path / "exchange_rates").mkdir()
+
+    if bundled:
+        (tmp_path / "exchange_rates" / "USD.csv.gz").touch()
+
+    command.data_path = tmp_path
+    exchange_rates = [{"rate": 1.26249}]
+    mock_reader = mocker.patch.object(command, expected_reader, mocker.MagicMock(return_value=exchange_rates))
+
+    assert exchange_rates == command._read_exchange_rates_for_code("USD")
+
+    mock_reader.assert_called_once_with("USD")
+
+
+def test_read_packed_exchange_rates(command: SetupCommand) -> None:
+    command._currency_id_by_code = {"USD": 1, "CAD": 2, "EUR": 3}
+
+    exchange_rate_files = command._read_exchange_rate_files_for_code("USD")
+    exchange_rate_bundle = command._read_exchange_rate_bundle_for_code("USD")
+
+    assert sorted(
+        (r["to_currency_id"], r["date"].date(), r["rate"], r["day_key"]) for r in exchange_rate_files
+    ) == sorted((r["to_currency_id"], r["date"], r["rate"], r["day_key"]) for r in exchange_rate_bundle)
+
+
+@pytest.mark.parametrize(
+    "pivot_only,expected_codes",
+    [
+        (False, ["USD", "CAD", "EUR"]),
+        (True, ["USD"]),
+    ],
+)
+def test_exchange_rate_codes(command: SetupCommand, pivot_only: bool, expected_codes: list[str]) -> None:
+    command._currency_id_by_code = {"CAD": 2, "USD": 1, "EUR": 3}
+    command.pivot_only = pivot_only
+
+    assert sorted(expected_codes) == sorted(command._exchange_rate_codes)
+
+
+def test_seed_exchange_rates_pivot_only(
+    command: SetupCommand,
+    mock_session_class: MagicMock,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.commands.setup.Session", mock_session_class)
+    mocker.patch("pyp.cli.commands.setup.insert", mocker.MagicMock())
+
+    mock_rerfc = mocker.MagicMock(return_value=[])
+    mocker.patch.object(command, "_read_exchange_rates_for_code", mock_rerfc)
+
+    command._currency_id_by_code = {"USD": 1, "CAD": 2, "EUR": 3}
+    command.pivot_only = True
+
+    command._seed_exchange_rates()
+
+    mock_rerfc.assert_called_once_with("USD")
+    mock_session.execute.assert_not_called()
+    mock_session.commit.assert_called_once()
 
 
 def test_seed_exchange_rates(
@@ -175,12 +329,15 @@ def test_seed_exchange_rates(
     mocker.patch("pyp.cli.commands.setup.Session", mock_session_class)
 
     mock_query = mocker.MagicMock()
-    mock_query.values = mocker.MagicMock(return_value=mock_query)
     mock_query.on_conflict_do_nothing = mocker.MagicMock(return_value=mock_query)
     mock_insert = mocker.MagicMock(return_value=mock_query)
     mocker.patch("pyp.cli.commands.setup.insert", mock_insert)
 
-    exchange_rates: dict = dict()
+    mock_bump_statement = mocker.MagicMock()
+    mock_ptvbs = mocker.MagicMock(return_value=mock_bump_statement)
+    mocker.patch("pyp.cli.commands.setup.prepare_table_versions_bump_statement", mock_ptvbs)
+
+    exchange_rates = [{"rate": 1.26249}]
     mock_rerfc = mocker.MagicMock(return_value=exchange_rates)
     mocker.patch.object(command, "_read_exchange_rates_for_code", mock_rerfc)
 
@@ -193,45 +350,39 @@ def test_seed_exchange_rates(
     command._seed_exchange_rates()
 
     mock_session_class.assert_called_once_with(mock_engine)
-    mock_insert.assert_has_calls([
-        call(ExchangeRate),
-        call(ExchangeRate),
-        call(ExchangeRate),
-    ])
-    mock_query.values.assert_has_calls([
-        call(exchange_rates),
-        call(exchange_rates),
-        call(exchange_rates),
-    ])
-    mock_query.on_conflict_do_nothing.assert_has_calls([
-        call(index_elements=["from_currency_id", "to_currency_id", "date"]),
-        call(index_elements=["from_currency_id", "to_currency_id", "date"]),
-        call(index_elements=["from_currency_id", "to_currency_id", "date"]),
-    ])
-    mock_session.execute.assert_has_calls([
-        call(mock_query),
-        call(mock_query),
-        call(mock_query),
-    ])
+    mock_insert.assert_called_once_with(ExchangeRate, "sqlite")
+    mock_query.on_conflict_do_nothing.assert_called_once_with(
+        index_elements=["from_currency_id", "to_currency_id", "date"]
+    )
+    mock_rerfc.assert_has_calls([call("USD"), call("CAD"), call("EUR")])
+    mock_ptvbs.assert_called_with(ExchangeRate)
+    assert [
+        call(mock_query, exchange_rates),
+        call(mock_bump_statement),
+        call(mock_query, exchange_rates),
+        call(mock_bump_statement),
+        call(mock_query, exchange_rates),
+        call(mock_bump_statement),
+    ] == mock_session.execute.call_args_list
     mock_session.commit.assert_has_calls([call(), call(), call()])
 
 
 def test_execute_without_seed(command: SetupCommand, mocker: MockerFixture) -> None:
-    mock_create_schema = mocker.MagicMock()
-    mocker.patch.object(command, "_create_schema", mock_create_schema)
+    mock_upgrade_schema = mocker.MagicMock()
+    mocker.patch.object(command, "_upgrade_schema", mock_upgrade_schema)
     mock_seed_currencies = mocker.MagicMock()
     mocker.patch.object(command, "_seed_currencies", mock_seed_currencies)
 
     command.seed = False
     command.execute()
 
-    mock_create_schema.assert_called_once()
+    mock_upgrade_schema.assert_called_once()
     mock_seed_currencies.assert_not_called()
 
 
 def test_execute_with_seed(command: SetupCommand, mocker: MockerFixture) -> None:
-    mock_create_schema = mocker.MagicMock()
-    mocker.patch.object(command, "_create_schema", mock_create_schema)
+    mock_upgrade_schema = mocker.MagicMock()
+    mocker.patch.object(command, "_upgrade_schema", mock_upgrade_schema)
     mock_seed_currencies = mocker.MagicMock()
     mocker.patch.object(command, "_seed_currencies", mock_seed_currencies)
     mock_resolve_currency_ids = mocker.MagicMock()
@@ -242,7 +393,7 @@ def test_execute_with_seed(command: SetupCommand, mocker: MockerFixture) -> None
     command.seed = True
     command.execute()
 
-    mock_create_schema.assert_called_once()
+    mock_upgrade_schema.assert_called_once()
     mock_seed_currencies.assert_called_once()
     mock_resolve_currency_ids.assert_called_once()
     mock_seed_exchange_rates.assert_called_once()
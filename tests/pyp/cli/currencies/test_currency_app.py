@@ -5,7 +5,7 @@ from typer.testing import CliRunner
 
 from pyp.cli.currencies import currency_app
 from pyp.cli.currencies.commands import AddCurrencyCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 
 @pytest.fixture
@@ -35,5 +35,5 @@ def test_add_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, code, name)
+    mock_class.assert_called_once_with(get_engine(), code, name)
     mock_add.execute.assert_called_once()
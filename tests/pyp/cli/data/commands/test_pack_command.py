@@ -0,0 +1,80 @@
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from pyp.cli.data.commands import PackCommand
+from pyp.cli.protocols import CommandProtocol
+
+
+@pytest.fixture
+def data_path(tmp_path: Path) -> Path:
+    for code, rates_by_date in {
+        "USD": {"2022-01-02": {"CAD": 1.2625, "EUR": 0.87929}, "2022-01-01": {"CAD": 1.26249, "EUR": 0.87943}},
+        "CAD": {"2022-01-01": {"USD": 0.79208}},
+    }.items():
+        (tmp_path / "exchange_rates" / code).mkdir(parents=True)
+
+        for rates_date, rates in rates_by_date.items():
+            with open(tmp_path / "exchange_rates" / code / f"{rates_date}.json", "w") as file:
+                file.write(json.dumps({"data": {rates_date: rates}}))
+
+    return tmp_path
+
+
+@pytest.fixture
+def command(data_path: Path) -> PackCommand:
+    return PackCommand(data_path)
+
+
+def test_initialization(data_path: Path) -> None:
+    command = PackCommand(data_path)
+
+    assert isinstance(command, CommandProtocol)
+
+    assert data_path == command.data_path
+    assert Path(__file__).parent.parent.parent.parent.parent.parent / "data" == PackCommand().data_path
+
+
+def test_codes(command: PackCommand) -> None:
+    assert ["CAD", "USD"] == command._codes
+
+
+def test_read_exchange_rates_for_code(command: PackCommand) -> None:
+    assert [
+        ("2022-01-01", "CAD", 1.26249),
+        ("2022-01-01", "EUR", 0.87943),
+        ("2022-01-02", "CAD", 1.2625),
+        ("2022-01-02", "EUR", 0.87929),
+    ] == command._read_exchange_rates_for_code("USD")
+
+
+def test_write_bundle(command: PackCommand, data_path: Path) -> None:
+    bundle_path = command._write_bundle("USD", [("2022-01-01", "CAD", 1.26249), ("2022-01-01", "EUR", 0.87943)])
+
+    assert data_path / "exchange_rates" / "USD.csv.gz" == bundle_path
+
+    with gzip.open(bundle_path, "rt", newline="") as file:
+        assert "2022-01-01,CAD,1.26249\r\n2022-01-01,EUR,0.87943\r\n" == file.read()
+
+    contents = bundle_path.read_bytes()
+    command._write_bundle("USD", [("2022-01-01", "CAD", 1.26249), ("2022-01-01", "EUR", 0.87943)])
+
+    assert contents == bundle_path.read_bytes()
+
+
+def test_execute(command: PackCommand, data_path: Path, mocker: MockerFixture) -> None:
+    mock_print = mocker.patch("pyp.cli.data.commands.print")
+
+    command.execute()
+
+    assert ["CAD", "CAD.csv.gz", "USD", "USD.csv.gz"] == sorted(
+        p.name for p in (data_path / "exchange_rates").iterdir()
+    )
+
+    mock_print.assert_has_calls([
+        mocker.call("Packed 1 CAD exchange rates into CAD.csv.gz."),
+        mocker.call("Packed 4 USD exchange rates into USD.csv.gz."),
+    ])
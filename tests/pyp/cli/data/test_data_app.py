@@ -0,0 +1,35 @@
+import pytest
+from pytest_mock import MockerFixture
+from typer import Typer
+from typer.testing import CliRunner
+
+from pyp.cli.data import data_app
+from pyp.cli.data.commands import PackCommand
+
+
+@pytest.fixture
+def app() -> Typer:
+    return data_app
+
+
+def test_data_app(app: Typer) -> None:
+    assert "data" == app.info.name
+    assert "Manage the seed data bundled with the project." == app.info.help
+
+
+def test_commands(app: Typer) -> None:
+    assert ["pack"] == [c.name for c in app.registered_commands]
+
+
+def test_pack_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_pack = mocker.MagicMock()
+    mock_pack.execute = mocker.MagicMock()
+    mock_class = mocker.MagicMock(spec=PackCommand, return_value=mock_pack)
+    mocker.patch("pyp.cli.data.PackCommand", mock_class)
+
+    result = cli_runner.invoke(app, [])
+
+    assert result.exit_code == 0
+
+    mock_class.assert_called_once_with()
+    mock_pack.execute.assert_called_once()
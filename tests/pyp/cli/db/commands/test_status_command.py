@@ -0,0 +1,63 @@
+from datetime import datetime
+from unittest.mock import MagicMock, call
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, create_engine, inspect
+from sqlalchemy.orm import Session
+
+from pyp.cli.db.commands import StatusCommand
+from pyp.cli.protocols import CommandProtocol
+from pyp.database.migrations import migrations
+from pyp.database.models import Base, SchemaMigration
+
+
+@pytest.fixture
+def engine() -> Engine:
+    return create_engine("sqlite://")
+
+
+def test_initialization(mock_engine: MagicMock) -> None:
+    command = StatusCommand(mock_engine)
+
+    assert isinstance(command, CommandProtocol)
+
+    assert mock_engine == command.engine
+    assert {} == command._applied_at_by_version
+
+
+def test_resolve_applied_migrations_without_table(engine: Engine) -> None:
+    command = StatusCommand(engine)
+    command._resolve_applied_migrations()
+
+    assert {} == command._applied_at_by_version
+    assert not inspect(engine).has_table(SchemaMigration.__tablename__)
+
+
+def test_resolve_applied_migrations(engine: Engine) -> None:
+    applied_at = datetime(2024, 1, 31, 12, 30)
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[SchemaMigration.__tablename__]])
+
+    with Session(engine) as session:
+        session.add(SchemaMigration(version=1, name="add_calendar_keys", applied_at=applied_at))
+        session.commit()
+
+    command = StatusCommand(engine)
+    command._resolve_applied_migrations()
+
+    assert {1: applied_at} == command._applied_at_by_version
+
+
+def test_execute(engine: Engine, mocker: MockerFixture) -> None:
+    mock_print = mocker.patch("pyp.cli.db.commands.print")
+
+    command = StatusCommand(engine)
+    mocker.patch.object(command, "_resolve_applied_migrations")
+    command._applied_at_by_version = {1: datetime(2024, 1, 31, 12, 30)}
+
+    command.execute()
+
+    assert [
+        call(f"   1  {migrations[0].name:<40} applied 2024-01-31 12:30:00"),
+        *[call(f"{m.version:>4}  {m.name:<40} pending") for m in migrations[1:]],
+    ] == mock_print.call_args_list
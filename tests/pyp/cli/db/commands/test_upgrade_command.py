@@ -0,0 +1,118 @@
+from datetime import datetime
+from unittest.mock import MagicMock, call
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, create_engine, inspect, select
+from sqlalchemy.orm import Session
+
+from pyp.cli.db.commands import UpgradeCommand
+from pyp.cli.protocols import CommandProtocol
+from pyp.database.migrations import migrations
+from pyp.database.models import Base, IngestCheckpoint, SchemaMigration
+
+
+@pytest.fixture
+def engine() -> Engine:
+    return create_engine("sqlite://")
+
+
+def test_initialization(mock_engine: MagicMock) -> None:
+    command = UpgradeCommand(mock_engine, 3, 500)
+
+    assert isinstance(command, CommandProtocol)
+
+    assert mock_engine == command.engine
+    assert 3 == command.target_version
+    assert 500 == command.batch_size
+
+
+def test_initialization_defaults(mock_engine: MagicMock) -> None:
+    command = UpgradeCommand(mock_engine)
+
+    assert command.target_version is None
+    assert command.batch_size is None
+
+
+@pytest.mark.parametrize(
+    "applied_versions,target_version,expected_versions",
+    [
+        ([], None, [m.version for m in migrations]),
+        ([], 2, [1, 2]),
+        ([1, 2], None, [m.version for m in migrations[2:]]),
+        ([1, 2], 2, []),
+        ([m.version for m in migrations], None, []),
+    ],
+)
+def test_pending_migrations(
+    applied_versions: list[int],
+    target_version: int | None,
+    expected_versions: list[int],
+    mock_engine: MagicMock,
+) -> None:
+    command = UpgradeCommand(mock_engine, target_version)
+    command._applied_at_by_version = {version: datetime(2024, 1, 31) for version in applied_versions}
+
+    assert expected_versions == [m.version for m in command._pending_migrations]
+
+
+def test_apply(engine: Engine, mocker: MockerFixture) -> None:
+    mock_print = mocker.patch("pyp.cli.db.commands.print")
+    mock_migration = mocker.MagicMock()
+    mock_migration_class = mocker.MagicMock(return_value=mock_migration)
+    mock_migration_class.version = 7
+    mock_migration_class.name = "rebuild_prices"
+
+    command = UpgradeCommand(engine, batch_size=500)
+    command._create_schema()
+    command._apply(mock_migration_class)
+
+    mock_migration_class.assert_called_once_with(engine, 500)
+    mock_migration.upgrade.assert_called_once()
+    assert mock_print.call_args.args[0].startswith("Applied 7 rebuild_prices in ")
+
+    with Session(engine) as session:
+        assert [(7, "rebuild_prices")] == session.execute(select(SchemaMigration.version, SchemaMigration.name)).all()
+
+
+def test_execute(mock_engine: MagicMock, mocker: MockerFixture) -> None:
+    command = UpgradeCommand(mock_engine, 2)
+
+    mock_create_schema = mocker.patch.object(command, "_create_schema")
+    mock_resolve_applied_migrations = mocker.patch.object(command, "_resolve_applied_migrations")
+    mock_apply = mocker.patch.object(command, "_apply")
+
+    command.execute()
+
+    mock_create_schema.assert_called_once()
+    mock_resolve_applied_migrations.assert_called_once()
+    mock_apply.assert_has_calls([call(migrations[0]), call(migrations[1])])
+    assert 2 == mock_apply.call_count
+
+
+def test_execute_upgrades_a_new_database(engine: Engine, mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.db.commands.print")
+
+    UpgradeCommand(engine).execute()
+    UpgradeCommand(engine).execute()
+
+    with Session(engine) as session:
+        assert [m.version for m in migrations] == session.scalars(
+            select(SchemaMigration.version).order_by(SchemaMigration.version)
+        ).all()
+
+    assert "metadata_refreshed_at" in [column["name"] for column in inspect(engine).get_columns("stocks")]
+
+
+def test_execute_creates_new_tables(engine: Engine, mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.db.commands.print")
+
+    Base.metadata.create_all(
+        engine, tables=[t for t in Base.metadata.sorted_tables if t.name != IngestCheckpoint.__tablename__]
+    )
+
+    assert not inspect(engine).has_table(IngestCheckpoint.__tablename__)
+
+    UpgradeCommand(engine).execute()
+
+    assert inspect(engine).has_table(IngestCheckpoint.__tablename__)
@@ -0,0 +1,74 @@
+import pytest
+from pytest_mock import MockerFixture
+from typer import Typer
+from typer.testing import CliRunner
+
+from pyp.cli.db import db_app
+from pyp.cli.db.commands import StatusCommand, UpgradeCommand
+from pyp.database.engine import get_engine
+from pyp.database.migrations import Migration
+
+
+@pytest.fixture
+def app() -> Typer:
+    return db_app
+
+
+def test_db_app(app: Typer) -> None:
+    assert "db" == app.info.name
+    assert "Manage the database schema." == app.info.help
+
+
+def test_commands(app: Typer) -> None:
+    assert ["upgrade", "status"] == [c.name for c in app.registered_commands]
+
+
+@pytest.mark.parametrize(
+    "args,target_version,batch_size",
+    [
+        ([], None, Migration.batch_size),
+        (["--to", "3"], 3, Migration.batch_size),
+        (["--batch-size", "500"], None, 500),
+        (["--to", "2", "-b", "100"], 2, 100),
+    ],
+)
+def test_upgrade_command(
+    args: list[str],
+    target_version: int | None,
+    batch_size: int,
+    app: Typer,
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+) -> None:
+    mock_upgrade = mocker.MagicMock()
+    mock_upgrade.execute = mocker.MagicMock()
+    mock_class = mocker.MagicMock(spec=UpgradeCommand, return_value=mock_upgrade)
+    mocker.patch("pyp.cli.db.UpgradeCommand", mock_class)
+
+    result = cli_runner.invoke(app, ["upgrade", *args])
+
+    assert result.exit_code == 0
+
+    mock_class.assert_called_once_with(get_engine(), target_version, batch_size)
+    mock_upgrade.execute.assert_called_once()
+
+
+@pytest.mark.parametrize("args", [["--to", "0"], ["--batch-size", "0"]])
+def test_upgrade_command_rejects_invalid_options(args: list[str], app: Typer, cli_runner: CliRunner) -> None:
+    result = cli_runner.invoke(app, ["upgrade", *args])
+
+    assert result.exit_code == 2
+
+
+def test_status_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_status = mocker.MagicMock()
+    mock_status.execute = mocker.MagicMock()
+    mock_class = mocker.MagicMock(spec=StatusCommand, return_value=mock_status)
+    mocker.patch("pyp.cli.db.StatusCommand", mock_class)
+
+    result = cli_runner.invoke(app, ["status"])
+
+    assert result.exit_code == 0
+
+    mock_class.assert_called_once_with(get_engine())
+    mock_status.execute.assert_called_once()
@@ -1,10 +1,15 @@
+from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
 
 from pyp.cli.ingest.commands.base import IngestBaseCommand
-from pyp.database.models import Currency
+from pyp.cli.ingest.commands.response_cache import ResponseCache
+from pyp.database.models import Base, Currency, Price, TableVersion
 
 
 @pytest.fixture
@@ -16,6 +21,45 @@ def test_initialization(mock_engine: MagicMock) -> None:
     command = IngestBaseCommand(mock_engine)
 
     assert mock_engine == command.engine
+    assert 1000 == command.batch_size
+    assert 0 == command._upserted_rows
+    assert 0 == command._changed_rows
+    assert 0.0 == command._upsert_seconds
+    assert 0 == command._versioned_rows
+    assert command.response_cache is None
+
+
+def test_initialization_with_batch_size(mock_engine: MagicMock) -> None:
+    command = IngestBaseCommand(mock_engine, 50)
+
+    assert 50 == command.batch_size
+
+
+def test_initialization_with_response_cache(mock_engine: MagicMock, tmp_path: Path) -> None:
+    response_cache = ResponseCache(tmp_path)
+
+    command = IngestBaseCommand(mock_engine, response_cache=response_cache)
+
+    assert response_cache == command.response_cache
+
+
+def test_cached_without_response_cache(command: IngestBaseCommand, mocker: MockerFixture) -> None:
+    mock_fetch = mocker.MagicMock(return_value={"data": {}})
+
+    assert {"data": {}} == command._cached("exchange_rates", ("2024-12-03",), mock_fetch)
+    assert {"data": {}} == command._cached("exchange_rates", ("2024-12-03",), mock_fetch)
+
+    assert 2 == mock_fetch.call_count
+
+
+def test_cached(command: IngestBaseCommand, mocker: MockerFixture) -> None:
+    mock_response_cache = mocker.MagicMock(spec=ResponseCache)
+    command.response_cache = mock_response_cache
+    mock_fetch = mocker.MagicMock()
+
+    assert mock_response_cache.fetch.return_value == command._cached("exchange_rates", ("2024-12-03",), mock_fetch)
+
+    mock_response_cache.fetch.assert_called_once_with("exchange_rates", ("2024-12-03",), mock_fetch)
 
 
 def test_resolve_currencies(
@@ -38,3 +82,103 @@ def test_resolve_currencies(
     mock_session_class.assert_called_once_with(command.engine)
     mock_session.scalars.assert_called_once()
     mock_select.assert_called_once_with(Currency)
+
+
+def test_batches(command: IngestBaseCommand) -> None:
+    command.batch_size = 2
+
+    assert [[{"id": 1}, {"id": 2}], [{"id": 3}]] == list(command._batches([{"id": 1}, {"id": 2}, {"id": 3}]))
+    assert [] == list(command._batches([]))
+
+
+def test_upsert_in_batches() -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    command = IngestBaseCommand(engine, 2)
+
+    statement = insert(Currency)
+    statement = statement.on_conflict_do_update(index_elements=["code"], set_={"name": statement.excluded.name})
+
+    with Session(engine) as session:
+        command._upsert_in_batches(
+            session,
+            statement,
+            [{"code": "USD", "name": "Dollar"}, {"code": "CAD", "name": None}, {"code": "EUR", "name": "Euro"}],
+        )
+        command._upsert_in_batches(session, statement, [{"code": "CAD", "name": "Canadian Dollar"}])
+        session.commit()
+
+        assert [("USD", "Dollar"), ("CAD", "Canadian Dollar"), ("EUR", "Euro")] == [
+            (c.code, c.name) for c in session.scalars(select(Currency).order_by(Currency.id)).all()
+        ]
+
+    assert 4 == command._upserted_rows
+    assert 4 == command._changed_rows
+
+
+def test_upsert_in_batches_counts_changed_rows() -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    command = IngestBaseCommand(engine, 2)
+
+    statement = insert(Currency)
+    statement = statement.on_conflict_do_update(
+        index_elements=["code"],
+        set_={"name": statement.excluded.name},
+        where=statement.excluded.name != Currency.name,
+    )
+    values = [
+        {"code": "USD", "name": "Dollar"},
+        {"code": "CAD", "name": "Canadian Dollar"},
+        {"code": "EUR", "name": "Euro"},
+    ]
+
+    with Session(engine) as session:
+        command._upsert_in_batches(session, statement, values)
+        command._upsert_in_batches(session, statement, [*values[:2], {"code": "EUR", "name": "Euro (EU)"}])
+        session.commit()
+
+    assert 6 == command._upserted_rows
+    assert 4 == command._changed_rows
+
+
+def test_bump_table_versions() -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    command = IngestBaseCommand(engine)
+    command._versioned_models = (Price,)
+
+    with Session(engine) as session:
+        session.add_all([TableVersion(table_name="prices", version=0), TableVersion(table_name="shares", version=0)])
+        session.commit()
+
+        command._bump_table_versions(session)
+        command._upserted_rows = 3
+        command._bump_table_versions(session)
+        command._bump_table_versions(session)
+        session.commit()
+
+        assert [("prices", 1), ("shares", 0)] == session.execute(
+            select(TableVersion.table_name, TableVersion.version).order_by(TableVersion.table_name)
+        ).all()
+
+    assert 3 == command._versioned_rows
+
+
+def test_report_throughput(command: IngestBaseCommand, capsys: pytest.CaptureFixture) -> None:
+    command._upserted_rows = 5000
+    command._changed_rows = 120
+    command._upsert_seconds = 2.0
+
+    command._report_throughput("prices")
+
+    assert "Upserted 5000 prices (120 changed) in 2.00s (2500 rows/s).\n" == capsys.readouterr().out
+
+
+def test_report_throughput_without_writes(command: IngestBaseCommand, capsys: pytest.CaptureFixture) -> None:
+    command._report_throughput("prices")
+
+    assert "Upserted 0 prices (0 changed) in 0.00s (0 rows/s).\n" == capsys.readouterr().out
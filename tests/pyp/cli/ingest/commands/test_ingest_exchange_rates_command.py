@@ -1,14 +1,21 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from pathlib import Path
 from unittest.mock import MagicMock, call
 
 import freecurrencyapi
 import pytest
 from pytest_mock import MockerFixture
+from sqlalchemy import Insert, create_engine, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 from pyp.cli.ingest.commands.base import IngestBaseCommand
 from pyp.cli.ingest.commands.exchange_rates import IngestExchangeRatesCommand
+from pyp.cli.ingest.commands.rate_limiter import RateLimiter
+from pyp.cli.ingest.commands.response_cache import ResponseCache
 from pyp.cli.protocols import CommandProtocol
-from pyp.database.models import Currency, ExchangeRate
+from pyp.database.models import Base, Currency, ExchangeRate, IngestCheckpoint
 
 
 @pytest.fixture
@@ -42,9 +49,19 @@ def test_initialization(mock_engine: MagicMock) -> None:
     assert start_date == command.start_date
     assert end_date == command.end_date
     assert api_key == command.api_key
+    assert 1000 == command.batch_size
+    assert 4 == command.jobs
+    assert 10 == command.requests_per_minute
+    assert 10 == command._rate_limiter.requests_per_period
+    assert command.pivot_only is False
+
+    assert "exchange_rates" == command.checkpoint_source
+    assert 30 == command.checkpoint_days
+    assert (ExchangeRate,) == command._versioned_models
 
     assert dict() == command._currency_pairs
     assert [] == command._exchange_rates_values
+    assert command._checkpoint_date is None
 
 
 def test_client_returns_preset(command: IngestExchangeRatesCommand, mock_client: MagicMock) -> None:
@@ -82,95 +99,244 @@ def test_compute_currency_pairs(command: IngestExchangeRatesCommand) -> None:
     assert expected_pairs == command._currency_pairs
 
 
-def test_download_exchange_rates_for(
-    command: IngestExchangeRatesCommand,
+@pytest.fixture
+def currencies() -> list[Currency]:
+    return [Currency(id=1, code="USD"), Currency(id=2, code="CAD"), Currency(id=3, code="EUR")]
+
+
+@pytest.fixture
+def command_with_pairs(command: IngestExchangeRatesCommand, currencies: list[Currency]) -> IngestExchangeRatesCommand:
+    command._currencies_by_code = {c.code: c for c in currencies}
+    command._compute_currency_pairs()
+
+    return command
+
+
+def test_base_code(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    assert "USD" == command_with_pairs._base_code
+
+
+def test_base_code_is_lowest_currency_id(command: IngestExchangeRatesCommand) -> None:
+    command._currencies_by_code = {"CAD": Currency(id=2, code="CAD"), "USD": Currency(id=1, code="USD")}
+    command._compute_currency_pairs()
+
+    assert "USD" == command._base_code
+
+
+def test_dates(command: IngestExchangeRatesCommand) -> None:
+    command.start_date = datetime(2024, 12, 30)
+    command.end_date = datetime(2025, 1, 1)
+
+    assert [datetime(2024, 12, 30), datetime(2024, 12, 31), datetime(2025, 1, 1)] == command._dates
+
+
+def test_download_rates_for(
+    command_with_pairs: IngestExchangeRatesCommand,
     mock_client: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    usd = Currency(id=1, code="USD")
-    cad = Currency(id=2, code="CAD")
-    eur = Currency(id=3, code="EUR")
-
     date = datetime(2022, 1, 1)
-    date_str = date.strftime("%Y-%m-%d")
-    data = {"data": {date_str: {eur.code: 0.6965837353, usd.code: 0.7920854819}}}
+    data = {"data": {"2022-01-01": {"CAD": 1.2625, "EUR": 0.8794}}}
     mock_client.historical = mocker.MagicMock(return_value=data)
-    mock_class = mocker.MagicMock(return_value=mock_client)
-    mocker.patch("pyp.cli.ingest.commands.exchange_rates.freecurrencyapi.Client", mock_class)
+    command_with_pairs._client = mock_client
 
-    command._currencies_by_code = {usd.code: usd, cad.code: cad, eur.code: eur}
+    mock_rate_limiter = mocker.MagicMock(spec=RateLimiter)
+    command_with_pairs._rate_limiter = mock_rate_limiter
 
-    expected_exchange_rates_values = [
-        {"from_currency_id": cad.id, "to_currency_id": usd.id, "date": date, "rate": data["data"][date_str][usd.code]},
-        {"from_currency_id": cad.id, "to_currency_id": eur.id, "date": date, "rate": data["data"][date_str][eur.code]},
-    ]
+    assert {"USD": 1.0, "CAD": 1.2625, "EUR": 0.8794} == command_with_pairs._download_rates_for(date)
 
-    exchange_rate_values = command._download_exchange_rates_for(date, cad.code, [usd.code, eur.code])
+    mock_rate_limiter.wait.assert_called_once()
+    mock_client.historical.assert_called_once_with("2022-01-01", base_currency="USD", currencies=["CAD", "EUR"])
 
-    assert expected_exchange_rates_values == exchange_rate_values
 
-    mock_client.historical.assert_called_once_with(
-        date_str,
-        base_currency=cad.code,
-        currencies=[usd.code, eur.code],
+def test_download_rates_for_replays_cached_response(
+    command_with_pairs: IngestExchangeRatesCommand,
+    mock_client: MagicMock,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    command_with_pairs.response_cache = ResponseCache(tmp_path)
+    data = {"data": {"2022-01-01": {"CAD": 1.2625, "EUR": 0.8794}}}
+    mock_client.historical = mocker.MagicMock(return_value=data)
+    command_with_pairs._client = mock_client
+    command_with_pairs._rate_limiter = mocker.MagicMock(spec=RateLimiter)
+
+    command_with_pairs._download_rates_for(datetime(2022, 1, 1))
+    command_with_pairs.response_cache.offline = True
+
+    assert {"USD": 1.0, "CAD": 1.2625, "EUR": 0.8794} == command_with_pairs._download_rates_for(datetime(2022, 1, 1))
+
+    mock_client.historical.assert_called_once()
+    command_with_pairs._rate_limiter.wait.assert_called_once()
+
+
+def test_derive_exchange_rates_for(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    date = datetime(2022, 1, 1)
+
+    exchange_rates_values = command_with_pairs._derive_exchange_rates_for(date, {"USD": 1.0, "CAD": 1.25, "EUR": 0.8})
+
+    assert [
+        (1, 2, 1.25),
+        (1, 3, 0.8),
+        (2, 1, 0.8),
+        (2, 3, 0.64),
+        (3, 1, 1.25),
+        (3, 2, 1.5625),
+    ] == [(v["from_currency_id"], v["to_currency_id"], pytest.approx(v["rate"])) for v in exchange_rates_values]
+    assert all((date, 20220101, 202201) == (v["date"], v["day_key"], v["month_key"]) for v in exchange_rates_values)
+
+
+def test_derive_exchange_rates_for_pivot_only(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    command_with_pairs.pivot_only = True
+
+    exchange_rates_values = command_with_pairs._derive_exchange_rates_for(
+        datetime(2022, 1, 1), {"USD": 1.0, "CAD": 1.25, "EUR": 0.8}
     )
 
+    assert [(1, 2, 1.25), (1, 3, 0.8)] == [
+        (v["from_currency_id"], v["to_currency_id"], v["rate"]) for v in exchange_rates_values
+    ]
+
+
+def test_checkpoint_key(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    assert "2024-01-01:2024-12-31:CAD,EUR,USD" == command_with_pairs._checkpoint_key
+
+    command_with_pairs.pivot_only = True
+
+    assert "2024-01-01:2024-12-31:CAD,EUR,USD:pivot" == command_with_pairs._checkpoint_key
+
+
+def test_pending_dates(command: IngestExchangeRatesCommand) -> None:
+    command.start_date = datetime(2024, 1, 1)
+    command.end_date = datetime(2024, 1, 4)
+
+    assert [datetime(2024, 1, day) for day in [1, 2, 3, 4]] == command._pending_dates
+
+    command._checkpoint_date = date(2024, 1, 2)
+
+    assert [datetime(2024, 1, 3), datetime(2024, 1, 4)] == command._pending_dates
+
 
-def test_download_exchange_rates(command: IngestExchangeRatesCommand, mocker: MockerFixture) -> None:
-    usd = Currency(id=1, code="USD")
-    cad = Currency(id=2, code="CAD")
-    eur = Currency(id=3, code="EUR")
-    command._currency_pairs = {
-        usd.code: [cad.code, eur.code],
-        cad.code: [usd.code, eur.code],
-        eur.code: [usd.code, cad.code],
+def test_date_chunks(command: IngestExchangeRatesCommand) -> None:
+    command.start_date = datetime(2024, 1, 1)
+    command.end_date = datetime(2024, 1, 5)
+    command.checkpoint_days = 2
+
+    assert [
+        [datetime(2024, 1, 1), datetime(2024, 1, 2)],
+        [datetime(2024, 1, 3), datetime(2024, 1, 4)],
+        [datetime(2024, 1, 5)],
+    ] == list(command._date_chunks())
+
+
+def test_prepare_checkpoint_upsert_statement(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    statement = command_with_pairs._prepare_checkpoint_upsert_statement(datetime(2024, 1, 30))
+
+    assert isinstance(statement, Insert)
+
+    query = """INSERT INTO ingest_checkpoints (source, "key", last_completed_date)
+    VALUES (?, ?, ?)
+    ON CONFLICT (source, "key") DO UPDATE SET last_completed_date = excluded.last_completed_date"""
+
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=sqlite.dialect())).replace("\n", " ")
+    assert {
+        "source": "exchange_rates",
+        "key": "2024-01-01:2024-12-31:CAD,EUR,USD",
+        "last_completed_date": date(2024, 1, 30),
+    } == statement.compile().params
+
+
+def test_prepare_checkpoint_upsert_statement_for_postgresql(command_with_pairs: IngestExchangeRatesCommand) -> None:
+    command_with_pairs.engine.dialect = postgresql.dialect()
+
+    statement = command_with_pairs._prepare_checkpoint_upsert_statement(datetime(2024, 1, 30))
+
+    assert isinstance(statement, postgresql.Insert)
+
+    query = """INSERT INTO ingest_checkpoints (source, key, last_completed_date)
+    VALUES (%(source)s, %(key)s, %(last_completed_date)s)
+    ON CONFLICT (source, key) DO UPDATE SET last_completed_date = excluded.last_completed_date"""
+
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_download_exchange_rates(command_with_pairs: IngestExchangeRatesCommand, mocker: MockerFixture) -> None:
+    command_with_pairs.start_date = datetime(2022, 1, 1)
+    command_with_pairs.end_date = datetime(2022, 1, 3)
+
+    rates_by_date = {
+        datetime(2022, 1, 1): {"USD": 1.0, "CAD": 1.25, "EUR": 0.8},
+        datetime(2022, 1, 2): {"USD": 1.0, "CAD": 1.26, "EUR": 0.81},
+        datetime(2022, 1, 3): {"USD": 1.0, "CAD": 1.27, "EUR": 0.82},
     }
-    rates_for_usd = ["rates_for_usd"]
-    rates_for_cad = ["rates_for_cad"]
-    rates_for_eur = ["rates_for_eur"]
+    mock_drf = mocker.MagicMock(side_effect=lambda date: rates_by_date[date])
+    mocker.patch.object(command_with_pairs, "_download_rates_for", mock_drf)
+
+    command_with_pairs._download_exchange_rates(list(rates_by_date.keys()))
+
+    assert 3 == mock_drf.call_count
+    assert [
+        value
+        for date, rates in rates_by_date.items()
+        for value in command_with_pairs._derive_exchange_rates_for(date, rates)
+    ] == command_with_pairs._exchange_rates_values
+
+
+def test_download_exchange_rates_for_single_currency(
+    command: IngestExchangeRatesCommand,
+    mocker: MockerFixture,
+) -> None:
+    command._currencies_by_code = {"USD": Currency(id=1, code="USD")}
+    command._compute_currency_pairs()
+
+    mock_drf = mocker.MagicMock()
+    mocker.patch.object(command, "_download_rates_for", mock_drf)
+
+    command._exchange_rates_values = [{"rate": 1.35}]
+    command._download_exchange_rates([datetime(2022, 1, 1)])
 
-    mock_derf = mocker.MagicMock(
-        side_effect=[rates_for_usd, rates_for_cad, rates_for_eur, rates_for_usd, rates_for_cad, rates_for_eur]
+    mock_drf.assert_not_called()
+    assert [] == command._exchange_rates_values
+
+
+def test_initialization_with_options(mock_engine: MagicMock) -> None:
+    command = IngestExchangeRatesCommand(
+        mock_engine, datetime(2024, 1, 1), datetime(2024, 12, 31), "API-KEY", 50, 2, 300, True
     )
-    mocker.patch.object(command, "_download_exchange_rates_for", mock_derf)
 
-    end_date = datetime.today()
-    start_date = end_date - timedelta(days=1)
+    assert 50 == command.batch_size
+    assert 2 == command.jobs
+    assert 300 == command.requests_per_minute
+    assert 300 == command._rate_limiter.requests_per_period
+    assert command.pivot_only is True
 
-    command.start_date = start_date
-    command.end_date = end_date
 
-    command._download_exchange_rates()
+def test_prepare_exchange_rates_upsert_statement(command: IngestExchangeRatesCommand) -> None:
+    statement = command._prepare_exchange_rates_upsert_statement()
 
-    expected_values = rates_for_usd + rates_for_cad + rates_for_eur + rates_for_usd + rates_for_cad + rates_for_eur
+    assert isinstance(statement, Insert)
 
-    assert expected_values == command._exchange_rates_values
+    query = """INSERT INTO exchange_rates (id, from_currency_id, to_currency_id, date, rate, day_key, month_key)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (from_currency_id, to_currency_id, date) DO UPDATE SET rate = excluded.rate
+    WHERE excluded.rate != exchange_rates.rate"""
 
-    mock_derf.assert_has_calls([
-        call(start_date, usd.code, [cad.code, eur.code]),
-    ])
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=sqlite.dialect()))
 
 
-def test_prepare_exchange_rates_upsert_statement(command: IngestExchangeRatesCommand, mocker: MockerFixture) -> None:
-    exchange_rate_values = [dict()]
+def test_prepare_exchange_rates_upsert_statement_for_postgresql(command: IngestExchangeRatesCommand) -> None:
+    command.engine.dialect = postgresql.dialect()
 
-    mock_statement = mocker.MagicMock()
-    mock_statement.values = mocker.MagicMock(return_value=mock_statement)
-    mock_statement.on_conflict_do_update = mocker.MagicMock(return_value=mock_statement)
-    mock_insert = mocker.MagicMock(return_value=mock_statement)
-    mocker.patch("pyp.cli.ingest.commands.exchange_rates.insert", mock_insert)
+    statement = command._prepare_exchange_rates_upsert_statement()
 
-    command._exchange_rates_values = exchange_rate_values
+    assert isinstance(statement, postgresql.Insert)
 
-    actual_statement = command._prepare_exchange_rates_upsert_statement()
+    query = """INSERT INTO exchange_rates (id, from_currency_id, to_currency_id, date, rate, day_key, month_key)
+    VALUES (%(id)s, %(from_currency_id)s, %(to_currency_id)s, %(date)s, %(rate)s, %(day_key)s, %(month_key)s)
+    ON CONFLICT (from_currency_id, to_currency_id, date) DO UPDATE SET rate = excluded.rate
+    WHERE excluded.rate != exchange_rates.rate"""
 
-    assert mock_statement == actual_statement
-    mock_insert.assert_called_once_with(ExchangeRate)
-    mock_statement.values.assert_called_once_with(exchange_rate_values)
-    mock_statement.on_conflict_do_update.assert_called_once_with(
-        index_elements=["from_currency_id", "to_currency_id", "date"],
-        set_={"rate": mock_statement.excluded.rate},
-    )
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=postgresql.dialect()))
 
 
 def test_update_exchange_rates(
@@ -185,31 +351,99 @@ def test_update_exchange_rates(
     mock_perus = mocker.MagicMock(return_value=mock_statement)
     mocker.patch.object(command, "_prepare_exchange_rates_upsert_statement", mock_perus)
 
-    moniker_1 = "ADP"
-    moniker_2 = "IYK"
-    command._monikers = [moniker_1, moniker_2]
+    mock_upsert_in_batches = mocker.MagicMock()
+    mocker.patch.object(command, "_upsert_in_batches", mock_upsert_in_batches)
+
+    mock_checkpoint_statement = mocker.MagicMock()
+    mock_pcus = mocker.MagicMock(return_value=mock_checkpoint_statement)
+    mocker.patch.object(command, "_prepare_checkpoint_upsert_statement", mock_pcus)
 
-    command._update_exchange_rates()
+    mock_btv = mocker.MagicMock()
+    mocker.patch.object(command, "_bump_table_versions", mock_btv)
+
+    exchange_rates_values = [{"rate": 1.35}, {"rate": 0.74}]
+    command._exchange_rates_values = exchange_rates_values
+
+    command._update_exchange_rates(datetime(2024, 1, 30))
 
     mock_session_class.assert_called_once_with(command.engine)
     mock_perus.assert_called_once()
-    mock_session.execute.assert_called_once_with(mock_statement)
+    mock_upsert_in_batches.assert_called_once_with(mock_session, mock_statement, exchange_rates_values)
+    mock_pcus.assert_called_once_with(datetime(2024, 1, 30))
+    mock_session.execute.assert_called_once_with(mock_checkpoint_statement)
+    mock_btv.assert_called_once_with(mock_session)
     mock_session.commit.assert_called_once()
+    assert command._upsert_seconds > 0
 
 
 def test_execute(command: IngestExchangeRatesCommand, mocker: MockerFixture) -> None:
-    mock_rc = mocker.MagicMock()
-    mock_ccp = mocker.MagicMock()
-    mock_der = mocker.MagicMock()
-    mock_uer = mocker.MagicMock()
-    mocker.patch.object(command, "_resolve_currencies", mock_rc)
-    mocker.patch.object(command, "_compute_currency_pairs", mock_ccp)
-    mocker.patch.object(command, "_download_exchange_rates", mock_der)
-    mocker.patch.object(command, "_update_exchange_rates", mock_uer)
+    chunks = [
+        [datetime(2024, 1, 1), datetime(2024, 1, 2)],
+        [datetime(2024, 1, 3)],
+    ]
+
+    mock_manager = mocker.MagicMock()
+    for name in [
+        "_resolve_currencies",
+        "_compute_currency_pairs",
+        "_resolve_checkpoint",
+        "_download_exchange_rates",
+        "_update_exchange_rates",
+        "_clear_checkpoint",
+        "_report_throughput",
+    ]:
+        mocker.patch.object(command, name, getattr(mock_manager, name))
+    mocker.patch.object(command, "_date_chunks", mocker.MagicMock(return_value=iter(chunks)))
+
+    command.execute()
+
+    assert [
+        call._resolve_currencies(),
+        call._compute_currency_pairs(),
+        call._resolve_checkpoint(),
+        call._download_exchange_rates(chunks[0]),
+        call._update_exchange_rates(datetime(2024, 1, 2)),
+        call._download_exchange_rates(chunks[1]),
+        call._update_exchange_rates(datetime(2024, 1, 3)),
+        call._clear_checkpoint(),
+        call._report_throughput("exchange rates"),
+    ] == mock_manager.mock_calls
+
+
+def test_execute_resumes_from_checkpoint(mocker: MockerFixture) -> None:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Currency(id=1, code="USD"), Currency(id=2, code="CAD")])
+        session.commit()
+
+    command = IngestExchangeRatesCommand(engine, datetime(2024, 1, 1), datetime(2024, 1, 5), "API-KEY")
+    command.checkpoint_days = 2
+
+    def download_rates_for(date: datetime) -> dict[str, float]:
+        if date == datetime(2024, 1, 4):
+            raise ConnectionError
+
+        return {"USD": 1.0, "CAD": 1.3}
+
+    mocker.patch.object(command, "_download_rates_for", mocker.MagicMock(side_effect=download_rates_for))
+    mocker.patch.object(command, "_report_throughput", mocker.MagicMock())
+
+    with pytest.raises(ConnectionError):
+        command.execute()
+
+    with Session(engine) as session:
+        assert [(date(2024, 1, 2),)] == session.execute(select(IngestCheckpoint.last_completed_date)).all()
+        assert 4 == len(session.scalars(select(ExchangeRate)).all())
+
+    mock_drf = mocker.MagicMock(return_value={"USD": 1.0, "CAD": 1.3})
+    mocker.patch.object(command, "_download_rates_for", mock_drf)
 
     command.execute()
 
-    mock_rc.assert_called_once()
-    mock_ccp.assert_called_once()
-    mock_der.assert_called_once()
-    mock_uer.assert_called_once()
+    assert [call(datetime(2024, 1, day)) for day in [3, 4, 5]] == mock_drf.call_args_list
+
+    with Session(engine) as session:
+        assert [] == session.scalars(select(IngestCheckpoint)).all()
+        assert 10 == len(session.scalars(select(ExchangeRate)).all())
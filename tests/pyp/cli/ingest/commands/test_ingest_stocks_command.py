@@ -1,17 +1,22 @@
 import json
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from unittest.mock import MagicMock, call
 
 import pytest
-from pandas import DataFrame, Index, Series
+from pandas import DataFrame, DatetimeIndex, Series, Timestamp
 from pytest_mock import MockerFixture
+from sqlalchemy import Insert, create_engine, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
 from yfinance import Ticker
 from yfinance.scrapers.funds import FundsData
 
 from pyp.cli.ingest.commands.base import IngestBaseCommand
+from pyp.cli.ingest.commands.response_cache import ResponseCache
 from pyp.cli.ingest.commands.stocks import IngestStocksCommand
 from pyp.cli.protocols import CommandProtocol
-from pyp.database.models import Currency, Price, Stock
+from pyp.database.models import Base, Currency, MonthlyPrice, Price, Stock
 
 from .test_data.ADP import adp_info
 from .test_data.BTCO import btco_info
@@ -50,6 +55,35 @@ def test_initialization(mock_engine: MagicMock) -> None:
     assert end_date == command.end_date
     assert monikers == command.monikers
     assert exclude_monikers == command.exclude_monikers
+    assert command.incremental is False
+    assert 1000 == command.batch_size
+    assert command.commit_every is None
+    assert timedelta(days=7) == command.metadata_ttl
+    assert 8 == command.metadata_jobs
+    assert command.response_cache is None
+    assert 100 == command.chunk_size
+    assert (Price, MonthlyPrice) == command._versioned_models
+    assert dict() == command._latest_price_dates_by_moniker
+    assert 0 == command._priced_monikers
+
+
+def test_initialization_incremental(mock_engine: MagicMock) -> None:
+    command = IngestStocksCommand(
+        mock_engine,
+        incremental=True,
+        batch_size=50,
+        commit_every=10,
+        metadata_ttl=timedelta(days=1),
+        metadata_jobs=2,
+        chunk_size=20,
+    )
+
+    assert command.incremental is True
+    assert 50 == command.batch_size
+    assert 10 == command.commit_every
+    assert timedelta(days=1) == command.metadata_ttl
+    assert 2 == command.metadata_jobs
+    assert 20 == command.chunk_size
 
 
 @pytest.mark.parametrize(
@@ -63,7 +97,8 @@ def test_initialization(mock_engine: MagicMock) -> None:
                 stocks.moniker,
                 stocks.name,
                 stocks.description,
-                stocks.sector_weightings
+                stocks.sector_weightings,
+                stocks.metadata_refreshed_at
             FROM stocks""",
             None,
             None,
@@ -76,7 +111,8 @@ def test_initialization(mock_engine: MagicMock) -> None:
                 stocks.moniker,
                 stocks.name,
                 stocks.description,
-                stocks.sector_weightings
+                stocks.sector_weightings,
+                stocks.metadata_refreshed_at
             FROM stocks
             WHERE stocks.moniker IN (__[POSTCOMPILE_moniker_1])""",
             ["ADP", "IYK"],
@@ -89,7 +125,8 @@ def test_initialization(mock_engine: MagicMock) -> None:
                 stocks.stock_type,
                 stocks.moniker, stocks.name,
                 stocks.description,
-                stocks.sector_weightings
+                stocks.sector_weightings,
+                stocks.metadata_refreshed_at
             FROM stocks
             WHERE (stocks.moniker NOT IN (__[POSTCOMPILE_moniker_1]))""",
             None,
@@ -103,7 +140,8 @@ def test_initialization(mock_engine: MagicMock) -> None:
                 stocks.moniker,
                 stocks.name,
                 stocks.description,
-                stocks.sector_weightings
+                stocks.sector_weightings,
+                stocks.metadata_refreshed_at
             FROM stocks
             WHERE stocks.moniker IN (__[POSTCOMPILE_moniker_1])
             AND (stocks.moniker NOT IN (__[POSTCOMPILE_moniker_2]))""",
@@ -152,6 +190,65 @@ def test_resolve_stocks(
     mock_select.assert_called_once_with(Stock)
 
 
+def test_stale_stocks(command: IngestStocksCommand) -> None:
+    fresh_stock = Stock(moniker="ADP", metadata_refreshed_at=datetime.now() - timedelta(days=1))
+    stale_stock = Stock(moniker="IYK", metadata_refreshed_at=datetime.now() - timedelta(days=8))
+    new_stock = Stock(moniker="BTCO")
+    command._stocks = [fresh_stock, stale_stock, new_stock]
+
+    assert [stale_stock, new_stock] == command._stale_stocks
+
+    command.metadata_ttl = timedelta(0)
+
+    assert [fresh_stock, stale_stock, new_stock] == command._stale_stocks
+
+
+@pytest.mark.parametrize(
+    "moniker,info,sector_weightings,expected_sector_weightings",
+    [
+        ("ADP", adp_info, iyk_sector_weightings, None),
+        ("BTCO", btco_info, None, None),
+        ("IYK", iyk_info, iyk_sector_weightings, iyk_sector_weightings),
+    ],
+)
+def test_fetch_stock_metadata(
+    moniker: str,
+    info: dict,
+    sector_weightings: dict | None,
+    expected_sector_weightings: dict | None,
+    mocker: MockerFixture,
+) -> None:
+    mock_ticker = mocker.MagicMock(spec=Ticker)
+    mock_ticker.info = info
+    mock_funds_data = mocker.MagicMock(spec=FundsData)
+    mock_funds_data.sector_weightings = sector_weightings
+    mock_ticker.funds_data = mock_funds_data
+    mock_ticker_class = mocker.MagicMock(spec=Ticker, return_value=mock_ticker)
+    mocker.patch("pyp.cli.ingest.commands.stocks.Ticker", mock_ticker_class)
+
+    assert (info, expected_sector_weightings) == IngestStocksCommand._fetch_stock_metadata(moniker)
+
+    mock_ticker_class.assert_called_once_with(moniker)
+
+
+def test_stock_metadata_replays_cached_response(
+    command: IngestStocksCommand,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    command.response_cache = ResponseCache(tmp_path)
+
+    mock_fetch_stock_metadata = mocker.MagicMock(return_value=(adp_info, None))
+    mocker.patch.object(command, "_fetch_stock_metadata", mock_fetch_stock_metadata)
+
+    assert (adp_info, None) == command._stock_metadata("ADP")
+
+    command.response_cache.offline = True
+
+    assert (adp_info, None) == command._stock_metadata("ADP")
+    mock_fetch_stock_metadata.assert_called_once_with("ADP")
+
+
 @pytest.mark.parametrize(
     "moniker,info,sector_weightings,expected_sector_weightings",
     [
@@ -166,7 +263,6 @@ def test_prepare_updated_stock(
     sector_weightings: dict | None,
     expected_sector_weightings: dict,
     command: IngestStocksCommand,
-    mocker: MockerFixture,
 ) -> None:
     currencies = [Currency(code="USD")]
     command._currencies_by_code = {c.code: c for c in currencies}
@@ -178,56 +274,145 @@ def test_prepare_updated_stock(
     assert stock.description is None
     assert stock.currency is None
     assert stock.sector_weightings is None
+    assert stock.metadata_refreshed_at is None
 
-    mock_ticker = mocker.MagicMock(spec=Ticker)
-    mock_ticker.info = info
-    mock_funds_data = mocker.MagicMock(spec=FundsData)
-    mock_funds_data.sector_weightings = sector_weightings
-    mock_ticker.funds_data = mock_funds_data
-    mock_ticker_class = mocker.MagicMock(spec=Ticker, return_value=mock_ticker)
-    mocker.patch("pyp.cli.ingest.commands.stocks.Ticker", mock_ticker_class)
-
-    command._prepare_updated_stock(stock)
+    command._prepare_updated_stock(stock, info, sector_weightings)
 
     assert info["quoteType"] == stock.stock_type
     assert info["longName"] == stock.name
     assert info["longBusinessSummary"] == stock.description
-    assert info["longBusinessSummary"] == stock.description
     assert command._currencies_by_code[info["currency"]] == stock.currency
     assert json.dumps(expected_sector_weightings) == stock.sector_weightings
+    assert datetime.now() - stock.metadata_refreshed_at < timedelta(minutes=1)
 
 
 def test_update_stock_info(
     command: IngestStocksCommand,
-    mock_session_class: MagicMock,
     mock_session: MagicMock,
     mocker: MockerFixture,
 ) -> None:
     stock_adp = Stock(moniker="ADP")
     stock_smh = Stock(moniker="SMH")
-    stocks = [stock_adp, stock_smh]
-    command._stocks = stocks
-
-    currencies = [Currency(code="USD"), Currency(code="CAD")]
-    command._currencies_by_code = {c.code: c for c in currencies}
+    stock_iyk = Stock(moniker="IYK", metadata_refreshed_at=datetime.now())
+    command._stocks = [stock_adp, stock_smh, stock_iyk]
 
-    mocker.patch("pyp.cli.ingest.commands.stocks.Session", mock_session_class)
+    metadata_by_moniker = {"ADP": (adp_info, None), "SMH": (iyk_info, iyk_sector_weightings)}
+    mock_fetch_stock_metadata = mocker.MagicMock(side_effect=lambda moniker: metadata_by_moniker[moniker])
+    mocker.patch.object(command, "_fetch_stock_metadata", mock_fetch_stock_metadata)
 
     mock_prepare_updated_stock = mocker.MagicMock()
     mocker.patch.object(command, "_prepare_updated_stock", mock_prepare_updated_stock)
 
-    command._update_stock_info()
+    command._update_stock_info(mock_session)
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_prepare_updated_stock.assert_has_calls([
-        call(stock_adp),
-        call(stock_smh),
-    ])
-    mock_session.add.assert_has_calls([
-        call(stock_adp),
-        call(stock_smh),
-    ])
-    mock_session.commit.assert_has_calls([call(), call()])
+    assert [call("ADP"), call("SMH")] == sorted(mock_fetch_stock_metadata.call_args_list)
+    assert [
+        call(stock_adp, adp_info, None),
+        call(stock_smh, iyk_info, iyk_sector_weightings),
+    ] == mock_prepare_updated_stock.call_args_list
+    assert [call(stock_adp), call(stock_smh)] == mock_session.add.call_args_list
+    mock_session.commit.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "commit_every,count,committed",
+    [
+        (None, 1, False),
+        (None, 10, False),
+        (1, 1, True),
+        (2, 1, False),
+        (2, 4, True),
+    ],
+)
+def test_commit_if_due(
+    commit_every: int | None,
+    count: int,
+    committed: bool,
+    command: IngestStocksCommand,
+    mock_session: MagicMock,
+) -> None:
+    command.commit_every = commit_every
+
+    command._upserted_rows = 5
+
+    command._commit_if_due(mock_session, count)
+
+    assert committed == mock_session.commit.called
+    assert committed == mock_session.execute.called
+
+
+def test_commit(command: IngestStocksCommand, mock_session: MagicMock, mocker: MockerFixture) -> None:
+    manager = mocker.MagicMock()
+    mock_btv = mocker.MagicMock()
+    mocker.patch.object(command, "_bump_table_versions", mock_btv)
+    manager.attach_mock(mock_btv, "_bump_table_versions")
+    manager.attach_mock(mock_session.commit, "commit")
+
+    command._commit(mock_session)
+
+    assert [call._bump_table_versions(mock_session), call.commit()] == manager.mock_calls
+    assert command._upsert_seconds > 0
+
+
+def test_update_stock_info_commit_every(
+    command: IngestStocksCommand,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    command._stocks = [Stock(moniker="ADP"), Stock(moniker="SMH"), Stock(moniker="IYK")]
+    command.commit_every = 2
+
+    mocker.patch.object(command, "_fetch_stock_metadata", mocker.MagicMock(return_value=(adp_info, None)))
+    mocker.patch.object(command, "_prepare_updated_stock", mocker.MagicMock())
+
+    manager = mocker.MagicMock()
+    manager.attach_mock(mock_session.add, "add")
+    manager.attach_mock(mock_session.commit, "commit")
+
+    command._update_stock_info(mock_session)
+
+    assert [
+        call.add(command._stocks[0]),
+        call.add(command._stocks[1]),
+        call.commit(),
+        call.add(command._stocks[2]),
+    ] == manager.mock_calls
+
+
+def test_resolve_latest_price_dates() -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Stock(id=1, moniker="ADP"), Stock(id=2, moniker="IYK"), Stock(id=3, moniker="SMH")])
+        session.add_all([
+            Price(stock_id=stock_id, date=price_date, amount=1.0, day_key=0, month_key=0)
+            for stock_id, price_date in [(1, date(2024, 12, 2)), (1, date(2024, 12, 3)), (2, date(2024, 11, 29))]
+        ])
+        session.add(Price(stock_id=3, date=date(2024, 12, 4), amount=1.0, day_key=0, month_key=0))
+        session.commit()
+
+    command = IngestStocksCommand(engine, incremental=True)
+    command._stock_ids_by_moniker = {"ADP": 1, "IYK": 2, "BTCO": 4}
+
+    command._resolve_latest_price_dates()
+
+    assert {"ADP": date(2024, 12, 3), "IYK": date(2024, 11, 29)} == command._latest_price_dates_by_moniker
+
+
+def test_monikers_by_latest_price_date(command: IngestStocksCommand) -> None:
+    command._monikers = ["ADP", "BTCO", "IYK", "SMH"]
+    command._latest_price_dates_by_moniker = {
+        "ADP": date(2024, 12, 3),
+        "IYK": date(2024, 12, 3),
+        "SMH": date(2024, 11, 29),
+    }
+
+    assert {
+        date(2024, 12, 3): ["ADP", "IYK"],
+        None: ["BTCO"],
+        date(2024, 11, 29): ["SMH"],
+    } == command._monikers_by_latest_price_date
 
 
 def test_prices_download_parameters(command: IngestStocksCommand) -> None:
@@ -247,34 +432,101 @@ def test_prices_download_parameters_when_dates_set(command: IngestStocksCommand)
     } == command._prices_download_parameters()
 
 
+@pytest.mark.parametrize(
+    "latest_price_date,expected_params",
+    [
+        (date(2024, 12, 3), {"start": "2024-12-03"}),
+        (None, {"period": "max"}),
+    ],
+)
+def test_prices_download_parameters_when_incremental(
+    latest_price_date: date | None,
+    expected_params: dict,
+    command: IngestStocksCommand,
+) -> None:
+    command.start_date = None
+    command.end_date = None
+    command.incremental = True
+
+    assert expected_params == command._prices_download_parameters(latest_price_date)
+
+
+def test_download_chunks(command: IngestStocksCommand) -> None:
+    command._monikers = ["ADP", "BTCO", "IYK"]
+    command.chunk_size = 2
+
+    download_params = {"start": "2024-01-01", "end": "2024-12-31"}
+
+    assert [(["ADP", "BTCO"], download_params), (["IYK"], download_params)] == list(command._download_chunks())
+
+
+def test_download_chunks_when_incremental(command: IngestStocksCommand) -> None:
+    command.start_date = None
+    command.end_date = None
+    command.incremental = True
+    command.chunk_size = 2
+    command._monikers = ["ADP", "BTCO", "IYK", "SMH"]
+    command._latest_price_dates_by_moniker = {
+        "ADP": date(2024, 12, 3),
+        "IYK": date(2024, 12, 3),
+        "SMH": date(2024, 12, 3),
+    }
+
+    assert [
+        (["ADP", "IYK"], {"start": "2024-12-03"}),
+        (["SMH"], {"start": "2024-12-03"}),
+        (["BTCO"], {"period": "max"}),
+    ] == list(command._download_chunks())
+
+
 def test_download_prices_df(command: IngestStocksCommand, mocker: MockerFixture) -> None:
     monikers = ["ADP", "BTCO", "IYK"]
-    command._monikers = monikers
+    download_params = {"period": "1y"}
 
     expected_df = DataFrame()
 
     mock_download = mocker.MagicMock(return_value=expected_df)
     mocker.patch("pyp.cli.ingest.commands.stocks.download", mock_download)
 
-    download_params = {"period": "1y"}
-    mock_prices_download_parameters = mocker.MagicMock(return_value=download_params)
-    mocker.patch.object(command, "_prices_download_parameters", mock_prices_download_parameters)
-
-    command._download_prices_df()
+    command._download_prices_df(monikers, download_params)
 
     assert isinstance(command._prices_df, DataFrame)
     assert expected_df.equals(command._prices_df)
 
-    mock_prices_download_parameters.assert_called_once()
     mock_download.assert_called_once_with(monikers, keepna=True, rounding=True, **download_params)
 
 
+def test_download_prices_replays_cached_response(
+    command: IngestStocksCommand,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    command.response_cache = ResponseCache(tmp_path)
+
+    prices_df = DataFrame(
+        data={("Close", "ADP"): [1.5, 1.6]},
+        index=DatetimeIndex(["2024-12-03", "2024-12-04"], name="Date"),
+    )
+    mock_download = mocker.MagicMock(return_value=prices_df)
+    mocker.patch("pyp.cli.ingest.commands.stocks.download", mock_download)
+
+    assert prices_df.equals(command._download_prices(["ADP"], {"period": "1y"}))
+
+    command.response_cache.offline = True
+
+    assert prices_df.equals(command._download_prices(["ADP"], {"period": "1y"}))
+    mock_download.assert_called_once_with(["ADP"], keepna=True, rounding=True, period="1y")
+
+    with pytest.raises(LookupError):
+        command._download_prices(["ADP"], {"period": "max"})
+
+
 def test_extract_close_prices_sr(command: IngestStocksCommand) -> None:
     monikers = ["ADP", "BTCO", "IYK"]
     command._monikers = monikers
 
     prices_df = DataFrame(data={"Open": [0, None, 123], "Close": [1.5, None, 45.1]})
-    expected_series = prices_df["Close"].fillna(0)
+    expected_series = prices_df["Close"]
 
     command._prices_df = prices_df
     command._extract_close_prices()
@@ -285,19 +537,34 @@ def test_extract_close_prices_sr(command: IngestStocksCommand) -> None:
     assert expected_series.equals(actual_series)
 
 
-def test_prepare_price_upsert_statement(command: IngestStocksCommand, mocker: MockerFixture) -> None:
+def test_moniker_close_prices(command: IngestStocksCommand) -> None:
+    command._close_prices_df = DataFrame(
+        data={"ADP": [0.0, 1.6, 1.7], "BTCO": [3.5, 3.6, 3.7], "IYK": [None, 2.6, None]},
+        index=DatetimeIndex(["2024-12-02", "2024-12-03", "2024-12-04"], name="Date"),
+    )
+    command._latest_price_dates_by_moniker = {"ADP": date(2024, 12, 3)}
+
+    assert [1.6, 1.7] == command._moniker_close_prices("ADP").to_list()
+    assert [3.5, 3.6, 3.7] == command._moniker_close_prices("BTCO").to_list()
+    assert [Timestamp("2024-12-03")] == command._moniker_close_prices("IYK").index.to_list()
+    assert [2.6] == command._moniker_close_prices("IYK").to_list()
+
+
+def test_prepare_price_values(command: IngestStocksCommand) -> None:
     amount_1 = 1.23
     amount_2 = 0
     amount_3 = 4.54
 
-    date_1 = "2024-01-01"
-    date_2 = "2024-01-02"
-    date_3 = "2024-01-03"
+    date_1 = Timestamp("2024-01-01")
+    date_2 = Timestamp("2024-01-02")
+    date_3 = Timestamp("2024-01-03")
 
     moniker = "ADP"
 
     close_prices_df = DataFrame(
-        data={moniker: Series([amount_1, amount_2, amount_3], index=Index([date_1, date_2, date_3], name="Date"))}
+        data={
+            moniker: Series([amount_1, amount_2, amount_3], index=DatetimeIndex([date_1, date_2, date_3], name="Date"))
+        }
     )
     command._close_prices_df = close_prices_df
 
@@ -305,70 +572,300 @@ def test_prepare_price_upsert_statement(command: IngestStocksCommand, mocker: Mo
     stock_ids_by_moniker = {moniker: stock_id}
     command._stock_ids_by_moniker = stock_ids_by_moniker
 
-    mock_statement = mocker.MagicMock()
-    mock_statement.values = mocker.MagicMock(return_value=mock_statement)
-    mock_statement.on_conflict_do_update = mocker.MagicMock(return_value=mock_statement)
-    mock_insert = mocker.MagicMock(return_value=mock_statement)
-    mocker.patch("pyp.cli.ingest.commands.stocks.insert", mock_insert)
-
-    actual_statement = command._prepare_price_upsert_statement(moniker)
-
-    assert mock_statement == actual_statement
-    mock_insert.assert_called_once_with(Price)
-    mock_statement.values.assert_called_once_with([
-        {"stock_id": stock_id, "date": date_1, "amount": amount_1},
-        {"stock_id": stock_id, "date": date_2, "amount": amount_2},
-        {"stock_id": stock_id, "date": date_3, "amount": amount_3},
-    ])
-    mock_statement.on_conflict_do_update.assert_called_once_with(
-        index_elements=["stock_id", "date"],
-        set_={"amount": mock_statement.excluded.amount},
+    assert [
+        {"stock_id": stock_id, "date": date_1, "amount": amount_1, "day_key": 20240101, "month_key": 202401},
+        {"stock_id": stock_id, "date": date_2, "amount": amount_2, "day_key": 20240102, "month_key": 202401},
+        {"stock_id": stock_id, "date": date_3, "amount": amount_3, "day_key": 20240103, "month_key": 202401},
+    ] == command._prepare_price_values(moniker)
+
+
+def test_prepare_price_upsert_statement(command: IngestStocksCommand) -> None:
+    statement = command._prepare_price_upsert_statement()
+
+    assert isinstance(statement, Insert)
+
+    query = """INSERT INTO prices (id, stock_id, date, amount, day_key, month_key)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (stock_id, date) DO UPDATE SET amount = excluded.amount
+    WHERE excluded.amount != prices.amount"""
+
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=sqlite.dialect()))
+
+
+def test_prepare_price_upsert_statement_for_postgresql(command: IngestStocksCommand) -> None:
+    command.engine.dialect = postgresql.dialect()
+
+    statement = command._prepare_price_upsert_statement()
+
+    assert isinstance(statement, postgresql.Insert)
+
+    query = """INSERT INTO prices (id, stock_id, date, amount, day_key, month_key)
+    VALUES (%(id)s, %(stock_id)s, %(date)s, %(amount)s, %(day_key)s, %(month_key)s)
+    ON CONFLICT (stock_id, date) DO UPDATE SET amount = excluded.amount
+    WHERE excluded.amount != prices.amount"""
+
+    assert query.replace("\n    ", " ") == str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_prepare_monthly_prices_refresh_statement(command: IngestStocksCommand, mocker: MockerFixture) -> None:
+    moniker = "ADP"
+    stock_id = 1
+
+    command._close_prices_df = DataFrame(
+        data={moniker: [1.23, 0, 4.54]},
+        index=DatetimeIndex(["2024-01-31", "2024-02-01", "2024-03-04"], name="Date"),
     )
+    command._stock_ids_by_moniker = {moniker: stock_id}
+
+    mock_statement = mocker.MagicMock()
+    mock_pmprs = mocker.MagicMock(return_value=mock_statement)
+    mocker.patch("pyp.cli.ingest.commands.stocks.prepare_monthly_prices_refresh_statement", mock_pmprs)
 
+    assert mock_statement == command._prepare_monthly_prices_refresh_statement(moniker)
 
-def test_update_stock_pricing(
+    mock_pmprs.assert_called_once_with(stock_id, date(2024, 1, 31), date(2024, 3, 4), dialect_name="sqlite")
+
+
+def test_update_chunk_pricing(
     command: IngestStocksCommand,
-    mock_session_class: MagicMock,
     mock_session: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.ingest.commands.stocks.Session", mock_session_class)
-
     mock_statement = mocker.MagicMock()
-    mock_ppus = mocker.MagicMock(return_value=mock_statement)
-    mocker.patch.object(command, "_prepare_price_upsert_statement", mock_ppus)
+
+    mock_upsert_in_batches = mocker.MagicMock()
+    mocker.patch.object(command, "_upsert_in_batches", mock_upsert_in_batches)
+
+    mock_refresh_statement = mocker.MagicMock()
+    mock_pmprs = mocker.MagicMock(return_value=mock_refresh_statement)
+    mocker.patch.object(command, "_prepare_monthly_prices_refresh_statement", mock_pmprs)
 
     moniker_1 = "ADP"
     moniker_2 = "IYK"
-    command._monikers = [moniker_1, moniker_2]
+    monikers = [moniker_1, moniker_2, "BTCO"]
+    command._close_prices_df = DataFrame(
+        data={moniker_1: [1.5], moniker_2: [2.5], "BTCO": [3.5]},
+        index=DatetimeIndex(["2024-12-02"], name="Date"),
+    )
+    command._stock_ids_by_moniker = {moniker_1: 1, moniker_2: 2, "BTCO": 3}
+    command._latest_price_dates_by_moniker = {"BTCO": date(2024, 12, 3)}
 
-    command._update_stock_pricing()
+    command._update_chunk_pricing(mock_session, mock_statement, monikers)
 
-    mock_session_class.assert_called_once_with(command.engine)
-    mock_ppus.assert_has_calls([call(moniker_1), call(moniker_2)])
-    mock_session.execute.assert_has_calls([call(mock_statement), call(mock_statement)])
-    mock_session.commit.assert_has_calls([call(), call()])
+    assert [
+        call(mock_session, mock_statement, command._prepare_price_values(moniker_1)),
+        call(mock_session, mock_statement, command._prepare_price_values(moniker_2)),
+    ] == mock_upsert_in_batches.call_args_list
+    assert [call(moniker_1), call(moniker_2)] == mock_pmprs.call_args_list
+    assert [call(mock_refresh_statement), call(mock_refresh_statement)] == mock_session.execute.call_args_list
+    mock_session.commit.assert_not_called()
+    assert 3 == command._priced_monikers
+    assert command._upsert_seconds > 0
 
+    command.commit_every = 2
+
+    command._update_chunk_pricing(mock_session, mock_statement, monikers)
+
+    assert 6 == command._priced_monikers
+    assert 2 == mock_session.commit.call_count
+
+
+def test_update_stock_pricing(
+    command: IngestStocksCommand,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mock_statement = mocker.MagicMock()
+    mocker.patch.object(command, "_prepare_price_upsert_statement", mocker.MagicMock(return_value=mock_statement))
+
+    chunks = [(["ADP", "BTCO"], {"period": "1y"}), (["IYK"], {"period": "1y"})]
+    mocker.patch.object(command, "_download_chunks", mocker.MagicMock(return_value=iter(chunks)))
+
+    manager = mocker.MagicMock()
+    for name in ["_download_prices_df", "_extract_close_prices", "_update_chunk_pricing", "_commit"]:
+        mock_method = mocker.MagicMock()
+        mocker.patch.object(command, name, mock_method)
+        manager.attach_mock(mock_method, name)
+
+    command._update_stock_pricing(mock_session)
+
+    assert [
+        call._download_prices_df(["ADP", "BTCO"], {"period": "1y"}),
+        call._extract_close_prices(),
+        call._update_chunk_pricing(mock_session, mock_statement, ["ADP", "BTCO"]),
+        call._commit(mock_session),
+        call._download_prices_df(["IYK"], {"period": "1y"}),
+        call._extract_close_prices(),
+        call._update_chunk_pricing(mock_session, mock_statement, ["IYK"]),
+        call._commit(mock_session),
+    ] == manager.mock_calls
+
+
+def test_update_stock_pricing_streams_chunks(mocker: MockerFixture) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Stock(id=1, moniker="ADP"), Stock(id=2, moniker="BTCO"), Stock(id=3, moniker="IYK")])
+        session.commit()
+
+    command = IngestStocksCommand(engine, chunk_size=2)
+    command._monikers = ["ADP", "BTCO", "IYK"]
+    command._stock_ids_by_moniker = {"ADP": 1, "BTCO": 2, "IYK": 3}
+
+    def download(monikers: list[str], **_: object) -> DataFrame:
+        return DataFrame(
+            data={("Close", moniker): [10.0 * index, 10.0 * index + 1] for index, moniker in enumerate(monikers, 1)},
+            index=DatetimeIndex(["2024-12-02", "2024-12-03"], name="Date"),
+        )
+
+    mock_download = mocker.MagicMock(side_effect=download)
+    mocker.patch("pyp.cli.ingest.commands.stocks.download", mock_download)
+
+    with Session(engine) as session:
+        command._update_stock_pricing(session)
+        session.commit()
+
+    assert [
+        call(["ADP", "BTCO"], keepna=True, rounding=True, period="1y"),
+        call(["IYK"], keepna=True, rounding=True, period="1y"),
+    ] == mock_download.call_args_list
+    assert ["IYK"] == command._close_prices_df.columns.to_list()
+
+    with Session(engine) as session:
+        assert [(1, 10.0), (1, 11.0), (2, 20.0), (2, 21.0), (3, 10.0), (3, 11.0)] == session.execute(
+            select(Price.stock_id, Price.amount).order_by(Price.stock_id, Price.date)
+        ).all()
+
+
+def test_update_stock_pricing_downloads_outside_write_transaction(tmp_path: Path, mocker: MockerFixture) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'pyp.db'}")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Stock(id=1, moniker="ADP"), Stock(id=2, moniker="BTCO"), Stock(id=3, moniker="IYK")])
+        session.commit()
+
+    command = IngestStocksCommand(engine, chunk_size=2)
+    command._monikers = ["ADP", "BTCO", "IYK"]
+    command._stock_ids_by_moniker = {"ADP": 1, "BTCO": 2, "IYK": 3}
+
+    writer_engine = create_engine(
+        f"sqlite:///{tmp_path / 'pyp.db'}", connect_args={"timeout": 0, "isolation_level": None}
+    )
+    stored_prices_counts = []
+
+    def download(monikers: list[str], **_: object) -> DataFrame:
+        with writer_engine.connect() as connection:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            stored_prices_counts.append(connection.exec_driver_sql("SELECT COUNT(*) FROM prices").scalar())
+            connection.exec_driver_sql("ROLLBACK")
+
+        return DataFrame(
+            data={("Close", moniker): [10.0 * index, 10.0 * index + 1] for index, moniker in enumerate(monikers, 1)},
+            index=DatetimeIndex(["2024-12-02", "2024-12-03"], name="Date"),
+        )
+
+    mocker.patch("pyp.cli.ingest.commands.stocks.download", mocker.MagicMock(side_effect=download))
+
+    with Session(engine) as session:
+        command._update_stock_pricing(session)
+
+    assert [0, 4] == stored_prices_counts
+
+    with Session(engine) as session:
+        assert 6 == len(session.scalars(select(Price)).all())
+
+
+def test_execute(
+    command: IngestStocksCommand,
+    mock_session_class: MagicMock,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.ingest.commands.stocks.Session", mock_session_class)
 
-def test_execute(command: IngestStocksCommand, mocker: MockerFixture) -> None:
     mock_rs = mocker.MagicMock()
     mock_rc = mocker.MagicMock()
+    mock_rlpd = mocker.MagicMock()
     mock_usi = mocker.MagicMock()
-    mock_dpdf = mocker.MagicMock()
-    mock_ecp = mocker.MagicMock()
     mock_usp = mocker.MagicMock()
     mocker.patch.object(command, "_resolve_stocks", mock_rs)
     mocker.patch.object(command, "_resolve_currencies", mock_rc)
+    mocker.patch.object(command, "_resolve_latest_price_dates", mock_rlpd)
     mocker.patch.object(command, "_update_stock_info", mock_usi)
-    mocker.patch.object(command, "_download_prices_df", mock_dpdf)
-    mocker.patch.object(command, "_extract_close_prices", mock_ecp)
     mocker.patch.object(command, "_update_stock_pricing", mock_usp)
+    mock_rt = mocker.MagicMock()
+    mocker.patch.object(command, "_report_throughput", mock_rt)
 
     command.execute()
 
     mock_rs.assert_called_once()
     mock_rc.assert_called_once()
-    mock_usi.assert_called_once()
-    mock_dpdf.assert_called_once()
-    mock_ecp.assert_called_once()
-    mock_usp.assert_called_once()
+    mock_rlpd.assert_not_called()
+    mock_session_class.assert_called_once_with(command.engine)
+    mock_usi.assert_called_once_with(mock_session)
+    mock_usp.assert_called_once_with(mock_session)
+    mock_session.commit.assert_called_once()
+    mock_rt.assert_called_once_with("prices")
+
+
+def test_execute_when_incremental(
+    command: IngestStocksCommand,
+    mock_session_class: MagicMock,
+    mock_session: MagicMock,
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("pyp.cli.ingest.commands.stocks.Session", mock_session_class)
+    command.incremental = True
+
+    manager = mocker.MagicMock()
+    for name in [
+        "_resolve_stocks",
+        "_resolve_currencies",
+        "_resolve_latest_price_dates",
+        "_update_stock_info",
+        "_update_stock_pricing",
+        "_commit",
+        "_report_throughput",
+    ]:
+        mock_method = mocker.MagicMock()
+        mocker.patch.object(command, name, mock_method)
+        manager.attach_mock(mock_method, name)
+
+    command.execute()
+
+    assert [
+        call._resolve_stocks(),
+        call._resolve_currencies(),
+        call._resolve_latest_price_dates(),
+        call._update_stock_info(mock_session),
+        call._update_stock_pricing(mock_session),
+        call._commit(mock_session),
+        call._report_throughput("prices"),
+    ] == manager.mock_calls
+
+
+def test_execute_rolls_back_when_interrupted(mocker: MockerFixture) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        session.add_all([Currency(id=1, code="USD"), Stock(id=1, moniker="ADP"), Stock(id=2, moniker="SMH")])
+        session.commit()
+
+    command = IngestStocksCommand(engine)
+
+    mocker.patch.object(command, "_fetch_stock_metadata", mocker.MagicMock(return_value=(adp_info, None)))
+    mocker.patch("pyp.cli.ingest.commands.stocks.download", mocker.MagicMock(side_effect=ConnectionError))
+
+    with pytest.raises(ConnectionError):
+        command.execute()
+
+    with Session(engine) as session:
+        assert [(1, "ADP", None, None, None), (2, "SMH", None, None, None)] == session.execute(
+            select(Stock.id, Stock.moniker, Stock.name, Stock.currency_id, Stock.metadata_refreshed_at).order_by(
+                Stock.id
+            )
+        ).all()
+        assert [] == session.scalars(select(Price)).all()
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest_mock import MockerFixture
+
+from pyp.cli.ingest.commands.rate_limiter import RateLimiter
+
+
+def test_initialization() -> None:
+    rate_limiter = RateLimiter(10)
+
+    assert 10 == rate_limiter.requests_per_period
+    assert 60.0 == rate_limiter.period
+
+
+def test_wait_allows_requests_within_limit(mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.ingest.commands.rate_limiter.monotonic", mocker.MagicMock(return_value=100.0))
+    mock_sleep = mocker.MagicMock()
+    mocker.patch("pyp.cli.ingest.commands.rate_limiter.sleep", mock_sleep)
+
+    rate_limiter = RateLimiter(3)
+
+    for _ in range(3):
+        rate_limiter.wait()
+
+    mock_sleep.assert_not_called()
+
+
+def test_wait_delays_requests_over_limit(mocker: MockerFixture) -> None:
+    mocker.patch(
+        "pyp.cli.ingest.commands.rate_limiter.monotonic",
+        mocker.MagicMock(side_effect=[100.0, 101.0, 102.0, 103.0, 170.0]),
+    )
+    mock_sleep = mocker.MagicMock()
+    mocker.patch("pyp.cli.ingest.commands.rate_limiter.sleep", mock_sleep)
+
+    rate_limiter = RateLimiter(2)
+
+    for _ in range(5):
+        rate_limiter.wait()
+
+    assert [mocker.call(58.0), mocker.call(58.0), mocker.call(50.0)] == mock_sleep.call_args_list
+
+
+def test_wait_across_threads(mocker: MockerFixture) -> None:
+    mocker.patch("pyp.cli.ingest.commands.rate_limiter.monotonic", mocker.MagicMock(return_value=100.0))
+    mock_sleep = mocker.MagicMock()
+    mocker.patch("pyp.cli.ingest.commands.rate_limiter.sleep", mock_sleep)
+
+    rate_limiter = RateLimiter(2)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: rate_limiter.wait(), range(6)))
+
+    assert [60.0, 60.0, 120.0, 120.0] == sorted(c.args[0] for c in mock_sleep.call_args_list)
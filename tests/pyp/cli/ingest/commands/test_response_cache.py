@@ -0,0 +1,99 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+from time import time
+
+import pytest
+from pandas import DataFrame
+from pytest_mock import MockerFixture
+
+from pyp.cli.ingest.commands.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> ResponseCache:
+    return ResponseCache(tmp_path)
+
+
+def test_initialization() -> None:
+    cache = ResponseCache()
+
+    expected_path = Path(__file__).parent.parent.parent.parent.parent.parent / ".cache/responses"
+    assert expected_path == cache.cache_dir
+    assert timedelta(hours=1) == cache.max_age
+    assert cache.offline is False
+
+
+def test_initialization_with_options(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path, timedelta(minutes=5), offline=True)
+
+    assert tmp_path == cache.cache_dir
+    assert timedelta(minutes=5) == cache.max_age
+    assert cache.offline is True
+
+
+def test_key() -> None:
+    key = ResponseCache.key("2024-12-03", "USD", ["CAD", "EUR"])
+
+    assert 64 == len(key)
+    assert key == ResponseCache.key("2024-12-03", "USD", ["CAD", "EUR"])
+    assert key != ResponseCache.key("2024-12-04", "USD", ["CAD", "EUR"])
+
+
+def test_get_missing_key(cache: ResponseCache) -> None:
+    assert cache.get("exchange_rates", ResponseCache.key("missing")) is None
+
+
+def test_get_corrupt_entry(cache: ResponseCache, tmp_path: Path) -> None:
+    key = ResponseCache.key("corrupt")
+    (tmp_path / "exchange_rates").mkdir()
+    (tmp_path / "exchange_rates" / f"{key}.pickle").write_bytes(b"")
+
+    assert cache.get("exchange_rates", key) is None
+
+
+def test_put_and_get(cache: ResponseCache, tmp_path: Path) -> None:
+    key = ResponseCache.key("prices")
+    prices_df = DataFrame({"ADP": [303.57, 305.12]})
+
+    cache.put("prices", key, prices_df)
+
+    assert prices_df.equals(cache.get("prices", key))
+    assert [f"{key}.pickle"] == [path.name for path in (tmp_path / "prices").iterdir()]
+
+
+def test_get_expired_entry(cache: ResponseCache, tmp_path: Path) -> None:
+    key = ResponseCache.key("expired")
+    cache.put("exchange_rates", key, {"data": {}})
+
+    expired_at = time() - timedelta(hours=2).total_seconds()
+    os.utime(tmp_path / "exchange_rates" / f"{key}.pickle", (expired_at, expired_at))
+
+    assert cache.get("exchange_rates", key) is None
+
+    cache.offline = True
+
+    assert {"data": {}} == cache.get("exchange_rates", key)
+
+
+def test_fetch(cache: ResponseCache, mocker: MockerFixture) -> None:
+    mock_fetch = mocker.MagicMock(return_value={"data": {"2024-12-03": {"CAD": 1.4}}})
+
+    assert mock_fetch.return_value == cache.fetch("exchange_rates", ("2024-12-03",), mock_fetch)
+    assert mock_fetch.return_value == cache.fetch("exchange_rates", ("2024-12-03",), mock_fetch)
+
+    mock_fetch.assert_called_once()
+
+
+def test_fetch_offline(cache: ResponseCache, mocker: MockerFixture) -> None:
+    cache.fetch("exchange_rates", ("2024-12-03",), mocker.MagicMock(return_value={"data": {}}))
+    cache.offline = True
+
+    mock_fetch = mocker.MagicMock()
+
+    assert {"data": {}} == cache.fetch("exchange_rates", ("2024-12-03",), mock_fetch)
+
+    with pytest.raises(LookupError):
+        cache.fetch("exchange_rates", ("2024-12-04",), mock_fetch)
+
+    mock_fetch.assert_not_called()
@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
 
 import pytest
 from pytest_mock import MockerFixture
@@ -6,8 +8,9 @@ from typer import Typer
 from typer.testing import CliRunner
 
 from pyp.cli.ingest import IngestExchangeRatesCommand, ingest_app
+from pyp.cli.ingest.commands.response_cache import ResponseCache
 from pyp.cli.ingest.commands.stocks import IngestStocksCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 
 @pytest.fixture
@@ -15,6 +18,19 @@ def app() -> Typer:
     return ingest_app
 
 
+@pytest.fixture
+def mock_response_cache_class(mocker: MockerFixture) -> MagicMock:
+    mock_response_cache_class = mocker.MagicMock(spec=ResponseCache)
+    mocker.patch("pyp.cli.ingest.ResponseCache", mock_response_cache_class)
+
+    return mock_response_cache_class
+
+
+@pytest.fixture(autouse=True)
+def mock_use_profile(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("pyp.cli.ingest.use_profile")
+
+
 def test_main_app(app: Typer) -> None:
     assert "ingest" == app.info.name
     assert "Ingest various market data from external services." == app.info.help
@@ -31,7 +47,13 @@ def test_commands(name: str, help_txt: str, app: Typer) -> None:
     assert (name, help_txt) in [(c.name, c.help) for c in app.registered_commands]
 
 
-def test_exchange_rates_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -> None:
+def test_exchange_rates_command(
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_response_cache_class: MagicMock,
+    mock_use_profile: MagicMock,
+    mocker: MockerFixture,
+) -> None:
     mock_ingest_exchange_rates_command = mocker.MagicMock()
     mock_ingest_exchange_rates_command.execute = mocker.MagicMock()
     mock_ingest_exchange_rates_command_class = mocker.MagicMock(
@@ -51,9 +73,71 @@ def test_exchange_rates_command(app: Typer, cli_runner: CliRunner, mocker: Mocke
 
     assert result.exit_code == 0
 
-    mock_ingest_exchange_rates_command_class.assert_called_once_with(engine, start_date, end_date, api_key)
+    mock_response_cache_class.assert_not_called()
+    mock_use_profile.assert_called_once_with(get_engine(), "ingest")
+    mock_ingest_exchange_rates_command_class.assert_called_once_with(
+        get_engine(), start_date, end_date, api_key, 1000, 4, 10, False, None
+    )
     mock_ingest_exchange_rates_command.execute.assert_called_once()
 
+    result = cli_runner.invoke(
+        app,
+        [
+            "exchange-rates",
+            start_date.strftime("%Y-%m-%d"),
+            end_date.strftime("%Y-%m-%d"),
+            "--batch-size",
+            "50",
+            "--jobs",
+            "8",
+            "--requests-per-minute",
+            "300",
+            "--pivot-only",
+            "--cache",
+            "--db-profile",
+            "read-heavy",
+        ],
+    )
+
+    assert result.exit_code == 0
+    mock_response_cache_class.assert_called_once_with(ResponseCache.cache_dir, offline=False)
+    mock_use_profile.assert_called_with(get_engine(), "read-heavy")
+    mock_ingest_exchange_rates_command_class.assert_called_with(
+        get_engine(), start_date, end_date, api_key, 50, 8, 300, True, mock_response_cache_class.return_value
+    )
+
+
+def test_exchange_rates_command_offline(
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_response_cache_class: MagicMock,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
+    mock_ingest_exchange_rates_command_class = mocker.MagicMock(spec=IngestExchangeRatesCommand)
+    mocker.patch("pyp.cli.ingest.IngestExchangeRatesCommand", mock_ingest_exchange_rates_command_class)
+    mocker.patch("pyp.cli.ingest.dotenv_values", mocker.MagicMock(return_value={}))
+
+    result = cli_runner.invoke(
+        app, ["exchange-rates", "2024-01-01", "2024-12-31", "--offline", "--cache-dir", str(tmp_path)]
+    )
+
+    assert result.exit_code == 0
+
+    mock_response_cache_class.assert_called_once_with(tmp_path, offline=True)
+    mock_ingest_exchange_rates_command_class.assert_called_once_with(
+        get_engine(),
+        datetime(2024, 1, 1),
+        datetime(2024, 12, 31),
+        "",
+        1000,
+        4,
+        10,
+        False,
+        mock_response_cache_class.return_value,
+    )
+    mock_ingest_exchange_rates_command_class.return_value.execute.assert_called_once()
+
 
 def test_exchange_rates_command_env_key_does_not_exist(
     app: Typer, cli_runner: CliRunner, mocker: MockerFixture
@@ -103,7 +187,14 @@ def test_exchange_rates_command_env_key_is_none(app: Typer, cli_runner: CliRunne
     mock_ingest_exchange_rates_command.execute.assert_not_called()
 
 
-def test_stocks_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -> None:
+def test_stocks_command(
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_response_cache_class: MagicMock,
+    mock_use_profile: MagicMock,
+    mocker: MockerFixture,
+    tmp_path: Path,
+) -> None:
     mock_ingest_stocks_command = mocker.MagicMock()
     mock_ingest_stocks_command.execute = mocker.MagicMock()
     mock_ingest_stocks_command_class = mocker.MagicMock(
@@ -133,16 +224,82 @@ def test_stocks_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture
             moniker_3,
             "-em",
             moniker_4,
+            "-b",
+            "200",
+            "--commit-every",
+            "25",
+            "--metadata-ttl",
+            "0",
+            "--metadata-jobs",
+            "4",
+            "--chunk-size",
+            "25",
+            "--offline",
+            "--cache-dir",
+            str(tmp_path),
+            "--db-profile",
+            "default",
         ],
     )
 
     assert result.exit_code == 0
 
+    mock_use_profile.assert_called_once_with(get_engine(), "default")
     mock_ingest_stocks_command_class.assert_called_once_with(
-        engine,
+        get_engine(),
         start_date=start_date,
         end_date=end_date,
         monikers=[moniker_1, moniker_2],
         exclude_monikers=[moniker_3, moniker_4],
+        incremental=False,
+        batch_size=200,
+        commit_every=25,
+        metadata_ttl=timedelta(0),
+        metadata_jobs=4,
+        response_cache=mock_response_cache_class.return_value,
+        chunk_size=25,
     )
+    mock_response_cache_class.assert_called_once_with(tmp_path, offline=True)
     mock_ingest_stocks_command.execute.assert_called_once()
+
+
+def test_stocks_command_incremental(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -> None:
+    mock_ingest_stocks_command_class = mocker.MagicMock(spec=IngestStocksCommand)
+    mocker.patch("pyp.cli.ingest.IngestStocksCommand", mock_ingest_stocks_command_class)
+
+    result = cli_runner.invoke(app, ["stocks", "--incremental", "-m", "ADP"])
+
+    assert result.exit_code == 0
+
+    mock_ingest_stocks_command_class.assert_called_once_with(
+        get_engine(),
+        start_date=None,
+        end_date=None,
+        monikers=["ADP"],
+        exclude_monikers=None,
+        incremental=True,
+        batch_size=1000,
+        commit_every=None,
+        metadata_ttl=timedelta(days=7),
+        metadata_jobs=8,
+        response_cache=None,
+        chunk_size=100,
+    )
+    mock_ingest_stocks_command_class.return_value.execute.assert_called_once()
+
+
+@pytest.mark.parametrize("date_option", ["--start-date", "--end-date"])
+def test_stocks_command_incremental_rejects_dates(
+    date_option: str,
+    app: Typer,
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+) -> None:
+    mock_ingest_stocks_command_class = mocker.MagicMock(spec=IngestStocksCommand)
+    mocker.patch("pyp.cli.ingest.IngestStocksCommand", mock_ingest_stocks_command_class)
+
+    result = cli_runner.invoke(app, ["stocks", "--incremental", date_option, "2024-12-01"])
+
+    assert result.exit_code != 0
+
+    mock_ingest_stocks_command_class.assert_not_called()
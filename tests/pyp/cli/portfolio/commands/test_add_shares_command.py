@@ -6,7 +6,7 @@ from pytest_mock import MockerFixture
 
 from pyp.cli.portfolio.commands import AddSharesCommand
 from pyp.cli.protocols import CommandProtocol
-from pyp.database.models import Portfolio, PortfolioStocks, Share
+from pyp.database.models import Portfolio, PortfolioStocks, Share, day_key, month_key
 
 
 @pytest.fixture
@@ -63,6 +63,8 @@ def test_prepare_share(command: AddSharesCommand) -> None:
     assert command.amount == command._share.amount
     assert command.price == command._share.price
     assert command.purchased_on == command._share.purchased_on
+    assert day_key(command.purchased_on) == command._share.day_key
+    assert month_key(command.purchased_on) == command._share.month_key
 
 
 def test_execute(
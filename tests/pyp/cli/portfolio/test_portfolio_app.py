@@ -8,7 +8,7 @@ from typer.testing import CliRunner
 
 from pyp.cli.portfolio import portfolio_app
 from pyp.cli.portfolio.commands import AddMonikerCommand, AddSharesCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 from pyp.database.models import Portfolio
 
 
@@ -43,7 +43,7 @@ def test_add_command(
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, portfolio, moniker)
+    mock_class.assert_called_once_with(get_engine(), portfolio, moniker)
     mock_add.execute.assert_called_once()
 
 
@@ -78,7 +78,7 @@ def test_add_shares_command(
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, portfolio, moniker, amount, price, purchased_on)
+    mock_class.assert_called_once_with(get_engine(), portfolio, moniker, amount, price, purchased_on)
     mock_add.execute.assert_called_once()
 
 
@@ -113,5 +113,5 @@ def test_remove_shares_command(
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, portfolio, moniker, -amount, price, purchased_on)
+    mock_class.assert_called_once_with(get_engine(), portfolio, moniker, -amount, price, purchased_on)
     mock_add.execute.assert_called_once()
@@ -1,9 +1,12 @@
 from unittest.mock import MagicMock
 
+import pytest
+import typer
 from pytest_mock import MockerFixture
 
-from pyp.cli.common import resolve_portfolio
-from pyp.database.models import Portfolio
+from pyp.cli.commands.output.base import OutputCommand
+from pyp.cli.common import is_path_component, resolve_output_dir, resolve_portfolio, resolve_portfolios
+from pyp.database.models import Portfolio, User
 
 
 def test_resolve_portfolio(
@@ -28,3 +31,88 @@ def test_resolve_portfolio(
     mock_select.assert_called_once_with(Portfolio)
     mock_scalars.assert_called_once_with(mock_select.return_value.where.return_value.where.return_value)
     mock_scalars_result.one.assert_called_once()
+
+
+def test_resolve_portfolios(
+    mock_session_class: MagicMock, mock_session: MagicMock, mock_select: MagicMock, mocker: MockerFixture
+) -> None:
+    mock_portfolios = [mocker.MagicMock(spec=Portfolio), mocker.MagicMock(spec=Portfolio)]
+
+    mock_scalars_result = mocker.MagicMock()
+    mock_scalars_result.all = mocker.MagicMock(return_value=mock_portfolios)
+
+    mock_scalars = mocker.MagicMock(return_value=mock_scalars_result)
+    mock_session.scalars = mock_scalars
+
+    mocker.patch("pyp.cli.common.Session", mock_session_class)
+    mocker.patch("pyp.cli.common.select", mock_select)
+
+    assert mock_portfolios == resolve_portfolios()
+
+    mock_select.assert_called_once_with(Portfolio)
+    mock_scalars.assert_called_once_with(mock_select.return_value.options.return_value.order_by.return_value)
+    mock_scalars_result.all.assert_called_once()
+
+
+def test_resolve_portfolios_for_user(
+    mock_session_class: MagicMock, mock_session: MagicMock, mock_select: MagicMock, mocker: MockerFixture
+) -> None:
+    mock_portfolios = [mocker.MagicMock(spec=Portfolio)]
+
+    mock_scalars_result = mocker.MagicMock()
+    mock_scalars_result.all = mocker.MagicMock(return_value=mock_portfolios)
+
+    mock_scalars = mocker.MagicMock(return_value=mock_scalars_result)
+    mock_session.scalars = mock_scalars
+
+    mocker.patch("pyp.cli.common.Session", mock_session_class)
+    mocker.patch("pyp.cli.common.select", mock_select)
+
+    assert mock_portfolios == resolve_portfolios("MrSir")
+
+    mock_scalars.assert_called_once_with(
+        mock_select.return_value.options.return_value.order_by.return_value.where.return_value
+    )
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("MrSir", True),
+        ("My Portfolio", True),
+        ("..index", True),
+        ("", False),
+        (".", False),
+        ("..", False),
+        ("a/b", False),
+        ("../../../index", False),
+        ("a\\b", False),
+        ("a\0b", False),
+    ],
+)
+def test_is_path_component(name: str, expected: bool) -> None:
+    assert expected == is_path_component(name)
+
+
+def test_resolve_output_dir() -> None:
+    portfolio = Portfolio(name="My Portfolio", user=User(username="MrSir"))
+
+    output_dir = resolve_output_dir(portfolio)
+
+    assert OutputCommand.output_dir / "MrSir" / "My Portfolio" == output_dir
+    assert output_dir.resolve().is_relative_to(OutputCommand.output_dir.resolve())
+
+
+@pytest.mark.parametrize(
+    "username,portfolio_name",
+    [
+        ("MrSir", "../../../index"),
+        ("..", "index"),
+        ("a/b", "c"),
+        ("a", "b/c"),
+        ("MrSir", "/etc"),
+    ],
+)
+def test_resolve_output_dir_rejects_unsafe_names(username: str, portfolio_name: str) -> None:
+    with pytest.raises(typer.BadParameter):
+        resolve_output_dir(Portfolio(name=portfolio_name, user=User(username=username)))
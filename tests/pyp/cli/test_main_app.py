@@ -1,25 +1,33 @@
 from datetime import datetime
-from unittest.mock import MagicMock
+from pathlib import Path
+from unittest.mock import MagicMock, call
 
 import pytest
 from pytest_mock import MockerFixture
 from typer import Typer
 from typer.testing import CliRunner
 
+from pyp.cli.commands.output.base import OutputCommand, OutputFormat
 from pyp.cli.commands.output.breakdown import OutputBreakdownCommand
+from pyp.cli.commands.output.cache import OutputCache
+from pyp.cli.commands.output.context import OutputContext
 from pyp.cli.commands.output.growth import OutputGrowthCommand
 from pyp.cli.commands.output.growth_breakdown import (
     OutputGrowthBreakdownCommand,
     OutputGrowthBreakdownMonthOverMonthCommand,
 )
+from pyp.cli.commands.output.runner import OutputRunner
 from pyp.cli.commands.output.summary import OutputSummaryCommand
 from pyp.cli.commands.setup import SetupCommand
 from pyp.cli.currencies import currency_app
+from pyp.cli.data import data_app
+from pyp.cli.db import db_app
 from pyp.cli.ingest import ingest_app
 from pyp.cli.main import app as main_app
 from pyp.cli.portfolio import portfolio_app
 from pyp.cli.user import user_app
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
+from pyp.database.models import Portfolio, User
 
 
 @pytest.fixture
@@ -38,6 +46,8 @@ def test_groups(app: Typer) -> None:
         ingest_app.info.name,
         user_app.info.name,
         portfolio_app.info.name,
+        db_app.info.name,
+        data_app.info.name,
     ] == [g.name for g in app.registered_groups]
 
 
@@ -52,7 +62,18 @@ def test_commands(name: str, help_txt: str, app: Typer) -> None:
     assert (name, help_txt) in [(c.name, c.help) for c in app.registered_commands]
 
 
+@pytest.mark.parametrize(
+    "args,seed,pivot_only",
+    [
+        ([], False, False),
+        (["--seed"], True, False),
+        (["--seed", "--pivot-only"], True, True),
+    ],
+)
 def test_setup_command(
+    args: list[str],
+    seed: bool,
+    pivot_only: bool,
     app: Typer,
     cli_runner: CliRunner,
     portfolio_id: int,
@@ -64,15 +85,49 @@ def test_setup_command(
     mock_class = mocker.MagicMock(spec=SetupCommand, return_value=mock_setup)
     mocker.patch("pyp.cli.main.SetupCommand", mock_class)
 
-    result = cli_runner.invoke(app, ["setup", "--seed"])
+    result = cli_runner.invoke(app, ["setup", *args])
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, True)
+    mock_class.assert_called_once_with(get_engine(), seed, pivot_only)
     mock_setup.execute.assert_called_once()
 
 
+def test_db_url_option(app: Typer, cli_runner: CliRunner, mock_engine: MagicMock, mocker: MockerFixture) -> None:
+    mock_configure_engine = mocker.patch("pyp.cli.main.configure_engine")
+    mocker.patch("pyp.cli.main.get_engine", return_value=mock_engine)
+    mock_class = mocker.MagicMock(spec=SetupCommand)
+    mocker.patch("pyp.cli.main.SetupCommand", mock_class)
+
+    result = cli_runner.invoke(app, ["--db-url", "postgresql://pyp@localhost/pyp", "setup"])
+
+    assert result.exit_code == 0
+
+    mock_configure_engine.assert_called_once_with("postgresql://pyp@localhost/pyp")
+    mock_class.assert_called_once_with(mock_engine, False, False)
+
+    result = cli_runner.invoke(app, ["setup"], env={"PYP_DATABASE_URL": "sqlite://"})
+
+    assert result.exit_code == 0
+
+    mock_configure_engine.assert_called_with("sqlite://")
+
+
+@pytest.mark.parametrize(
+    "option_args,output_format,jobs,cache_args",
+    [
+        ([], OutputFormat.RECORDS, 1, (OutputCache.cache_dir, OutputCache.max_size)),
+        (["--format", "columnar"], OutputFormat.COLUMNAR, 1, (OutputCache.cache_dir, OutputCache.max_size)),
+        (["--jobs", "5"], OutputFormat.RECORDS, 5, (OutputCache.cache_dir, OutputCache.max_size)),
+        (["--cache-dir", "/tmp/pyp", "--cache-size", "8"], OutputFormat.RECORDS, 1, (Path("/tmp/pyp"), 8388608)),
+        (["--no-cache"], OutputFormat.RECORDS, 1, None),
+    ],
+)
 def test_output_command(
+    option_args: list[str],
+    output_format: OutputFormat,
+    jobs: int,
+    cache_args: tuple[Path, int] | None,
     app: Typer,
     cli_runner: CliRunner,
     portfolio_id: int,
@@ -80,9 +135,18 @@ def test_output_command(
     mock_engine: MagicMock,
     mocker: MockerFixture,
 ) -> None:
-    mocker.patch("pyp.cli.main.engine", mock_engine)
+    mocker.patch("pyp.cli.main.get_engine", return_value=mock_engine)
+    mock_use_profile = mocker.patch("pyp.cli.main.use_profile")
     mocker.patch("pyp.cli.main.resolve_portfolio", mock_resolve_portfolio)
 
+    mock_cache = mocker.MagicMock(spec=OutputCache)
+    mock_cache_class = mocker.MagicMock(spec=OutputCache, return_value=mock_cache)
+    mocker.patch("pyp.cli.main.OutputCache", mock_cache_class)
+
+    mock_context = mocker.MagicMock(spec=OutputContext)
+    mock_context_class = mocker.MagicMock(spec=OutputContext, return_value=mock_context)
+    mocker.patch("pyp.cli.main.OutputContext", mock_context_class)
+
     mock_output_summary = mocker.MagicMock()
     mock_output_summary.execute = mocker.MagicMock()
     mock_summary_class = mocker.MagicMock(spec=OutputSummaryCommand, return_value=mock_output_summary)
@@ -112,6 +176,11 @@ def test_output_command(
     )
     mocker.patch("pyp.cli.main.OutputGrowthBreakdownMonthOverMonthCommand", mock_growth_breakdown_mom_class)
 
+    mock_runner = mocker.MagicMock()
+    mock_runner.execute = mocker.MagicMock()
+    mock_runner_class = mocker.MagicMock(spec=OutputRunner, return_value=mock_runner)
+    mocker.patch("pyp.cli.main.OutputRunner", mock_runner_class)
+
     username = "MrSir"
     portfolio_name = "My Portfolio"
     date = datetime(2024, 12, 9)
@@ -125,6 +194,7 @@ def test_output_command(
             date.strftime("%Y-%m-%d"),
             "--currency",
             currency_code,
+            *option_args,
             username,
             portfolio_name,
         ],
@@ -132,14 +202,163 @@ def test_output_command(
 
     assert result.exit_code == 0
 
-    mock_summary_class.assert_called_once_with(mock_engine, username, portfolio_name, portfolio_id, date, currency_code)
-    mock_growth_class.assert_called_once_with(mock_engine, portfolio_id, date, currency_code)
-    mock_breakdown_class.assert_called_once_with(mock_engine, portfolio_id, date, currency_code)
-    mock_growth_breakdown_class.assert_called_once_with(mock_engine, portfolio_id, date, currency_code)
-    mock_growth_breakdown_mom_class.assert_called_once_with(mock_engine, portfolio_id, date, currency_code)
-
-    mock_output_summary.execute.assert_called_once()
-    mock_output_growth.execute.assert_called_once()
-    mock_output_breakdown.execute.assert_called_once()
-    mock_output_growth_breakdown.execute.assert_called_once()
-    mock_output_growth_breakdown_mom.execute.assert_called_once()
+    mock_use_profile.assert_called_once_with(mock_engine, "read-heavy")
+
+    if cache_args is None:
+        mock_cache_class.assert_not_called()
+        mock_context_class.assert_called_once_with(mock_engine, [portfolio_id], None)
+    else:
+        mock_cache_class.assert_called_once_with(*cache_args)
+        mock_context_class.assert_called_once_with(mock_engine, [portfolio_id], mock_cache)
+
+    mock_summary_class.assert_called_once_with(
+        mock_engine, username, portfolio_name, portfolio_id, date, currency_code, mock_context, output_format, None
+    )
+    mock_growth_class.assert_called_once_with(
+        mock_engine, portfolio_id, date, currency_code, mock_context, output_format, None
+    )
+    mock_breakdown_class.assert_called_once_with(
+        mock_engine, portfolio_id, date, currency_code, mock_context, output_format, None
+    )
+    mock_growth_breakdown_class.assert_called_once_with(
+        mock_engine, portfolio_id, date, currency_code, mock_context, output_format, None
+    )
+    mock_growth_breakdown_mom_class.assert_called_once_with(
+        mock_engine, portfolio_id, date, currency_code, mock_context, output_format, None
+    )
+
+    mock_runner_class.assert_called_once_with(
+        [
+            mock_output_summary,
+            mock_output_growth,
+            mock_output_breakdown,
+            mock_output_growth_breakdown,
+            mock_output_growth_breakdown_mom,
+        ],
+        jobs,
+    )
+    mock_runner.execute.assert_called_once()
+
+
+@pytest.fixture
+def mock_output_classes(mock_engine: MagicMock, mocker: MockerFixture) -> dict[str, MagicMock]:
+    mocker.patch("pyp.cli.main.get_engine", return_value=mock_engine)
+    mocker.patch("pyp.cli.main.use_profile")
+
+    mock_classes = {
+        "cache": mocker.MagicMock(spec=OutputCache),
+        "context": mocker.MagicMock(spec=OutputContext),
+        "summary": mocker.MagicMock(spec=OutputSummaryCommand),
+        "growth": mocker.MagicMock(spec=OutputGrowthCommand),
+        "breakdown": mocker.MagicMock(spec=OutputBreakdownCommand),
+        "growth_breakdown": mocker.MagicMock(spec=OutputGrowthBreakdownCommand),
+        "growth_breakdown_mom": mocker.MagicMock(spec=OutputGrowthBreakdownMonthOverMonthCommand),
+        "runner": mocker.MagicMock(spec=OutputRunner),
+    }
+
+    mocker.patch("pyp.cli.main.OutputCache", mock_classes["cache"])
+    mocker.patch("pyp.cli.main.OutputContext", mock_classes["context"])
+    mocker.patch("pyp.cli.main.OutputSummaryCommand", mock_classes["summary"])
+    mocker.patch("pyp.cli.main.OutputGrowthCommand", mock_classes["growth"])
+    mocker.patch("pyp.cli.main.OutputBreakdownCommand", mock_classes["breakdown"])
+    mocker.patch("pyp.cli.main.OutputGrowthBreakdownCommand", mock_classes["growth_breakdown"])
+    mocker.patch("pyp.cli.main.OutputGrowthBreakdownMonthOverMonthCommand", mock_classes["growth_breakdown_mom"])
+    mocker.patch("pyp.cli.main.OutputRunner", mock_classes["runner"])
+
+    return mock_classes
+
+
+@pytest.mark.parametrize(
+    "option_args,username",
+    [
+        (["--all"], None),
+        (["--user", "MrSir"], "MrSir"),
+    ],
+)
+def test_output_command_for_many_portfolios(
+    option_args: list[str],
+    username: str | None,
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_engine: MagicMock,
+    mock_output_classes: dict[str, MagicMock],
+    mocker: MockerFixture,
+) -> None:
+    portfolios = [
+        Portfolio(id=1, name="My Portfolio", user=User(username="MrSir")),
+        Portfolio(id=2, name="Retirement", user=User(username="MrSir")),
+    ]
+    mock_resolve_portfolios = mocker.MagicMock(return_value=portfolios)
+    mocker.patch("pyp.cli.main.resolve_portfolios", mock_resolve_portfolios)
+
+    date = datetime(2024, 12, 9)
+
+    result = cli_runner.invoke(app, ["output", "--date", date.strftime("%Y-%m-%d"), *option_args])
+
+    assert result.exit_code == 0
+
+    mock_resolve_portfolios.assert_called_once_with(username)
+
+    mock_context = mock_output_classes["context"].return_value
+    mock_output_classes["context"].assert_called_once_with(
+        mock_engine, [1, 2], mock_output_classes["cache"].return_value
+    )
+
+    output_dirs = [OutputCommand.output_dir / "MrSir/My Portfolio", OutputCommand.output_dir / "MrSir/Retirement"]
+    assert [
+        call(mock_engine, "MrSir", "My Portfolio", 1, date, "USD", mock_context, OutputFormat.RECORDS, output_dirs[0]),
+        call(mock_engine, "MrSir", "Retirement", 2, date, "USD", mock_context, OutputFormat.RECORDS, output_dirs[1]),
+    ] == mock_output_classes["summary"].call_args_list
+
+    for name in ["growth", "breakdown", "growth_breakdown", "growth_breakdown_mom"]:
+        assert [
+            call(mock_engine, 1, date, "USD", mock_context, OutputFormat.RECORDS, output_dirs[0]),
+            call(mock_engine, 2, date, "USD", mock_context, OutputFormat.RECORDS, output_dirs[1]),
+        ] == mock_output_classes[name].call_args_list
+
+    commands, jobs = mock_output_classes["runner"].call_args.args
+    assert 10 == len(commands)
+    assert 1 == jobs
+    mock_output_classes["runner"].return_value.execute.assert_called_once()
+
+
+def test_output_command_rejects_unsafe_portfolio_names(
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_output_classes: dict[str, MagicMock],
+    mocker: MockerFixture,
+) -> None:
+    portfolios = [
+        Portfolio(id=1, name="My Portfolio", user=User(username="MrSir")),
+        Portfolio(id=2, name="../../../index", user=User(username="MrSir")),
+    ]
+    mocker.patch("pyp.cli.main.resolve_portfolios", mocker.MagicMock(return_value=portfolios))
+
+    result = cli_runner.invoke(app, ["output", "--all"])
+
+    assert result.exit_code != 0
+
+    mock_output_classes["runner"].assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["output"],
+        ["output", "MrSir"],
+        ["output", "--all", "--user", "MrSir"],
+        ["output", "--all", "MrSir", "My Portfolio"],
+        ["output", "--user", "MrSir", "MrSir", "My Portfolio"],
+    ],
+)
+def test_output_command_rejects_ambiguous_targets(
+    args: list[str],
+    app: Typer,
+    cli_runner: CliRunner,
+    mock_output_classes: dict[str, MagicMock],
+) -> None:
+    result = cli_runner.invoke(app, args)
+
+    assert result.exit_code != 0
+
+    mock_output_classes["runner"].assert_not_called()
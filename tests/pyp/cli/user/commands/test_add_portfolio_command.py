@@ -114,3 +114,16 @@ def test_execute_shows_error_when_user_exists(
     user.portfolios.append.assert_called_once_with(portfolio)
     mock_session.commit.assert_called_once()
     mock_print.assert_called_once_with(f"The portfolio '{name}' already exists, for user '{username}'.")
+
+
+@pytest.mark.parametrize("name", ["../../../index", "a/b", ".."])
+def test_execute_rejects_unsafe_names(
+    name: str, mock_engine: MagicMock, mock_session_class: MagicMock, mocker: MockerFixture
+) -> None:
+    mocker.patch("pyp.cli.user.commands.Session", mock_session_class)
+    mock_print = mocker.patch("pyp.cli.user.commands.print")
+
+    AddPortfolioCommand(mock_engine, "MrSir", name).execute()
+
+    mock_session_class.assert_not_called()
+    mock_print.assert_called_once_with(f"The portfolio name '{name}' can not contain '/' or '\\', or be '.' or '..'.")
@@ -72,3 +72,16 @@ def test_execute_shows_error_when_user_exists(
     mock_session.add.assert_called_once_with(user)
     mock_session.commit.assert_called_once()
     mock_print.assert_called_once_with(f"The user '{username}' already exists.")
+
+
+@pytest.mark.parametrize("username", ["../../../index", "a/b", ".."])
+def test_execute_rejects_unsafe_usernames(
+    username: str, mock_engine: MagicMock, mock_session_class: MagicMock, mocker: MockerFixture
+) -> None:
+    mocker.patch("pyp.cli.user.commands.Session", mock_session_class)
+    mock_print = mocker.patch("pyp.cli.user.commands.print")
+
+    AddUserCommand(mock_engine, username).execute()
+
+    mock_session_class.assert_not_called()
+    mock_print.assert_called_once_with(f"The username '{username}' can not contain '/' or '\\', or be '.' or '..'.")
@@ -5,7 +5,7 @@ from typer.testing import CliRunner
 
 from pyp.cli.user import user_app
 from pyp.cli.user.commands import AddPortfolioCommand, AddUserCommand
-from pyp.database.engine import engine
+from pyp.database.engine import get_engine
 
 
 @pytest.fixture
@@ -33,7 +33,7 @@ def test_add_command(app: Typer, cli_runner: CliRunner, mocker: MockerFixture) -
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, username)
+    mock_class.assert_called_once_with(get_engine(), username)
     mock_add.execute.assert_called_once()
 
 
@@ -49,5 +49,5 @@ def test_add_portfolio_command(app: Typer, cli_runner: CliRunner, mocker: Mocker
 
     assert result.exit_code == 0
 
-    mock_class.assert_called_once_with(engine, username, name)
+    mock_class.assert_called_once_with(get_engine(), username, name)
     mock_add.execute.assert_called_once()
@@ -1,16 +1,57 @@
+import os
+from typing import Iterator
 from unittest.mock import MagicMock
 
+import pixeltable_pgserver
 import pytest
 from pytest_mock import MockerFixture
-from sqlalchemy import Engine
+from sqlalchemy import Engine, text
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import Session
 
-from pyp.database.models import Portfolio
+from pyp.database.engine import create_database_engine
+from pyp.database.models import Base, Portfolio, TableVersion
+
+
+@pytest.fixture(scope="session")
+def postgresql_url(tmp_path_factory: pytest.TempPathFactory) -> Iterator[str]:
+    url = os.environ.get("PYP_TEST_POSTGRESQL_URL", "")
+
+    if url:
+        yield url
+        return
+
+    server = pixeltable_pgserver.get_server(tmp_path_factory.mktemp("pgdata"))
+
+    yield server.get_uri()
+
+    server.cleanup()
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database_engine(request: pytest.FixtureRequest) -> Iterator[Engine]:
+    url = "sqlite://"
+
+    if request.param == "postgresql":
+        url = request.getfixturevalue("postgresql_url")
+
+    database_engine = create_database_engine(url)
+
+    yield database_engine
+
+    Base.metadata.drop_all(database_engine)
+
+    if database_engine.dialect.name == "postgresql":
+        with database_engine.begin() as connection:
+            connection.execute(text(f"DROP FUNCTION IF EXISTS {TableVersion.__tablename__}_bump() CASCADE"))
+
+    database_engine.dispose()
 
 
 @pytest.fixture
 def mock_engine(mocker: MockerFixture) -> MagicMock:
     mock = mocker.MagicMock(spec=Engine)
+    mock.dialect = sqlite.dialect()
 
     return mock
 
@@ -0,0 +1,144 @@
+from datetime import date, datetime
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session
+
+from pyp.cli.commands.setup import SetupCommand
+from pyp.cli.ingest.commands.exchange_rates import IngestExchangeRatesCommand
+from pyp.cli.ingest.commands.stocks import IngestStocksCommand
+from pyp.database.models import (
+    Base,
+    Currency,
+    ExchangeRate,
+    IngestCheckpoint,
+    MonthlyPrice,
+    Stock,
+    TableVersion,
+    User,
+    day_key,
+    month_key,
+)
+from pyp.database.statements import prepare_monthly_prices_refresh_statement
+
+
+def test_setup_command(database_engine: Engine) -> None:
+    SetupCommand(database_engine, seed=True).execute()
+
+    with Session(database_engine) as session:
+        exchange_rates_count = session.scalar(select(func.count()).select_from(ExchangeRate))
+        users_version = session.scalar(select(TableVersion.version).where(TableVersion.table_name == "users"))
+
+    SetupCommand(database_engine, seed=True).execute()
+
+    with Session(database_engine) as session:
+        session.add(User(username="MrSir"))
+        session.commit()
+
+        assert ["CAD", "EUR", "USD"] == session.scalars(select(Currency.code).order_by(Currency.code)).all()
+        assert exchange_rates_count == session.scalar(select(func.count()).select_from(ExchangeRate))
+        assert users_version is not None
+        assert users_version < session.scalar(select(TableVersion.version).where(TableVersion.table_name == "users"))
+
+
+def test_price_upserts(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add(Stock(moniker="ADP"))
+        session.commit()
+
+        stock_id = session.scalars(select(Stock.id)).one()
+
+    command = IngestStocksCommand(database_engine, batch_size=2)
+    prices = [(date(2024, 1, 30), 10.0), (date(2024, 1, 31), 11.0), (date(2024, 2, 1), 12.0)]
+
+    for amounts in [[10.0, 11.0, 12.0], [10.0, 11.5, 12.0]]:
+        with Session(database_engine) as session:
+            command._upsert_in_batches(
+                session,
+                command._prepare_price_upsert_statement(),
+                [
+                    {
+                        "stock_id": stock_id,
+                        "date": price_date,
+                        "amount": amount,
+                        "day_key": day_key(price_date),
+                        "month_key": month_key(price_date),
+                    }
+                    for (price_date, _), amount in zip(prices, amounts)
+                ],
+            )
+            session.commit()
+
+    assert 6 == command._upserted_rows
+    assert 4 == command._changed_rows
+
+    with Session(database_engine) as session:
+        session.execute(prepare_monthly_prices_refresh_statement(stock_id, dialect_name=database_engine.dialect.name))
+        session.commit()
+
+        assert [(202401, date(2024, 1, 31), 11.5), (202402, date(2024, 2, 1), 12.0)] == session.execute(
+            select(MonthlyPrice.year_month, MonthlyPrice.date, MonthlyPrice.close).order_by(MonthlyPrice.year_month)
+        ).all()
+
+
+def test_exchange_rates_resume_from_checkpoint(database_engine: Engine, mocker: MockerFixture) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add_all([Currency(code="USD"), Currency(code="CAD")])
+        session.commit()
+
+    command = IngestExchangeRatesCommand(database_engine, datetime(2024, 1, 1), datetime(2024, 1, 5), "API-KEY")
+    command.checkpoint_days = 2
+
+    def download_rates_for(rates_date: datetime) -> dict[str, float]:
+        if rates_date == datetime(2024, 1, 4):
+            raise ConnectionError
+
+        return {"USD": 1.0, "CAD": 1.3}
+
+    mocker.patch.object(command, "_download_rates_for", mocker.MagicMock(side_effect=download_rates_for))
+    mocker.patch.object(command, "_report_throughput", mocker.MagicMock())
+
+    with pytest.raises(ConnectionError):
+        command.execute()
+
+    with Session(database_engine) as session:
+        assert [date(2024, 1, 2)] == session.scalars(select(IngestCheckpoint.last_completed_date)).all()
+
+    mocker.patch.object(command, "_download_rates_for", mocker.MagicMock(return_value={"USD": 1.0, "CAD": 1.3}))
+
+    command.execute()
+
+    with Session(database_engine) as session:
+        assert [] == session.scalars(select(IngestCheckpoint)).all()
+        assert 10 == session.scalar(select(func.count()).select_from(ExchangeRate))
+
+
+def test_ingest_bumps_table_versions_once_per_transaction(database_engine: Engine, mocker: MockerFixture) -> None:
+    SetupCommand(database_engine).execute()
+
+    with Session(database_engine) as session:
+        session.add_all([Currency(code="USD"), Currency(code="CAD")])
+        session.commit()
+
+    command = IngestExchangeRatesCommand(database_engine, datetime(2024, 1, 1), datetime(2024, 1, 4), "API-KEY")
+    command.checkpoint_days = 2
+
+    mocker.patch.object(command, "_download_rates_for", mocker.MagicMock(return_value={"USD": 1.0, "CAD": 1.3}))
+    mocker.patch.object(command, "_report_throughput", mocker.MagicMock())
+
+    command.execute()
+
+    with Session(database_engine) as session:
+        assert 8 == session.scalar(select(func.count()).select_from(ExchangeRate))
+        assert {"exchange_rates": 2, "prices": 0} == dict(
+            session.execute(
+                select(TableVersion.table_name, TableVersion.version).where(
+                    TableVersion.table_name.in_(["exchange_rates", "prices"])
+                )
+            ).all()
+        )
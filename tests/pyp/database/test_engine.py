@@ -0,0 +1,131 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, StaticPool, text
+
+from pyp.database import engine as engine_module
+from pyp.database.engine import (
+    configure_engine,
+    create_database_engine,
+    database_url,
+    db_file,
+    engine_profiles,
+    get_engine,
+    use_profile,
+)
+
+
+def _pragmas(database_engine: Engine) -> dict[str, str | int]:
+    with database_engine.connect() as connection:
+        return {
+            name: connection.execute(text(f"PRAGMA {name}")).scalar_one()
+            for name in ["journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout"]
+        }
+
+
+def test_database_url(mocker: MockerFixture) -> None:
+    mocker.patch.dict("os.environ", {"PYP_DATABASE_URL": ""})
+
+    assert database_url() == f"sqlite:///{db_file.as_posix()}"
+
+    mocker.patch.dict("os.environ", {"PYP_DATABASE_URL": "postgresql://pyp@localhost/pyp"})
+
+    assert database_url() == "postgresql://pyp@localhost/pyp"
+
+
+def test_create_database_engine_default(tmp_path: Path) -> None:
+    database_engine = create_database_engine(f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}")
+
+    pragmas = _pragmas(database_engine)
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 2
+    assert pragmas["temp_store"] == 0
+    assert pragmas["busy_timeout"] == engine_profiles["default"]["busy_timeout"]
+
+
+@pytest.mark.parametrize("profile", ["ingest", "read-heavy"])
+def test_create_database_engine_with_profile(profile: str, tmp_path: Path) -> None:
+    database_engine = create_database_engine(f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}", profile)
+
+    assert _pragmas(database_engine) == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "cache_size": engine_profiles[profile]["cache_size"],
+        "mmap_size": engine_profiles[profile]["mmap_size"],
+        "temp_store": 2,
+        "busy_timeout": engine_profiles[profile]["busy_timeout"],
+    }
+
+
+def test_create_database_engine_in_memory() -> None:
+    database_engine = create_database_engine("sqlite://")
+
+    with database_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER)"))
+
+    with database_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM t")).scalar_one() == 0
+
+    assert isinstance(database_engine.pool, StaticPool)
+
+
+def test_use_profile_replaces_previous_profile(tmp_path: Path) -> None:
+    database_engine = create_database_engine(f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}", "read-heavy")
+
+    assert _pragmas(database_engine)["mmap_size"] == engine_profiles["read-heavy"]["mmap_size"]
+
+    use_profile(database_engine, "ingest")
+
+    assert _pragmas(database_engine)["mmap_size"] == engine_profiles["ingest"]["mmap_size"]
+
+    use_profile(database_engine, "default")
+
+    assert _pragmas(database_engine)["temp_store"] == 0
+
+
+def test_use_profile_default_keeps_wal(tmp_path: Path) -> None:
+    url = f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}"
+    database_engine = create_database_engine(url, "read-heavy")
+
+    assert _pragmas(database_engine)["journal_mode"] == "wal"
+
+    use_profile(database_engine, "default")
+
+    assert _pragmas(database_engine)["journal_mode"] == "wal"
+    assert _pragmas(database_engine)["synchronous"] == 2
+
+
+def test_default_profile_writes_while_read_heavy_connection_is_open(tmp_path: Path) -> None:
+    url = f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}"
+    read_heavy_engine = create_database_engine(url, "read-heavy")
+
+    with read_heavy_engine.begin() as connection:
+        connection.execute(text("CREATE TABLE t (id INTEGER)"))
+
+    with read_heavy_engine.connect() as read_connection:
+        read_connection.execute(text("SELECT count(*) FROM t")).scalar_one()
+
+        with create_database_engine(url).begin() as connection:
+            connection.execute(text("INSERT INTO t (id) VALUES (1)"))
+
+    with read_heavy_engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM t")).scalar_one() == 1
+
+
+def test_use_profile_ignores_other_dialects() -> None:
+    database_engine = create_database_engine("postgresql://pyp@localhost/pyp", "ingest")
+
+    assert database_engine not in engine_module._pragma_listeners
+
+
+def test_configure_engine(tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.object(engine_module, "_engine", None)
+    url = f"sqlite:///{(tmp_path / 'pyp.sqlite').as_posix()}"
+
+    configured_engine = configure_engine(url)
+
+    assert str(configured_engine.url) == url
+    assert get_engine() is configured_engine
+    assert get_engine() is get_engine()
@@ -0,0 +1,390 @@
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import Engine, create_engine, inspect, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from pyp.database.migrations import (
+    AddCalendarKeysMigration,
+    AddStockMetadataRefreshedAtMigration,
+    AddTableVersionsMigration,
+    BackfillMonthlyPricesMigration,
+    CreateCoveringIndexesMigration,
+    DeleteZeroPricesMigration,
+    DropBulkVersionTriggersMigration,
+    Migration,
+    RebuildStocksMigration,
+    migrations,
+)
+from pyp.database.models import Base, MonthlyPrice, Price, Stock, TableVersion, User, day_key, month_key
+from pyp.database.statements import prepare_monthly_prices_refresh_statement
+
+
+def test_migrations() -> None:
+    assert list(range(1, len(migrations) + 1)) == [m.version for m in migrations]
+    assert len(migrations) == len({m.name for m in migrations})
+
+
+def test_initialization() -> None:
+    engine = create_engine("sqlite://")
+
+    assert Migration.batch_size == Migration(engine).batch_size
+    assert 5 == Migration(engine, 5).batch_size
+
+    with pytest.raises(NotImplementedError):
+        Migration(engine).upgrade()
+
+
+def test_backfill_in_batches(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add(Stock(moniker="ADP"))
+        session.flush()
+        session.add_all([
+            Price(stock_id=1, date=date(2024, 1, day), amount=day, day_key=0, month_key=0) for day in range(1, 8)
+        ])
+        session.commit()
+
+    prices = Base.metadata.tables[Price.__tablename__]
+
+    migration = Migration(database_engine, batch_size=3)
+    migration._backfill_in_batches(prices, {"month_key": 202401}, prices.c.amount > 2)
+
+    with Session(database_engine) as session:
+        assert [0, 0, 202401, 202401, 202401, 202401, 202401] == session.scalars(
+            select(Price.month_key).order_by(Price.id)
+        ).all()
+
+
+def test_rebuild_table(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add_all([Stock(moniker=f"S{i}", stock_type="ETF") for i in range(7)])
+        session.commit()
+
+    AddTableVersionsMigration(database_engine).upgrade()
+    stocks = Base.metadata.tables[Stock.__tablename__]
+
+    Migration(database_engine, batch_size=3)._rebuild_table(stocks)
+
+    with Session(database_engine) as session:
+        session.add(Stock(moniker="S7"))
+        session.commit()
+
+        assert 1 == session.scalar(select(TableVersion.version).where(TableVersion.table_name == "stocks"))
+
+        assert [(i + 1, f"S{i}") for i in range(8)] == session.execute(
+            select(Stock.id, Stock.moniker).order_by(Stock.id)
+        ).all()
+
+    assert {index.name for index in stocks.indexes} <= {
+        index["name"] for index in inspect(database_engine).get_indexes(Stock.__tablename__)
+    }
+    assert not inspect(database_engine).has_table(f"{Stock.__tablename__}_rebuild")
+    assert ["stocks"] == [
+        foreign_key["referred_table"] for foreign_key in inspect(database_engine).get_foreign_keys(Price.__tablename__)
+    ]
+
+
+def _executed_postgresql_statements(connection: MagicMock) -> list[str]:
+    return [
+        str(c.args[0].compile(dialect=postgresql.dialect())).replace("\n", "")
+        for c in connection.execute.call_args_list
+    ]
+
+
+@pytest.fixture
+def mock_postgresql_connection(mock_engine: MagicMock, mocker: MockerFixture) -> MagicMock:
+    mock_engine.dialect = postgresql.dialect()
+
+    mock_connection = mocker.MagicMock()
+    mock_connection.dialect = mock_engine.dialect
+    mock_connection.__enter__.return_value = mock_connection
+    mock_engine.begin.return_value = mock_connection
+
+    return mock_connection
+
+
+def test_index_ddl_for_postgresql(
+    mock_engine: MagicMock, mock_postgresql_connection: MagicMock, mocker: MockerFixture
+) -> None:
+    migration = Migration(mock_engine)
+    mocker.patch.object(migration, "_autocommit_connection", mocker.MagicMock(return_value=mock_postgresql_connection))
+
+    migration._create_index(next(iter(Base.metadata.tables[MonthlyPrice.__tablename__].indexes)))
+
+    assert [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS s_ym_cover_index ON monthly_prices "
+        "(stock_id, year_month, close, date)",
+    ] == _executed_postgresql_statements(mock_postgresql_connection)
+
+
+@pytest.mark.parametrize("key_format,expected_format", [("%Y%m%d", "YYYYMMDD"), ("%Y%m", "YYYYMM")])
+def test_calendar_key_for_postgresql(
+    key_format: str, expected_format: str, mock_engine: MagicMock, mock_postgresql_connection: MagicMock
+) -> None:
+    compiled = (
+        AddCalendarKeysMigration(mock_engine)._calendar_key(key_format, Price.date).compile(dialect=mock_engine.dialect)
+    )
+
+    assert "CAST(to_char(prices.date, %(to_char_1)s) AS INTEGER)" == str(compiled)
+    assert expected_format == compiled.params["to_char_1"]
+
+
+def test_add_calendar_keys() -> None:
+    engine = create_engine("sqlite://")
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE prices (id INTEGER PRIMARY KEY, stock_id INTEGER, date DATE)"))
+        connection.execute(text("INSERT INTO prices (id, stock_id, date) VALUES (1, 1, '2024-01-31')"))
+
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables["shares"], Base.metadata.tables["exchange_rates"]])
+
+    AddCalendarKeysMigration(engine).upgrade()
+    AddCalendarKeysMigration(engine).upgrade()
+
+    with engine.connect() as connection:
+        assert [(20240131, 202401)] == connection.execute(text("SELECT day_key, month_key FROM prices")).all()
+
+
+def test_add_stock_metadata_refreshed_at() -> None:
+    engine = create_engine("sqlite://")
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE stocks (id INTEGER PRIMARY KEY, moniker VARCHAR(10))"))
+
+    AddStockMetadataRefreshedAtMigration(engine).upgrade()
+    AddStockMetadataRefreshedAtMigration(engine).upgrade()
+
+    columns = {column["name"]: column for column in inspect(engine).get_columns("stocks")}
+
+    assert ["id", "moniker", "metadata_refreshed_at"] == list(columns)
+    assert "DATETIME" == str(columns["metadata_refreshed_at"]["type"])
+
+
+def test_create_covering_indexes() -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX s_ym_cover_index"))
+
+    CreateCoveringIndexesMigration(engine).upgrade()
+    CreateCoveringIndexesMigration(engine).upgrade()
+
+    inspector = inspect(engine)
+    assert ["s_dk_cover_index"] == [index["name"] for index in inspector.get_indexes("prices")]
+    assert ["s_ym_cover_index"] == [index["name"] for index in inspector.get_indexes("monthly_prices")]
+    assert ["ps_dk_cover_index"] == [index["name"] for index in inspector.get_indexes("shares")]
+    assert ["f_t_mk_dk_cover_index"] == [index["name"] for index in inspector.get_indexes("exchange_rates")]
+
+
+def test_add_table_versions(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    migration = AddTableVersionsMigration(database_engine)
+    migration.upgrade()
+    migration.upgrade()
+
+    with database_engine.begin() as connection:
+        connection.execute(
+            Base.metadata.tables["stocks"].insert().values(moniker="ADP"),
+        )
+        connection.execute(
+            Base.metadata.tables["prices"]
+            .insert()
+            .values(stock_id=1, date=datetime(2024, 1, 31), amount=1.5, day_key=20240131, month_key=202401)
+        )
+        connection.execute(Base.metadata.tables["prices"].update().values(amount=2.5))
+        connection.execute(Base.metadata.tables["prices"].delete())
+
+    with database_engine.connect() as connection:
+        versions = dict(connection.execute(select(TableVersion.table_name, TableVersion.version)).all())
+
+    assert {model.__tablename__ for model in migration._versioned_models} == set(versions)
+    assert 3 == versions["prices"]
+    assert 0 == versions["shares"]
+    assert TableVersion.__tablename__ not in versions
+
+
+def test_add_table_versions_for_postgresql(mock_engine: MagicMock, mock_postgresql_connection: MagicMock) -> None:
+    migration = AddTableVersionsMigration(mock_engine)
+    migration.upgrade()
+
+    statements = _executed_postgresql_statements(mock_postgresql_connection)
+
+    assert 3 * len(migration._versioned_models) == len(statements)
+    assert [
+        "INSERT INTO table_versions (table_name, version) VALUES (%(table_name)s, %(version)s) "
+        "ON CONFLICT (table_name) DO NOTHING",
+        "CREATE OR REPLACE FUNCTION table_versions_bump() RETURNS trigger AS $$ BEGIN "
+        "UPDATE table_versions SET version = version + 1 WHERE table_name = TG_TABLE_NAME; RETURN NULL; END $$ "
+        "LANGUAGE plpgsql",
+        "CREATE OR REPLACE TRIGGER users_version AFTER INSERT OR UPDATE OR DELETE ON users FOR EACH STATEMENT "
+        "EXECUTE FUNCTION table_versions_bump()",
+    ] == statements[:3]
+    assert {"table_name": User.__tablename__, "version": 0} == (
+        mock_postgresql_connection.execute.call_args_list[0].args[0].compile(dialect=mock_engine.dialect).params
+    )
+
+
+def test_backfill_monthly_prices(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add_all([Stock(moniker="ADP"), Stock(moniker="XIC")])
+        session.flush()
+        session.add_all([
+            Price(
+                stock_id=stock_id,
+                date=price_date,
+                amount=amount,
+                day_key=day_key(price_date),
+                month_key=month_key(price_date),
+            )
+            for stock_id in [1, 2]
+            for price_date, amount in [(date(2024, 1, 30), 10.0), (date(2024, 1, 31), 11.0), (date(2024, 2, 1), 12.0)]
+        ])
+        session.commit()
+
+    BackfillMonthlyPricesMigration(database_engine).upgrade()
+    BackfillMonthlyPricesMigration(database_engine).upgrade()
+
+    with Session(database_engine) as session:
+        assert [
+            (1, 202401, 11.0),
+            (1, 202402, 12.0),
+            (2, 202401, 11.0),
+            (2, 202402, 12.0),
+        ] == session.execute(
+            select(MonthlyPrice.stock_id, MonthlyPrice.year_month, MonthlyPrice.close).order_by(
+                MonthlyPrice.stock_id, MonthlyPrice.year_month
+            )
+        ).all()
+
+
+def test_delete_zero_prices(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with Session(database_engine) as session:
+        session.add_all([Stock(moniker="ADP"), Stock(moniker="XIC")])
+        session.flush()
+        session.add_all([
+            Price(
+                stock_id=stock_id,
+                date=price_date,
+                amount=amount,
+                day_key=day_key(price_date),
+                month_key=month_key(price_date),
+            )
+            for stock_id, price_date, amount in [
+                (1, date(2024, 1, 30), 10.0),
+                (1, date(2024, 1, 31), 0.0),
+                (1, date(2024, 2, 1), 0.0),
+                (1, date(2024, 3, 1), 12.0),
+                (2, date(2024, 1, 31), 20.0),
+            ]
+        ])
+        session.flush()
+        session.execute(prepare_monthly_prices_refresh_statement(dialect_name=database_engine.dialect.name))
+        session.commit()
+
+        assert (date(2024, 1, 31), 0.0) == session.execute(
+            select(MonthlyPrice.date, MonthlyPrice.close).where(
+                MonthlyPrice.stock_id == 1, MonthlyPrice.year_month == 202401
+            )
+        ).one()
+
+    DeleteZeroPricesMigration(database_engine).upgrade()
+    DeleteZeroPricesMigration(database_engine).upgrade()
+
+    with Session(database_engine) as session:
+        assert [(1, 10.0), (1, 12.0), (2, 20.0)] == session.execute(
+            select(Price.stock_id, Price.amount).order_by(Price.stock_id, Price.date)
+        ).all()
+        assert [
+            (1, 202401, date(2024, 1, 30), 10.0),
+            (1, 202403, date(2024, 3, 1), 12.0),
+            (2, 202401, date(2024, 1, 31), 20.0),
+        ] == session.execute(
+            select(MonthlyPrice.stock_id, MonthlyPrice.year_month, MonthlyPrice.date, MonthlyPrice.close).order_by(
+                MonthlyPrice.stock_id, MonthlyPrice.year_month
+            )
+        ).all()
+
+
+def test_rebuild_stocks(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    with database_engine.begin() as connection:
+        connection.execute(
+            text("DROP TABLE stocks CASCADE" if database_engine.dialect.name == "postgresql" else "DROP TABLE stocks")
+        )
+        connection.execute(
+            text(
+                "CREATE TABLE stocks (id INTEGER PRIMARY KEY, currency_id INTEGER REFERENCES currencies (id), "
+                "stock_type VARCHAR(6), moniker VARCHAR(10) UNIQUE, name VARCHAR(256), description VARCHAR(256), "
+                "sector_weightings VARCHAR(256), metadata_refreshed_at TIMESTAMP)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO stocks (id, stock_type, moniker, description) VALUES (1, 'ETF', 'XIC', 'Index fund')")
+        )
+
+    RebuildStocksMigration(database_engine).upgrade()
+    RebuildStocksMigration(database_engine).upgrade()
+
+    columns = {column["name"]: str(column["type"]) for column in inspect(database_engine).get_columns("stocks")}
+
+    assert "TEXT" == columns["description"]
+    assert "TEXT" == columns["sector_weightings"]
+
+    with Session(database_engine) as session:
+        session.add(Stock(moniker="ADP", description="x" * 1000))
+        session.commit()
+
+        assert [(1, "XIC", "ETF", "Index fund"), (2, "ADP", None, "x" * 1000)] == session.execute(
+            select(Stock.id, Stock.moniker, Stock.stock_type, Stock.description).order_by(Stock.id)
+        ).all()
+
+
+def test_drop_bulk_version_triggers(database_engine: Engine) -> None:
+    Base.metadata.create_all(database_engine)
+
+    AddTableVersionsMigration(database_engine).upgrade()
+
+    migration = DropBulkVersionTriggersMigration(database_engine)
+    migration.upgrade()
+    migration.upgrade()
+
+    with database_engine.begin() as connection:
+        connection.execute(Base.metadata.tables["stocks"].insert().values(moniker="ADP"))
+        connection.execute(
+            Base.metadata.tables["prices"]
+            .insert()
+            .values(stock_id=1, date=datetime(2024, 1, 31), amount=1.5, day_key=20240131, month_key=202401)
+        )
+        connection.execute(Base.metadata.tables["prices"].update().values(amount=2.5))
+
+    with database_engine.connect() as connection:
+        versions = dict(connection.execute(select(TableVersion.table_name, TableVersion.version)).all())
+
+    assert 1 == versions["stocks"]
+    assert {0} == {versions[model.__tablename__] for model in migration._bulk_versioned_models}
+
+
+def test_drop_bulk_version_triggers_for_postgresql(
+    mock_engine: MagicMock, mock_postgresql_connection: MagicMock
+) -> None:
+    DropBulkVersionTriggersMigration(mock_engine).upgrade()
+
+    assert [
+        "DROP TRIGGER IF EXISTS prices_version ON prices",
+        "DROP TRIGGER IF EXISTS monthly_prices_version ON monthly_prices",
+        "DROP TRIGGER IF EXISTS exchange_rates_version ON exchange_rates",
+    ] == _executed_postgresql_statements(mock_postgresql_connection)
@@ -0,0 +1,114 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import Insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from pyp.database.models import Currency, ExchangeRate, Price
+from pyp.database.statements import (
+    insert,
+    prepare_monthly_prices_refresh_statement,
+    prepare_table_versions_bump_statement,
+)
+
+
+def test_prepare_monthly_prices_refresh_statement() -> None:
+    statement = prepare_monthly_prices_refresh_statement(dialect_name="sqlite")
+
+    assert isinstance(statement, Insert)
+
+    query = """INSERT INTO monthly_prices (stock_id, year_month, date, close)
+    SELECT anon_1.stock_id, anon_1.year_month, anon_1.date, anon_1.close
+    FROM (SELECT
+        prices.stock_id AS stock_id,
+        prices.month_key AS year_month,
+        prices.date AS date,
+        prices.amount AS close,
+        row_number() OVER (PARTITION BY prices.stock_id, prices.month_key
+            ORDER BY prices.day_key DESC) AS row_number
+    FROM prices) AS anon_1
+    WHERE anon_1.row_number = ?
+    ON CONFLICT (stock_id, year_month) DO UPDATE SET date = excluded.date, close = excluded.close
+    WHERE excluded.date != monthly_prices.date OR excluded.close != monthly_prices.close"""
+
+    expected_query = (
+        query.replace("(SELECT\n        ", "(SELECT ")
+        .replace("\n            ", " ")
+        .replace("\n        ", " ")
+        .replace("\n    ", " ")
+    )
+
+    assert expected_query == str(statement.compile(dialect=sqlite.dialect())).replace(" \n", " ")
+
+
+def test_prepare_monthly_prices_refresh_statement_for_postgresql() -> None:
+    statement = prepare_monthly_prices_refresh_statement(dialect_name="postgresql")
+
+    assert isinstance(statement, postgresql.Insert)
+
+    query = """INSERT INTO monthly_prices (stock_id, year_month, date, close)
+    SELECT anon_1.stock_id, anon_1.year_month, anon_1.date, anon_1.close
+    FROM (SELECT
+        prices.stock_id AS stock_id,
+        prices.month_key AS year_month,
+        prices.date AS date,
+        prices.amount AS close,
+        row_number() OVER (PARTITION BY prices.stock_id, prices.month_key
+            ORDER BY prices.day_key DESC) AS row_number
+    FROM prices) AS anon_1
+    WHERE anon_1.row_number = %(row_number_1)s
+    ON CONFLICT (stock_id, year_month) DO UPDATE SET date = excluded.date, close = excluded.close
+    WHERE excluded.date != monthly_prices.date OR excluded.close != monthly_prices.close"""
+
+    expected_query = (
+        query.replace("(SELECT\n        ", "(SELECT ")
+        .replace("\n            ", " ")
+        .replace("\n        ", " ")
+        .replace("\n    ", " ")
+    )
+
+    assert expected_query == str(statement.compile(dialect=postgresql.dialect())).replace(" \n", " ")
+
+
+@pytest.mark.parametrize(
+    "start_date,end_date,expected_start,expected_end",
+    [
+        (date(2024, 1, 15), date(2024, 3, 3), 20240101, 20240401),
+        (date(2024, 11, 30), date(2024, 12, 31), 20241101, 20250101),
+    ],
+)
+def test_prepare_monthly_prices_refresh_statement_for_range(
+    start_date: date, end_date: date, expected_start: int, expected_end: int
+) -> None:
+    statement = prepare_monthly_prices_refresh_statement(7, start_date, end_date, dialect_name="sqlite")
+
+    compiled = statement.compile(dialect=sqlite.dialect())
+
+    assert "WHERE prices.stock_id = ? AND prices.day_key >= ? AND prices.day_key < ?" in str(compiled)
+    assert [7, expected_start, expected_end] == [
+        compiled.params["stock_id_1"],
+        compiled.params["day_key_1"],
+        compiled.params["day_key_2"],
+    ]
+
+
+@pytest.mark.parametrize("dialect_name,expected_type", [("sqlite", sqlite.Insert), ("postgresql", postgresql.Insert)])
+def test_insert(dialect_name: str, expected_type: type) -> None:
+    assert isinstance(insert(Currency, dialect_name), expected_type)
+
+
+@pytest.mark.parametrize("dialect_name", ["mysql", "mssql", ""])
+def test_insert_rejects_unsupported_dialects(dialect_name: str) -> None:
+    with pytest.raises(ValueError, match=f"Unsupported dialect {dialect_name}"):
+        insert(Currency, dialect_name)
+
+
+def test_prepare_table_versions_bump_statement() -> None:
+    compiled = prepare_table_versions_bump_statement(Price, ExchangeRate).compile(
+        dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}
+    )
+
+    assert (
+        "UPDATE table_versions SET version=(table_versions.version + 1) "
+        "WHERE table_versions.table_name IN ('prices', 'exchange_rates')"
+    ) == str(compiled)